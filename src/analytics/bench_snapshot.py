@@ -0,0 +1,109 @@
+# src/analytics/bench_snapshot.py
+#
+# Cold-load time and peak memory of the analytics posts: parsing posts.json
+# into InstaPost objects and dicts (the old path) vs memory-mapping the
+# columnar snapshot. Each path runs in a fresh interpreter.
+# Run: python -m src.analytics.bench_snapshot --posts 100000
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+TAGS = [f"#tag{i}" for i in range(300)]
+TYPES = ["image", "reel", "carousel"]
+
+# each snippet prints "<seconds> <peak RSS in KiB>"; numpy is imported up
+# front in all of them so the RSS numbers share the same baseline
+_JSON_LOAD = """
+import json, resource, sys, time
+import numpy
+start = time.perf_counter()
+from src.instagram.service import _parse_post
+with open(sys.argv[1], encoding="utf-8") as f:
+    posts = [_parse_post(r) for r in json.load(f)]
+rows = [
+    {"id": p.id, "type": p.type, "caption": p.caption, "hashtags": p.hashtags,
+     "created_at": p.created_at.isoformat(), "likes": p.likes, "comments": p.comments_count}
+    for p in posts
+]
+total = sum(r["likes"] + r["comments"] for r in rows)
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+_SNAPSHOT_LOAD = """
+import resource, sys, time
+import numpy
+start = time.perf_counter()
+from src.analytics.snapshot import load_snapshot
+cols = load_snapshot(sys.argv[1])
+total = int(cols.engagement.sum())
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+_BASELINE = """
+import resource, time
+import numpy
+start = time.perf_counter()
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def _make_posts(n: int) -> list:
+    rng = random.Random(0)
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": f"post_{i}",
+            "type": rng.choice(TYPES),
+            "caption": f"New piece #{i}, inked and coloured over the weekend",
+            "hashtags": rng.sample(TAGS, rng.randint(3, 10)),
+            "created_at": (start + timedelta(minutes=17 * i)).isoformat(),
+            "likes": rng.randint(0, 2000),
+            "comments": rng.randint(0, 150),
+        }
+        for i in range(n)
+    ]
+
+
+def _run(code: str, arg: str) -> tuple:
+    out = subprocess.run(
+        [sys.executable, "-c", code, arg],
+        check=True, capture_output=True, text=True,
+    ).stdout.split()
+    return float(out[0]), int(out[1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark posts.json vs columnar snapshot cold loads")
+    parser.add_argument("--posts", type=int, default=100000)
+    args = parser.parse_args()
+
+    from src.analytics.snapshot import columns_from_json, write_snapshot
+
+    tmpdir = Path(tempfile.mkdtemp(prefix="artflow-bench-"))
+    posts_path = tmpdir / "posts.json"
+    with open(posts_path, "w", encoding="utf-8") as f:
+        json.dump(_make_posts(args.posts), f)
+
+    start = time.perf_counter()
+    write_snapshot(columns_from_json(posts_path), source="bench", directory=tmpdir / "snapshot")
+    build = time.perf_counter() - start
+
+    base_s, base_mb = _run(_BASELINE, "")
+    json_s, json_mb = _run(_JSON_LOAD, str(posts_path))
+    snap_s, snap_mb = _run(_SNAPSHOT_LOAD, str(tmpdir / "snapshot"))
+
+    print(f"posts: {args.posts} (posts.json {posts_path.stat().st_size / 1e6:.1f} MB)")
+    print(f"snapshot build          : {build:6.2f}s (once per posts.json change)")
+    print(f"posts.json -> dicts     : {json_s:6.2f}s, peak RSS {json_mb:7.1f} MB")
+    print(f"snapshot (mmap)         : {snap_s:6.2f}s, peak RSS {snap_mb:7.1f} MB")
+    print(f"(interpreter + numpy alone: peak RSS {base_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
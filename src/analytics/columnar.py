@@ -0,0 +1,342 @@
+# src/analytics/columnar.py
+#
+# Column-oriented engagement analytics. Posts are converted once into NumPy
+# arrays (type codes, UTC timestamps, likes, comments, hashtags in CSR form)
+# and every breakdown is a bincount over those arrays, so 100k posts take
+# milliseconds instead of a Python loop per question.
+#
+# There is no reach/follower data, so "engagement" is likes + comments per
+# post and breakdowns are reported as an index against the account average
+# (1.25 = 25% above a typical post).
+import math
+import time
+from dataclasses import dataclass
+from datetime import timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.instagram.schemas import InstaPost
+
+DAY = 86400
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+Z_95 = 1.96
+
+
+@dataclass
+class PostColumns:
+    ids: Sequence[str]        # post ids (object array, or StringColumn from a snapshot)
+    type_codes: np.ndarray    # int32, index into type_names
+    type_names: List[str]
+    created: np.ndarray       # int64, unix seconds (UTC)
+    likes: np.ndarray         # int64
+    comments: np.ndarray      # int64
+    tag_indptr: np.ndarray    # int64, post i has tag_ids[tag_indptr[i]:tag_indptr[i + 1]]
+    tag_ids: np.ndarray       # int32, index into tag_names
+    tag_names: List[str]
+    captions: Optional[Sequence[str]] = None
+
+    @classmethod
+    def from_posts(cls, posts: Iterable[InstaPost]) -> "PostColumns":
+        ids, captions, created, likes, comments, type_codes = [], [], [], [], [], []
+        tag_indptr, tag_ids = [0], []
+        types: Dict[str, int] = {}
+        tags: Dict[str, int] = {}
+
+        for p in posts:
+            ids.append(p.id)
+            captions.append(p.caption)
+            created_at = p.created_at
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            created.append(int(created_at.timestamp()))
+            likes.append(p.likes)
+            comments.append(p.comments_count)
+            type_codes.append(types.setdefault(p.type or "unknown", len(types)))
+            # a hashtag counts once per post
+            for tag in dict.fromkeys(h.lower() for h in p.hashtags):
+                tag_ids.append(tags.setdefault(tag, len(tags)))
+            tag_indptr.append(len(tag_ids))
+
+        return cls(
+            ids=np.array(ids, dtype=object),
+            type_codes=np.array(type_codes, dtype=np.int32),
+            type_names=list(types),
+            created=np.array(created, dtype=np.int64),
+            likes=np.array(likes, dtype=np.int64),
+            comments=np.array(comments, dtype=np.int64),
+            tag_indptr=np.array(tag_indptr, dtype=np.int64),
+            tag_ids=np.array(tag_ids, dtype=np.int32),
+            tag_names=list(tags),
+            captions=np.array(captions, dtype=object),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def engagement(self) -> np.ndarray:
+        return self.likes + self.comments
+
+    def hours(self, utc_offset_hours: float = 0.0) -> np.ndarray:
+        local = self.created + int(utc_offset_hours * 3600)
+        return (local // 3600) % 24
+
+    def weekdays(self, utc_offset_hours: float = 0.0) -> np.ndarray:
+        local = self.created + int(utc_offset_hours * 3600)
+        # 1970-01-01 was a Thursday (weekday 3)
+        return (local // DAY + 3) % 7
+
+
+# ---- BREAKDOWNS ----
+
+def _grouped(keys: np.ndarray, values: np.ndarray, size: int, labels: List[str]) -> List[dict]:
+    counts = np.bincount(keys, minlength=size)
+    sums = np.bincount(keys, weights=values, minlength=size)
+    overall = values.mean() if len(values) else 0.0
+    rows = []
+    for k in np.nonzero(counts)[0]:
+        mean = sums[k] / counts[k]
+        rows.append({
+            "key": labels[k],
+            "posts": int(counts[k]),
+            "avg_engagement": float(mean),
+            "index": float(mean / overall) if overall else 0.0,
+        })
+    rows.sort(key=lambda r: r["avg_engagement"], reverse=True)
+    return rows
+
+
+def engagement_by_type(cols: PostColumns) -> List[dict]:
+    return _grouped(cols.type_codes, cols.engagement, len(cols.type_names), cols.type_names)
+
+
+def engagement_by_hour(cols: PostColumns, utc_offset_hours: float = 0.0) -> List[dict]:
+    return _grouped(cols.hours(utc_offset_hours), cols.engagement, 24, [f"{h:02d}:00" for h in range(24)])
+
+
+def engagement_by_weekday(cols: PostColumns, utc_offset_hours: float = 0.0) -> List[dict]:
+    return _grouped(cols.weekdays(utc_offset_hours), cols.engagement, 7, WEEKDAYS)
+
+
+def hashtag_lift(cols: PostColumns, min_posts: int = 5) -> List[dict]:
+    """
+    Engagement of posts with a hashtag relative to posts without it.
+
+    Compared on log(1 + engagement) so a few viral posts don't dominate:
+    lift = exp(mean_with - mean_without), with a 95% interval from Welch's
+    standard error. Sorted by the lower bound, so well-supported hashtags
+    rank above lucky one-offs. Hashtags on fewer than `min_posts` posts, or
+    on every post, are skipped.
+    """
+    n = len(cols)
+    n_tags = len(cols.tag_names)
+    if n == 0 or n_tags == 0:
+        return []
+
+    x = np.log1p(cols.engagement.astype(np.float64))
+    post_of_tag = np.repeat(np.arange(n), np.diff(cols.tag_indptr))
+    xt = x[post_of_tag]
+
+    n_with = np.bincount(cols.tag_ids, minlength=n_tags).astype(np.float64)
+    s_with = np.bincount(cols.tag_ids, weights=xt, minlength=n_tags)
+    ss_with = np.bincount(cols.tag_ids, weights=xt * xt, minlength=n_tags)
+    n_without = n - n_with
+    s_without = x.sum() - s_with
+    ss_without = (x * x).sum() - ss_with
+
+    ok = (n_with >= min_posts) & (n_without >= 2)
+    if not ok.any():
+        return []
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_with = s_with / n_with
+        mean_without = s_without / n_without
+        # sample variances from the running sums
+        var_with = np.maximum(ss_with - n_with * mean_with ** 2, 0) / np.maximum(n_with - 1, 1)
+        var_without = np.maximum(ss_without - n_without * mean_without ** 2, 0) / np.maximum(n_without - 1, 1)
+        diff = mean_with - mean_without
+        se = np.sqrt(var_with / n_with + var_without / n_without)
+
+    rows = []
+    for t in np.nonzero(ok)[0]:
+        rows.append({
+            "hashtag": cols.tag_names[t],
+            "posts": int(n_with[t]),
+            "lift": math.exp(diff[t]),
+            "ci_low": math.exp(diff[t] - Z_95 * se[t]),
+            "ci_high": math.exp(diff[t] + Z_95 * se[t]),
+        })
+    rows.sort(key=lambda r: r["ci_low"], reverse=True)
+    return rows
+
+
+def rolling_engagement(cols: PostColumns, window_days: int = 30) -> Dict[str, np.ndarray]:
+    """
+    Average engagement per post over a trailing `window_days` window, one
+    value per calendar day (UTC) from the first to the last post. Days
+    whose window has no posts are NaN.
+    """
+    if len(cols) == 0:
+        return {"day": np.array([], dtype="datetime64[D]"), "avg_engagement": np.array([]), "posts": np.array([])}
+
+    days = cols.created // DAY
+    first, last = int(days.min()), int(days.max())
+    offsets = days - first
+    span = last - first + 1
+
+    counts = np.bincount(offsets, minlength=span)
+    sums = np.bincount(offsets, weights=cols.engagement, minlength=span)
+    # trailing window sums via cumulative sums
+    c_counts = np.concatenate([[0], np.cumsum(counts)])
+    c_sums = np.concatenate([[0.0], np.cumsum(sums)])
+    end = np.arange(1, span + 1)
+    start = np.maximum(end - window_days, 0)
+    w_counts = c_counts[end] - c_counts[start]
+    w_sums = c_sums[end] - c_sums[start]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = np.where(w_counts > 0, w_sums / w_counts, np.nan)
+    return {
+        "day": np.arange(first, last + 1).astype("datetime64[D]"),
+        "avg_engagement": avg,
+        "posts": w_counts,
+    }
+
+
+def recent_trend(
+    cols: PostColumns,
+    window_days: int = 30,
+    now: Optional[int] = None,
+    engagement: Optional[np.ndarray] = None,
+) -> Optional[dict]:
+    """
+    Average engagement of the last `window_days` vs the window before it.
+    `engagement` replaces the lifetime likes + comments per post (NaN =
+    no value, the post is left out), e.g. early_engagement() values.
+    """
+    if len(cols) == 0:
+        return None
+    now = now if now is not None else int(cols.created.max())
+    eng = cols.engagement if engagement is None else engagement
+    known = ~np.isnan(eng) if engagement is not None else np.ones(len(cols), dtype=bool)
+    recent = (cols.created > now - window_days * DAY) & known
+    previous = (cols.created > now - 2 * window_days * DAY) & known & ~recent
+    if not recent.any() or not previous.any():
+        return None
+    r, p = float(eng[recent].mean()), float(eng[previous].mean())
+    return {
+        "recent_avg": r,
+        "previous_avg": p,
+        "change": (r / p - 1) if p else 0.0,
+        "recent_posts": int(recent.sum()),
+        "previous_posts": int(previous.sum()),
+    }
+
+
+def early_engagement(cols: PostColumns, samples: Dict[str, List[Tuple[int, int]]], age_days: float) -> np.ndarray:
+    """
+    Engagement of each post `age_days` after it was published, from stored
+    insight samples ({post_id: [(sampled_at, likes + comments), ...]} oldest
+    first; see analytics/insights_collector.py): the last sample taken by
+    then. NaN for posts without such a sample or not that old yet.
+    Unlike lifetime totals this compares new posts fairly with old ones.
+    """
+    out = np.full(len(cols), np.nan)
+    for i, pid in enumerate(cols.ids):
+        curve = samples.get(str(pid))
+        if not curve:
+            continue
+        cutoff = int(cols.created[i]) + age_days * DAY
+        # the curve must reach past the cutoff, else the value isn't final
+        if curve[-1][0] < cutoff:
+            continue
+        value = None
+        for sampled_at, engagement in curve:
+            if sampled_at > cutoff:
+                break
+            value = engagement
+        if value is not None:
+            out[i] = value
+    return out
+
+
+# ---- PROMPT TEXT ----
+
+def performance_summary(
+    cols: PostColumns,
+    top: int = 3,
+    min_posts: int = 5,
+    now: Optional[int] = None,
+    early: Optional[np.ndarray] = None,
+    early_days: float = 2,
+) -> str:
+    """
+    Performance-ranked insights for the ideation prompt. The recent trend
+    covers the 30 days before `now` (unix seconds; default: the current time);
+    with `early` (early_engagement() after `early_days`) it compares posts
+    at the same age instead of their lifetime totals.
+    """
+    n = len(cols)
+    if n == 0:
+        return "No historical posts available for analytics."
+
+    eng = cols.engagement
+    lines = [
+        f"You have {n} historical posts.",
+        f"Average likes per post: {cols.likes.mean():.1f}",
+        f"Average comments per post: {cols.comments.mean():.1f}",
+        "(engagement = likes + comments; index 1.00 = your average post)",
+    ]
+
+    by_type = engagement_by_type(cols)
+    if by_type:
+        lines.append("\nBest performing formats:")
+        for r in by_type:
+            lines.append(f"- {r['key']}: index {r['index']:.2f} over {r['posts']} posts")
+
+    # hour/weekday only mean something with enough posts per bucket
+    sections = [
+        ("Best posting hours (UTC):", engagement_by_hour(cols)),
+        ("Best weekdays:", engagement_by_weekday(cols)),
+    ]
+    for title, rows in sections:
+        rows = [r for r in rows if r["posts"] >= min_posts]
+        if len(rows) >= 2:
+            lines.append(f"\n{title}")
+            for r in rows[:top]:
+                lines.append(f"- {r['key']}: index {r['index']:.2f} over {r['posts']} posts")
+
+    lifts = hashtag_lift(cols, min_posts=min_posts)
+    if lifts:
+        lines.append("\nHashtags linked to higher engagement (lift vs posts without it, 95% range):")
+        for r in lifts[:top * 2]:
+            lines.append(
+                f"- {r['hashtag']}: x{r['lift']:.2f} ({r['ci_low']:.2f}-{r['ci_high']:.2f}) over {r['posts']} posts"
+            )
+        weak = [r for r in lifts if r["ci_high"] < 1.0]
+        if weak:
+            lines.append("Hashtags linked to lower engagement: " + ", ".join(r["hashtag"] for r in weak[-top:]))
+    elif len(cols.tag_names):
+        counts = np.bincount(cols.tag_ids, minlength=len(cols.tag_names))
+        most_used = np.argsort(-counts, kind="stable")[:top * 2]
+        lines.append("\nMost used hashtags (too few posts per hashtag to rank by performance yet):")
+        for t in most_used:
+            lines.append(f"- {cols.tag_names[t]}: used {counts[t]} times")
+
+    now = now if now is not None else int(time.time())
+    trend = recent_trend(cols, now=now, engagement=early) if early is not None else None
+    if trend:
+        lines.append(
+            f"\nLast 30 days: {trend['recent_avg']:.1f} avg engagement {early_days:g} days after posting "
+            f"over {trend['recent_posts']} posts ({trend['change']:+.0%} vs posts of the 30 days before)."
+        )
+    else:
+        trend = recent_trend(cols, now=now)
+        if trend:
+            lines.append(
+                f"\nLast 30 days: {trend['recent_avg']:.1f} avg engagement over {trend['recent_posts']} posts "
+                f"({trend['change']:+.0%} vs the 30 days before)."
+            )
+
+    return "\n".join(lines)
@@ -1,16 +1,27 @@
+import hashlib
 import json
+import time
 from pathlib import Path
 from collections import Counter, defaultdict
-from typing import Tuple
+from typing import Iterable, Iterator, List, Optional, Tuple
 
-from src.instagram.service import get_my_posts
+import numpy as np
+from sqlalchemy.exc import OperationalError
 
+from src.analytics.columnar import DAY, PostColumns, early_engagement, performance_summary
+from src.analytics.snapshot import columns_from_json, columns_from_raw, load_or_build
+from src.instagram.schemas import InstaPost
+from src.instagram.service import iter_my_posts
 
-def load_posts() -> list[dict]:
-    posts = get_my_posts()
-    # convert InstaPost → dict compatible with existing stats code
-    return [
-        {
+
+def iter_posts(limit: Optional[int] = None) -> Iterator[dict]:
+    """
+    Stream posts (newest first) as dicts compatible with the stats code.
+    Nothing beyond the current API page is held in memory.
+    """
+    for p in iter_my_posts(limit=limit):
+        # convert InstaPost → dict compatible with existing stats code
+        yield {
             "id": p.id,
             "type": p.type,
             "caption": p.caption,
@@ -19,17 +30,18 @@ def load_posts() -> list[dict]:
             "likes": p.likes,
             "comments": p.comments_count,
         }
-        for p in posts
-    ]
 
 
-def compute_basic_stats(posts: list[dict]) -> Tuple[str, dict]:
+def load_posts(limit: Optional[int] = None) -> list[dict]:
+    return list(iter_posts(limit=limit))
+
+
+def compute_basic_stats(posts: Iterable[dict]) -> Tuple[str, dict]:
     """
     Returns (summary_text, raw_stats_dict)
+    `posts` can be any iterable (e.g. iter_posts()), it is consumed in one pass.
     """
-    if not posts:
-        return "No historical posts available for analytics.", {}
-
+    n = 0
     total_likes = 0
     total_comments = 0
     type_counts = Counter()
@@ -37,6 +49,7 @@ def compute_basic_stats(posts: list[dict]) -> Tuple[str, dict]:
     likes_by_type = defaultdict(list)
 
     for p in posts:
+        n += 1
         likes = int(p.get("likes", 0) or 0)
         comments = int(p.get("comments", 0) or 0)
         p_type = p.get("type", "unknown")
@@ -49,7 +62,9 @@ def compute_basic_stats(posts: list[dict]) -> Tuple[str, dict]:
         for h in tags:
             hashtag_counts[h.lower()] += 1
 
-    n = len(posts)
+    if n == 0:
+        return "No historical posts available for analytics.", {}
+
     avg_likes = total_likes / n
     avg_comments = total_comments / n
 
@@ -91,10 +106,126 @@ def compute_basic_stats(posts: list[dict]) -> Tuple[str, dict]:
     return summary, raw_stats
 
 
+# ---- COLUMNAR POSTS ----
+# Analytics read posts as columns (analytics/columnar.py). They are loaded
+# from the on-disk snapshot (analytics/snapshot.py) when it was built from
+# the current source, so a cold start memory-maps arrays instead of
+# parsing every post.
+
+_columns_cache: Optional[Tuple[str, PostColumns]] = None
+
+
+def _source_signature() -> Optional[str]:
+    from src.instagram import service
+
+    if not service.USE_REAL_IG_API:
+        try:
+            st = service.POSTS_PATH.stat()
+        except FileNotFoundError:
+            return "file:missing"
+        return f"file:{service.POSTS_PATH.resolve()}:{st.st_mtime_ns}:{st.st_size}"
+    if service.USE_IG_MIRROR:
+        from src.instagram import sync
+
+        sync.ensure_fresh()
+        return sync.mirror_signature()
+    return None
+
+
+def _posts_digest(posts: List[InstaPost]) -> str:
+    digest = hashlib.sha1()
+    for p in posts:
+        digest.update(p.model_dump_json().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _build_columns() -> PostColumns:
+    from src.instagram import service
+
+    if not service.USE_REAL_IG_API:
+        if not service.POSTS_PATH.exists():
+            return columns_from_raw([])
+        return columns_from_json(service.POSTS_PATH)
+    return PostColumns.from_posts(iter_my_posts())
+
+
+def get_post_columns() -> PostColumns:
+    """
+    All posts as columns; the same object is returned until the source changes.
+    """
+    global _columns_cache
+    signature = _source_signature()
+    if signature is None:
+        # live API without the mirror: no cheap change signal, so the posts
+        # are re-read and the columns kept while their content is unchanged
+        posts = list(iter_my_posts())
+        signature = f"live:{_posts_digest(posts)}"
+        if _columns_cache is None or _columns_cache[0] != signature:
+            _columns_cache = (signature, PostColumns.from_posts(posts))
+        return _columns_cache[1]
+
+    if _columns_cache is None or _columns_cache[0] != signature:
+        _columns_cache = (signature, load_or_build(signature, _build_columns))
+    return _columns_cache[1]
+
+
+# ---- STORED ENGAGEMENT CURVES ----
+# In live mode analytics/insights_collector.py samples likes/comments of
+# recent posts into SQLite. The recent trend reads those samples to compare
+# posts at the same age, without calling the API.
+
+EARLY_ENGAGEMENT_DAYS = 2
+
+
+def _early_engagement(cols: PostColumns, now: int) -> Optional[np.ndarray]:
+    from src.instagram import service
+
+    if not service.USE_REAL_IG_API:
+        return None
+    # the trend compares the last 30 days with the 30 before
+    positions = np.flatnonzero(cols.created > now - 60 * DAY)
+    if not len(positions):
+        return None
+
+    from src.db.queries import get_engagement_curves
+
+    try:
+        curves = get_engagement_curves([str(cols.ids[i]) for i in positions])
+    except OperationalError:
+        # no insights table yet (collector never ran)
+        return None
+    samples = {
+        pid: [(rec.sampled_at, rec.likes + rec.comments) for rec in records]
+        for pid, records in curves.items() if records
+    }
+    if not samples:
+        return None
+    return early_engagement(cols, samples, EARLY_ENGAGEMENT_DAYS)
+
+
+# The summary is memoized per columns object, i.e. per source signature
+# (posts file mtime/size, mirror signature or live-posts digest), which is
+# the version counter for the posts. Running counters (sums, per-type likes,
+# hashtag counts) are not kept: the ranked summary needs per-post values
+# (hashtag lift with its 95% range, hour/weekday buckets, the 30-day trend),
+# which counters can't produce, and the columns are already memory-mapped.
+#
+# (columns, day, summary): the "last 30 days" trend moves with the date
+_performance_cache: Optional[Tuple[PostColumns, int, str]] = None
+
+
 def get_analytics_summary_for_prompt() -> str:
     """
     Public function: returns a human-readable analytics summary to feed into prompts.
+    Performance-ranked (see analytics/columnar.py); recomputed only when the
+    posts changed (or the day did), so repeated calls don't touch the posts.
     """
-    posts = load_posts()
-    summary, _ = compute_basic_stats(posts)
-    return summary
+    global _performance_cache
+    cols = get_post_columns()
+    now = int(time.time())
+    day = now // DAY
+    if _performance_cache is None or _performance_cache[0] is not cols or _performance_cache[1] != day:
+        early = _early_engagement(cols, now)
+        summary = performance_summary(cols, now=now, early=early, early_days=EARLY_ENGAGEMENT_DAYS)
+        _performance_cache = (cols, day, summary)
+    return _performance_cache[2]
@@ -0,0 +1,236 @@
+# src/analytics/hashtag_index.py
+#
+# Sparse hashtag co-occurrence / performance index built from post history.
+#
+# For every pair of hashtags used together it stores how often (count) and
+# the summed log1p(engagement) of those posts, as a CSR matrix over tag ids.
+# Recommending complements for a seed set is then one CSR row slice per
+# seed plus an argpartition, i.e. well under a millisecond.
+#
+# Build offline: python -m src.analytics.hashtag_index --out src/data/hashtag_index.npz
+import argparse
+import os
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.analytics.columnar import PostColumns
+from src.instagram.schemas import InstaPost
+
+HASHTAG_INDEX_PATH = Path(
+    os.getenv("HASHTAG_INDEX_PATH", str(Path(__file__).parent.parent / "data" / "hashtag_index.npz"))
+)
+# pseudo-count pulling a pair's performance towards the account average
+PERFORMANCE_PRIOR = 3.0
+
+
+def _normalize(tag: str) -> str:
+    tag = tag.strip().lower()
+    return tag if tag.startswith("#") else f"#{tag}"
+
+
+class HashtagIndex:
+
+    def __init__(
+        self,
+        tag_names: List[str],
+        tag_counts: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        pair_counts: np.ndarray,
+        pair_score_sums: np.ndarray,
+        tag_score_sums: np.ndarray,
+        global_mean: float,
+    ):
+        self.tag_names = tag_names
+        self.tag_ids = {t: i for i, t in enumerate(tag_names)}
+        self.tag_counts = tag_counts            # posts per tag
+        self.indptr = indptr                    # CSR over tag ids (diagonal excluded)
+        self.indices = indices
+        self.pair_counts = pair_counts
+        self.pair_score_sums = pair_score_sums  # sum of log1p(engagement) per pair
+        self.tag_score_sums = tag_score_sums
+        self.global_mean = global_mean
+
+    def __len__(self) -> int:
+        return len(self.tag_names)
+
+    # ---- building ----
+
+    @classmethod
+    def from_columns(cls, cols: PostColumns) -> "HashtagIndex":
+        n_tags = len(cols.tag_names)
+        score = np.log1p(cols.engagement.astype(np.float64))
+        global_mean = float(score.mean()) if len(cols) else 0.0
+
+        per_post = np.diff(cols.tag_indptr)
+        post_of_entry = np.repeat(np.arange(len(cols)), per_post)
+        tag_counts = np.bincount(cols.tag_ids, minlength=n_tags)
+        tag_score_sums = np.bincount(cols.tag_ids, weights=score[post_of_entry], minlength=n_tags)
+
+        # all ordered (a, b) pairs within each post, without loops:
+        # entry e of post p is paired with every entry of p
+        k = per_post[post_of_entry]
+        rows = np.repeat(cols.tag_ids, k)
+        first_entry = np.repeat(cols.tag_indptr[:-1][post_of_entry], k)
+        run_start = np.repeat(np.cumsum(k) - k, k)
+        cols_idx = first_entry + (np.arange(len(rows)) - run_start)
+        others = cols.tag_ids[cols_idx]
+        pair_post = np.repeat(post_of_entry, k)
+
+        keep = rows != others
+        rows, others, pair_post = rows[keep], others[keep], pair_post[keep]
+
+        keys = rows.astype(np.int64) * max(n_tags, 1) + others
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        pair_counts = np.bincount(inverse).astype(np.int32)
+        pair_score_sums = np.bincount(inverse, weights=score[pair_post])
+
+        row_of_pair = (uniq // max(n_tags, 1)).astype(np.int64)
+        indices = (uniq % max(n_tags, 1)).astype(np.int32)
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(row_of_pair, minlength=n_tags))])
+
+        return cls(
+            list(cols.tag_names), tag_counts, indptr, indices,
+            pair_counts, pair_score_sums, tag_score_sums, global_mean,
+        )
+
+    @classmethod
+    def from_posts(cls, posts: Iterable[InstaPost]) -> "HashtagIndex":
+        return cls.from_columns(PostColumns.from_posts(posts))
+
+    def save(self, path: Path = HASHTAG_INDEX_PATH) -> None:
+        np.savez_compressed(
+            path,
+            tag_names=np.array(self.tag_names, dtype=str),
+            tag_counts=self.tag_counts,
+            indptr=self.indptr,
+            indices=self.indices,
+            pair_counts=self.pair_counts,
+            pair_score_sums=self.pair_score_sums,
+            tag_score_sums=self.tag_score_sums,
+            global_mean=np.array(self.global_mean),
+        )
+
+    @classmethod
+    def load(cls, path: Path = HASHTAG_INDEX_PATH) -> "HashtagIndex":
+        with np.load(path) as data:
+            return cls(
+                data["tag_names"].tolist(), data["tag_counts"], data["indptr"], data["indices"],
+                data["pair_counts"], data["pair_score_sums"], data["tag_score_sums"],
+                float(data["global_mean"]),
+            )
+
+    # ---- queries ----
+
+    def _lift(self, score_sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        # shrunk mean log1p(engagement) relative to the account, as a ratio
+        shrunk = (score_sums + PERFORMANCE_PRIOR * self.global_mean) / (counts + PERFORMANCE_PRIOR)
+        return np.exp(shrunk - self.global_mean)
+
+    def top_performing(self, k: int = 10, min_posts: int = 2) -> List[Tuple[str, float]]:
+        """
+        Hashtags with the best (shrunk) engagement lift on their own.
+        """
+        if not len(self):
+            return []
+        lift = self._lift(self.tag_score_sums, self.tag_counts)
+        lift = np.where(self.tag_counts >= min_posts, lift, 0.0)
+        order = np.argsort(-lift, kind="stable")[:k]
+        return [(self.tag_names[i], float(lift[i])) for i in order if lift[i] > 0]
+
+    def complements(self, seeds: Sequence[str], k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Top-k hashtags to add to `seeds`: for every seed s, candidate c scores
+        P(c | s) * lift(posts with s and c), summed over seeds. Unknown seeds
+        are ignored; with no known seed the best performers are returned.
+        """
+        seed_ids = [self.tag_ids[t] for t in dict.fromkeys(_normalize(s) for s in seeds) if t in self.tag_ids]
+        if not seed_ids:
+            return self.top_performing(k)
+
+        scores = np.zeros(len(self))
+        for s in seed_ids:
+            lo, hi = self.indptr[s], self.indptr[s + 1]
+            if lo == hi:
+                continue
+            cand = self.indices[lo:hi]
+            counts = self.pair_counts[lo:hi]
+            p_given_seed = counts / self.tag_counts[s]
+            scores[cand] += p_given_seed * self._lift(self.pair_score_sums[lo:hi], counts)
+        scores[seed_ids] = 0.0
+
+        nonzero = np.count_nonzero(scores)
+        if nonzero == 0:
+            return self.top_performing(k)
+        k = min(k, nonzero)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.tag_names[i], float(scores[i])) for i in top]
+
+    def match_text(self, text: str) -> List[str]:
+        """
+        Known hashtags that appear in free text as a word or as two/three
+        adjacent words ("anime art" -> #animeart). Used to seed complements()
+        from an idea description.
+        """
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        found = []
+        for size in (1, 2, 3):
+            for i in range(len(words) - size + 1):
+                tag = "#" + "".join(words[i:i + size])
+                if tag in self.tag_ids:
+                    found.append(tag)
+        return list(dict.fromkeys(found))
+
+    def recommend_for_text(self, text: str, k: int = 5) -> List[str]:
+        """
+        Hashtags for a piece of text: the known hashtags it mentions, then
+        complements, up to k in total.
+        """
+        seeds = self.match_text(text)[:k]
+        extra = self.complements(seeds, k=k - len(seeds)) if len(seeds) < k else []
+        return seeds + [tag for tag, _ in extra]
+
+
+# ---- SHARED INSTANCE ----
+
+_index_cache: Optional[Tuple[object, HashtagIndex]] = None
+
+
+def get_hashtag_index() -> HashtagIndex:
+    """
+    The offline-built index at HASHTAG_INDEX_PATH if it exists, otherwise
+    one built from the post history (rebuilt only when the posts changed).
+    """
+    global _index_cache
+    if HASHTAG_INDEX_PATH.exists():
+        key = ("file", HASHTAG_INDEX_PATH.stat().st_mtime_ns)
+        if _index_cache is None or _index_cache[0] != key:
+            _index_cache = (key, HashtagIndex.load(HASHTAG_INDEX_PATH))
+        return _index_cache[1]
+
+    from src.analytics.engine import get_post_columns
+
+    cols = get_post_columns()
+    if _index_cache is None or _index_cache[0] is not cols:
+        _index_cache = (cols, HashtagIndex.from_columns(cols))
+    return _index_cache[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the hashtag co-occurrence index")
+    parser.add_argument("--out", default=str(HASHTAG_INDEX_PATH))
+    args = parser.parse_args()
+
+    from src.analytics.engine import get_post_columns
+
+    index = HashtagIndex.from_columns(get_post_columns())
+    index.save(Path(args.out))
+    print(f"{len(index)} hashtags, {len(index.indices)} pairs -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
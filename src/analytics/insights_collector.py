@@ -0,0 +1,197 @@
+# src/analytics/insights_collector.py
+#
+# Samples likes/comments of recent posts into InsightSampleRecord on a
+# decaying schedule (hourly while a post is fresh, rarely later) and
+# downsamples old samples, so engagement curves are read locally.
+#
+# Run: python -m src.analytics.insights_collector --loop
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+
+from src.db.models import InsightSampleRecord, get_session
+from src.instagram.service import USE_REAL_IG_API, get_posts_insights, get_posts_insights_live, iter_my_posts
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# (max post age in seconds, sampling interval in seconds); older posts are not sampled
+SAMPLE_SCHEDULE = [
+    (2 * DAY, 1 * HOUR),
+    (7 * DAY, 6 * HOUR),
+    (30 * DAY, 1 * DAY),
+    (90 * DAY, 7 * DAY),
+]
+
+# raw samples older than this are collapsed to one per bucket
+DOWNSAMPLE_AFTER = 7 * DAY
+DOWNSAMPLE_BUCKET = 1 * DAY
+
+
+def sample_interval(age_seconds: float) -> Optional[int]:
+    """
+    How often a post of the given age should be sampled (None = stop).
+    """
+    for max_age, interval in SAMPLE_SCHEDULE:
+        if age_seconds < max_age:
+            return interval
+    return None
+
+
+def _epoch(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _last_sampled(post_ids: List[str]) -> Dict[str, int]:
+    with get_session() as session:
+        stmt = (
+            select(InsightSampleRecord.post_id, func.max(InsightSampleRecord.sampled_at))
+            .where(InsightSampleRecord.post_id.in_(post_ids))
+            .group_by(InsightSampleRecord.post_id)
+        )
+        return dict(session.exec(stmt).all())
+
+
+def due_posts(now: Optional[int] = None) -> List[str]:
+    """
+    Ids of posts whose next sample is due according to SAMPLE_SCHEDULE.
+    """
+    now = now or int(time.time())
+    oldest_sampled = now - SAMPLE_SCHEDULE[-1][0]
+
+    candidates = {}
+    for p in iter_my_posts():
+        created = _epoch(p.created_at)
+        if created < oldest_sampled:
+            # newest first, nothing older needs sampling
+            break
+        candidates[p.id] = created
+
+    if not candidates:
+        return []
+
+    last = _last_sampled(list(candidates))
+    due = []
+    for pid, created in candidates.items():
+        interval = sample_interval(now - created)
+        if interval is None:
+            continue
+        if pid not in last or now - last[pid] >= interval:
+            due.append(pid)
+    return due
+
+
+def collect_due(now: Optional[int] = None) -> int:
+    """
+    Fetch current insights for due posts (batched live calls, bypassing the
+    mirror) and append one sample per post. Returns the number of samples written.
+    """
+    now = now or int(time.time())
+    due = due_posts(now)
+    if not due:
+        return 0
+
+    # always read live metrics: the mirror (USE_IG_MIRROR) only refreshes
+    # them periodically, so samples taken from it would repeat stale values
+    insights = get_posts_insights_live(due) if USE_REAL_IG_API else get_posts_insights(due)
+    rows = [
+        {
+            "post_id": ins.post_id,
+            "sampled_at": now,
+            "likes": ins.likes,
+            "comments": ins.comments,
+            "resolution": 0,
+        }
+        for ins in insights.values()
+    ]
+    if not rows:
+        return 0
+
+    with get_session() as session:
+        stmt = sqlite_insert(InsightSampleRecord).on_conflict_do_nothing()
+        session.execute(stmt, rows)
+        session.commit()
+    return len(rows)
+
+
+def downsample(
+    older_than: int = DOWNSAMPLE_AFTER,
+    bucket: int = DOWNSAMPLE_BUCKET,
+    now: Optional[int] = None,
+) -> int:
+    """
+    Keep only the last raw sample per post per `bucket` for samples older
+    than `older_than` seconds. Returns the number of rows removed.
+    """
+    now = now or int(time.time())
+    cutoff = now - older_than
+    table = InsightSampleRecord.__tablename__
+    params = {"cutoff": cutoff, "bucket": bucket}
+
+    with get_session() as session:
+        result = session.execute(
+            text(
+                f"""
+                DELETE FROM {table}
+                WHERE resolution = 0 AND sampled_at < :cutoff
+                  AND (post_id, sampled_at) NOT IN (
+                      SELECT post_id, MAX(sampled_at) FROM {table}
+                      WHERE resolution = 0 AND sampled_at < :cutoff
+                      GROUP BY post_id, sampled_at / :bucket
+                  )
+                """
+            ),
+            params,
+        )
+        session.execute(
+            text(
+                f"UPDATE {table} SET resolution = :bucket "
+                f"WHERE resolution = 0 AND sampled_at < :cutoff"
+            ),
+            params,
+        )
+        session.commit()
+        return result.rowcount or 0
+
+
+def run_collector(poll_seconds: float = 300.0) -> None:
+    """
+    Sample due posts every `poll_seconds` and downsample once a day.
+    """
+    last_downsample = 0.0
+    while True:
+        try:
+            written = collect_due()
+            if written:
+                print(f"insights collector: {written} samples written")
+            if time.time() - last_downsample >= DAY:
+                removed = downsample()
+                last_downsample = time.time()
+                if removed:
+                    print(f"insights collector: {removed} old samples downsampled")
+        except Exception as e:
+            print("insights collector error:", e)
+        time.sleep(poll_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect post insights time series")
+    parser.add_argument("--loop", action="store_true", help="keep running")
+    parser.add_argument("--poll", type=float, default=300.0, help="seconds between checks")
+    args = parser.parse_args()
+
+    if args.loop:
+        run_collector(args.poll)
+    else:
+        print(f"{collect_due()} samples written, {downsample()} downsampled")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# src/analytics/snapshot.py
+#
+# On-disk columnar snapshot of the post history, so analytics cold-start by
+# memory-mapping a few .npy files instead of parsing posts.json into pydantic
+# objects and then into dicts.
+#
+# Layout of a snapshot directory:
+#   meta.json                      format version, source signature, type/tag tables
+#   likes.npy comments.npy         int64 per post
+#   created.npy                    int64 unix seconds (UTC)
+#   type_codes.npy                 int32 index into meta["type_names"]
+#   tag_indptr.npy tag_ids.npy     CSR hashtags, ids index into meta["tag_names"]
+#   ids.data.npy ids.offsets.npy   UTF-8 blob + offsets (same for captions)
+#
+# Benchmark: python -m src.analytics.bench_snapshot --posts 100000
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.analytics.columnar import PostColumns
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_DIR = Path(
+    os.getenv("ARTFLOW_SNAPSHOT_DIR", str(Path(__file__).parent.parent / "data" / "posts_snapshot"))
+)
+
+_ARRAYS = ("likes", "comments", "created", "type_codes", "tag_indptr", "tag_ids")
+
+
+class StringColumn:
+    """
+    Read-only list of strings stored as one UTF-8 buffer plus offsets;
+    strings are decoded only when accessed.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Sequence[str]) -> "StringColumn":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self) -> List[str]:
+        return list(self)
+
+
+# ---- BUILDING FROM posts.json ----
+
+def _parse_raw(raw: dict, now: int) -> tuple:
+    created_at_str = raw.get("created_at") or raw.get("createdAt") or ""
+    try:
+        dt = datetime.fromisoformat(created_at_str)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        ts = int(dt.timestamp())
+    except Exception:
+        ts = now
+
+    hashtags = raw.get("hashtags") or []
+    if isinstance(hashtags, str):
+        hashtags = [h for h in hashtags.split() if h.startswith("#")]
+
+    return (
+        ts,
+        str(raw.get("id")),
+        raw.get("caption", "") or "",
+        raw.get("type", "unknown") or "unknown",
+        int(raw.get("likes", 0) or 0),
+        int(raw.get("comments", 0) or 0),
+        hashtags,
+    )
+
+
+def columns_from_raw(raw_posts: Iterable[dict]) -> PostColumns:
+    """
+    posts.json records straight into columns, without building InstaPost
+    objects. Same parsing rules and newest-first order as
+    instagram.service (first record wins on duplicate ids).
+    """
+    now = int(datetime.now(timezone.utc).timestamp())
+    parsed = {}
+    for raw in raw_posts:
+        post = _parse_raw(raw, now)
+        parsed.setdefault(post[1], post)
+    posts = sorted(parsed.values(), key=lambda p: p[0], reverse=True)
+
+    ids, captions, created, likes, comments, type_codes = [], [], [], [], [], []
+    tag_indptr, tag_ids = [0], []
+    types: Dict[str, int] = {}
+    tags: Dict[str, int] = {}
+    for ts, post_id, caption, p_type, n_likes, n_comments, hashtags in posts:
+        ids.append(post_id)
+        captions.append(caption)
+        created.append(ts)
+        likes.append(n_likes)
+        comments.append(n_comments)
+        type_codes.append(types.setdefault(p_type, len(types)))
+        for tag in dict.fromkeys(h.lower() for h in hashtags):
+            tag_ids.append(tags.setdefault(tag, len(tags)))
+        tag_indptr.append(len(tag_ids))
+
+    return PostColumns(
+        ids=StringColumn.from_strings(ids),
+        type_codes=np.array(type_codes, dtype=np.int32),
+        type_names=list(types),
+        created=np.array(created, dtype=np.int64),
+        likes=np.array(likes, dtype=np.int64),
+        comments=np.array(comments, dtype=np.int64),
+        tag_indptr=np.array(tag_indptr, dtype=np.int64),
+        tag_ids=np.array(tag_ids, dtype=np.int32),
+        tag_names=list(tags),
+        captions=StringColumn.from_strings(captions),
+    )
+
+
+def columns_from_json(path: Path) -> PostColumns:
+    with open(path, "r", encoding="utf-8") as f:
+        return columns_from_raw(json.load(f))
+
+
+# ---- WRITE / LOAD ----
+
+def _as_string_column(values) -> StringColumn:
+    if isinstance(values, StringColumn):
+        return values
+    return StringColumn.from_strings([str(v) for v in values])
+
+
+# the rmtree + rename that replaces a snapshot is not atomic on its own
+_swap_lock = threading.Lock()
+
+
+def write_snapshot(cols: PostColumns, source: Optional[str] = None, directory: Path = SNAPSHOT_DIR) -> Path:
+    """
+    Write `cols` as a snapshot directory. `source` identifies the data it
+    was built from, so stale snapshots can be detected on load.
+    """
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    # unique per call, so concurrent writers never share a temp directory
+    tmp = Path(tempfile.mkdtemp(prefix=f"{directory.name}.tmp-", dir=directory.parent))
+    try:
+        for name in _ARRAYS:
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(getattr(cols, name)))
+        strings = {"ids": cols.ids, "captions": cols.captions if cols.captions is not None else [""] * len(cols)}
+        for name, values in strings.items():
+            column = _as_string_column(values)
+            np.save(tmp / f"{name}.data.npy", np.ascontiguousarray(column.data))
+            np.save(tmp / f"{name}.offsets.npy", column.offsets)
+
+        meta = {
+            "format": SNAPSHOT_FORMAT,
+            "source": source,
+            "count": len(cols),
+            "type_names": cols.type_names,
+            "tag_names": cols.tag_names,
+        }
+        with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        with _swap_lock:
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(tmp, directory)
+    finally:
+        # only left behind if writing failed
+        shutil.rmtree(tmp, ignore_errors=True)
+    return directory
+
+
+def read_meta(directory: Path = SNAPSHOT_DIR) -> Optional[dict]:
+    try:
+        with open(Path(directory) / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return meta if meta.get("format") == SNAPSHOT_FORMAT else None
+
+
+def load_snapshot(directory: Path = SNAPSHOT_DIR, mmap: bool = True) -> PostColumns:
+    """
+    Open a snapshot; with `mmap=True` arrays are memory-mapped read-only,
+    so only pages that are actually touched are read from disk.
+    """
+    directory = Path(directory)
+    meta = read_meta(directory)
+    if meta is None:
+        raise FileNotFoundError(f"No snapshot in {directory}")
+    mode = "r" if mmap else None
+    arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mode) for name in _ARRAYS}
+    strings = {
+        name: StringColumn(
+            np.load(directory / f"{name}.data.npy", mmap_mode=mode),
+            np.load(directory / f"{name}.offsets.npy", mmap_mode=mode),
+        )
+        for name in ("ids", "captions")
+    }
+    return PostColumns(
+        ids=strings["ids"],
+        type_names=meta["type_names"],
+        tag_names=meta["tag_names"],
+        captions=strings["captions"],
+        **arrays,
+    )
+
+
+def load_or_build(
+    source: str,
+    build,
+    directory: Path = SNAPSHOT_DIR,
+) -> PostColumns:
+    """
+    The snapshot in `directory` if it was built from `source`, otherwise
+    `build()` written as the new snapshot.
+    """
+    meta = read_meta(directory)
+    if meta is not None and meta.get("source") == source:
+        return load_snapshot(directory)
+    cols = build()
+    try:
+        write_snapshot(cols, source=source, directory=directory)
+    except OSError as e:
+        print("Could not write posts snapshot:", e)
+    return cols
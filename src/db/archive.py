@@ -0,0 +1,282 @@
+# src/db/archive.py
+#
+# Moves log rows older than a retention horizon out of artflow.db into
+# zstd-compressed Parquet files, one directory per table and month:
+#
+#   <ARCHIVE_DIR>/<table>/month=YYYY-MM/part-<first id>-<last id>-<uuid>.parquet
+#
+# Files are written before the rows are deleted, so a crash can at worst
+# leave a row in both places; readers drop duplicate rows. Ids are plain
+# INTEGER PRIMARY KEYs that SQLite hands out again once a table has been
+# emptied, so a row is identified by (id, created_at), never by id alone. History queries in
+# src.db.queries fall through to these files when a page or date range goes
+# past what is still in SQLite.
+#
+# Full-text search (src/db/search.py) only covers rows still in SQLite:
+# archived ideas, captions and replies are no longer found by it. The
+# (post_id, comment_id) keys of archived reply suggestions are kept in
+# ArchivedReplyKeyRecord so those comments are not treated as unreplied.
+#
+# Run: python -m src.db.archive --days 180 --vacuum
+import argparse
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Boolean, DateTime, Integer, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+
+from src.db.models import (
+    ARCHIVE_DIR,
+    ArchivedReplyKeyRecord,
+    engine,
+    get_session,
+    IdeaRecord,
+    CaptionRecord,
+    ReplySuggestionRecord,
+)
+
+RETENTION_DAYS = int(os.getenv("ARTFLOW_RETENTION_DAYS", "180"))
+ARCHIVE_CHUNK = 10_000
+
+# tables that are archived; normalized child rows and FTS entries of the
+# archived rows are removed with them (FK cascade / triggers), the JSON
+# columns in the archive keep the full content. CommentRecord stays in
+# SQLite: it is the (post_id, comment_id) dedup set for ingestion.
+ARCHIVED_MODELS = {
+    model.__tablename__: model
+    for model in (IdeaRecord, CaptionRecord, ReplySuggestionRecord)
+}
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def row_key(row_id: int, created_at: datetime) -> Tuple[int, datetime]:
+    """
+    Identity of a log row across SQLite and the archive (ids get reused).
+    """
+    return row_id, _as_utc(created_at)
+
+
+def _month(dt: datetime) -> str:
+    return f"{dt.year:04d}-{dt.month:02d}"
+
+
+def _arrow_schema(model) -> pa.Schema:
+    fields = []
+    for column in model.__table__.columns:
+        # look through TypeDecorators (newer SQLModel wraps DateTime)
+        sql_type = getattr(column.type, "impl", column.type)
+        if isinstance(sql_type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC")
+        elif isinstance(sql_type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(sql_type, Integer):
+            arrow_type = pa.int64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type, nullable=column.nullable or column.primary_key))
+    return pa.schema(fields)
+
+
+def table_dir(table: str, archive_dir: Path = ARCHIVE_DIR) -> Path:
+    return Path(archive_dir) / table
+
+
+def has_archive(table: str, archive_dir: Path = ARCHIVE_DIR) -> bool:
+    return table_dir(table, archive_dir).is_dir()
+
+
+def archived_months(table: str, archive_dir: Path = ARCHIVE_DIR) -> List[str]:
+    """
+    "YYYY-MM" partitions present for `table`, oldest first.
+    """
+    root = table_dir(table, archive_dir)
+    if not root.is_dir():
+        return []
+    return sorted(p.name[len("month="):] for p in root.glob("month=*") if p.is_dir())
+
+
+# ---- WRITING ----
+
+def _write_partition(model, month: str, rows: List[dict], archive_dir: Path) -> Path:
+    directory = table_dir(model.__tablename__, archive_dir) / f"month={month}"
+    directory.mkdir(parents=True, exist_ok=True)
+    # the suffix keeps a later run with reused ids from replacing this file
+    path = directory / f"part-{rows[0]['id']}-{rows[-1]['id']}-{uuid.uuid4().hex[:12]}.parquet"
+    tmp = path.with_suffix(".parquet.tmp")
+    table = pa.Table.from_pylist(rows, schema=_arrow_schema(model))
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+    return path
+
+
+def archive_table(
+    model,
+    cutoff: datetime,
+    archive_dir: Path = ARCHIVE_DIR,
+    chunk_size: int = ARCHIVE_CHUNK,
+) -> int:
+    """
+    Move rows of `model` created before `cutoff` to the archive.
+    Returns the number of rows moved.
+    """
+    columns = [c.name for c in model.__table__.columns]
+    moved = 0
+    while True:
+        with get_session() as session:
+            stmt = (
+                select(model)
+                .where(model.created_at < cutoff)
+                .order_by(model.id)
+                .limit(chunk_size)
+            )
+            records = list(session.exec(stmt))
+            if not records:
+                break
+
+            by_month: Dict[str, List[dict]] = {}
+            for rec in records:
+                row = {name: getattr(rec, name) for name in columns}
+                row["created_at"] = _as_utc(row["created_at"])
+                by_month.setdefault(_month(row["created_at"]), []).append(row)
+
+            for month, rows in by_month.items():
+                _write_partition(model, month, rows, archive_dir)
+
+            if model is ReplySuggestionRecord:
+                keys = [
+                    {"post_id": rec.post_id, "comment_id": rec.comment_id}
+                    for rec in records if rec.post_id is not None
+                ]
+                if keys:
+                    session.execute(sqlite_insert(ArchivedReplyKeyRecord).on_conflict_do_nothing(), keys)
+
+            ids = [rec.id for rec in records]
+            session.execute(
+                text(f"DELETE FROM {model.__tablename__} WHERE id IN ({', '.join(map(str, ids))})")
+            )
+            session.commit()
+            moved += len(records)
+    return moved
+
+
+def archive_old_rows(
+    older_than_days: int = RETENTION_DAYS,
+    now: Optional[datetime] = None,
+    archive_dir: Path = ARCHIVE_DIR,
+    vacuum: bool = False,
+) -> Dict[str, int]:
+    """
+    Archive every log table; returns moved row counts per table. With
+    `vacuum=True` the DB file is compacted afterwards (takes a write lock).
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=older_than_days)
+    moved = {
+        table: archive_table(model, cutoff, archive_dir)
+        for table, model in ARCHIVED_MODELS.items()
+    }
+    if vacuum and any(moved.values()):
+        with engine.connect() as conn:
+            conn.execute(text("VACUUM"))
+    return moved
+
+
+# ---- READING ----
+
+def _read_month(table: str, month: str, archive_dir: Path, filters: Optional[dict]) -> List[dict]:
+    directory = table_dir(table, archive_dir) / f"month={month}"
+    files = sorted(directory.glob("*.parquet"))
+    if not files:
+        return []
+    arrow_filters = [(k, "=", v) for k, v in (filters or {}).items()] or None
+    tables = [pq.read_table(f, filters=arrow_filters) for f in files]
+    rows = pa.concat_tables(tables).to_pylist()
+    seen = set()
+    unique = []
+    for row in rows:
+        key = row_key(row["id"], row["created_at"])
+        if key not in seen:
+            seen.add(key)
+            unique.append(row)
+    return unique
+
+
+def iter_archived(
+    table: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    filters: Optional[dict] = None,
+    newest_first: bool = True,
+    archive_dir: Path = ARCHIVE_DIR,
+) -> Iterator[dict]:
+    """
+    Archived rows with start <= created_at < end, one month partition at a
+    time (months outside the range are not opened). `filters` are equality
+    filters on columns, e.g. {"idea_id": "idea_3"}.
+    """
+    start = _as_utc(start) if start else None
+    end = _as_utc(end) if end else None
+    months = archived_months(table, archive_dir)
+    if start:
+        months = [m for m in months if m >= _month(start)]
+    if end:
+        months = [m for m in months if m <= _month(end)]
+    if newest_first:
+        months.reverse()
+
+    for month in months:
+        rows = _read_month(table, month, archive_dir, filters)
+        rows = [
+            r for r in rows
+            if (start is None or r["created_at"] >= start) and (end is None or r["created_at"] < end)
+        ]
+        rows.sort(key=lambda r: (r["created_at"], r["id"]), reverse=newest_first)
+        yield from rows
+
+
+def read_archived_before(
+    table: str,
+    limit: int,
+    before: Optional[Tuple[datetime, int]] = None,
+    filters: Optional[dict] = None,
+    archive_dir: Path = ARCHIVE_DIR,
+) -> List[dict]:
+    """
+    Up to `limit` archived rows ordered by (created_at, id) descending and
+    strictly before the `before` key; the archive side of keyset pagination.
+    """
+    key = (_as_utc(before[0]), before[1]) if before else None
+    rows: List[dict] = []
+    end = key[0] + timedelta(microseconds=1) if key else None
+    for row in iter_archived(table, end=end, filters=filters, archive_dir=archive_dir):
+        if key and (row["created_at"], row["id"]) >= key:
+            continue
+        rows.append(row)
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old log rows to Parquet")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="keep this many days in SQLite")
+    parser.add_argument("--dir", default=str(ARCHIVE_DIR), help="archive directory")
+    parser.add_argument("--vacuum", action="store_true", help="compact the DB file afterwards")
+    args = parser.parse_args()
+
+    moved = archive_old_rows(args.days, archive_dir=Path(args.dir), vacuum=args.vacuum)
+    for table, count in moved.items():
+        print(f"{table}: {count} rows archived")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# src/db/bench_logging.py
+#
+# Rows/sec of the logging write path on a throwaway SQLite file.
+# Run: python -m src.db.bench_logging --rows 20000
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark db.logging write throughput")
+    parser.add_argument("--rows", type=int, default=20000, help="comments (and as many replies) per run")
+    parser.add_argument("--batch", type=int, default=500, help="comments per log call")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="artflow-bench-")
+    # models reads this at import time
+    os.environ["ARTFLOW_DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+
+    from src.db.logging import log_comments_and_replies
+    from src.db.models import CommentRecord, ReplySuggestionRecord, get_session, init_db
+    from src.utils.schemas import Comment, ReplyBatch, ReplySuggestion
+
+    init_db()
+
+    def make_batch(offset: int, n: int):
+        comments = [Comment(id=f"c{offset + i}", text=f"comment {offset + i}", author="fan") for i in range(n)]
+        replies = ReplyBatch(
+            post_id="bench_post",
+            replies=[
+                ReplySuggestion(comment_id=c.id, original_comment=c.text, suggestions=["thanks!", "appreciate it 🖤"])
+                for c in comments
+            ],
+        )
+        return comments, replies
+
+    batches = [make_batch(i, min(args.batch, args.rows - i)) for i in range(0, args.rows, args.batch)]
+    total_rows = 2 * args.rows
+
+    # baseline: one ORM object per row, as the logging functions used to do
+    start = time.perf_counter()
+    for comments, replies in batches:
+        with get_session() as session:
+            for c in comments:
+                session.add(CommentRecord(post_id="bench_post", comment_id=c.id, text=c.text, author=c.author))
+            for r in replies.replies:
+                session.add(ReplySuggestionRecord(
+                    post_id="bench_post",
+                    comment_id=r.comment_id,
+                    original_comment=r.original_comment,
+                    suggestions_json="[]",
+                ))
+            session.commit()
+    per_object = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for comments, replies in batches:
+        log_comments_and_replies(comments, replies, post_id="bench_post")
+    bulk = time.perf_counter() - start
+
+    print(f"rows per run: {total_rows} ({len(batches)} log calls)")
+    print(f"per-object session.add : {total_rows / per_object:10.0f} rows/sec ({per_object:.2f}s)")
+    print(f"bulk insert (logging)  : {total_rows / bulk:10.0f} rows/sec ({bulk:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,105 @@
 import json
 from typing import List, Optional
 
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+
 from src.db.models import (
     get_session,
+    utc_now,
     IdeaRecord,
     CaptionRecord,
     CommentRecord,
     ReplySuggestionRecord,
+    CaptionOptionRecord,
+    CaptionHashtagRecord,
+    ReplySuggestionOptionRecord,
 )
 
+from src.instagram.schemas import InstaComment
 from src.utils.schemas import ArtIdeaSet, ArtIdea, CaptionSet, Comment, ReplyBatch
 
 
+# All writers build plain row dicts and insert them with one executemany
+# per table (ORM bulk insert) instead of adding objects one by one.
+# The _write_* helpers take an open session so several log calls can
+# share one transaction.
+
+def _bulk_insert(session, model, rows: List[dict]) -> None:
+    if rows:
+        session.execute(insert(model), rows)
+
+
+def _bulk_insert_ids(session, model, rows: List[dict]) -> List[int]:
+    """
+    Like _bulk_insert, but returns the new primary keys in row order
+    (needed to write the normalized child rows).
+    """
+    if not rows:
+        return []
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(session.execute(stmt, rows).scalars())
+
+
+def normalize_hashtag(tag: str) -> str:
+    return tag.strip().lstrip("#").lower()
+
+
+def _caption_child_rows(caption_record_id: int, captions: List[str], hashtags: List[str]):
+    option_rows = [
+        {"caption_record_id": caption_record_id, "position": i, "text": text}
+        for i, text in enumerate(captions)
+    ]
+    hashtag_rows = []
+    for i, tag in enumerate(hashtags):
+        tag = normalize_hashtag(tag)
+        if tag:
+            hashtag_rows.append({"caption_record_id": caption_record_id, "position": i, "tag": tag})
+    return option_rows, hashtag_rows
+
+
+def _suggestion_child_rows(reply_suggestion_id: int, suggestions: List[str]) -> List[dict]:
+    return [
+        {"reply_suggestion_id": reply_suggestion_id, "position": i, "text": text}
+        for i, text in enumerate(suggestions)
+    ]
+
+
+def _dedupe_rows(rows: List[dict], keys=("post_id", "comment_id")) -> List[dict]:
+    # a single upsert statement must not hit the same key twice; last one wins
+    by_key = {tuple(r[k] for k in keys): r for r in rows}
+    return list(by_key.values())
+
+
 # ---- IDEA LOGGING ----
 
+def _write_idea_set(
+    session,
+    idea_set: ArtIdeaSet,
+    user_hint: Optional[str] = None,
+    source: str = "cli",
+) -> None:
+    now = utc_now()
+    rows = [
+        {
+            "idea_id": idea.id,
+            "title": idea.title,
+            "drawing_prompt": idea.drawing_prompt,
+            "style_direction": idea.style_direction,
+            "why_it_fits_you": idea.why_it_fits_you,
+            "recommended_format": idea.recommended_format,
+            "difficulty": idea.difficulty,
+            "mood_or_focus": idea_set.mood_or_focus,
+            "user_hint": user_hint,
+            "source": source,
+            "created_at": now,
+        }
+        for idea in idea_set.ideas
+    ]
+    _bulk_insert(session, IdeaRecord, rows)
+
+
 def log_idea_set(
     idea_set: ArtIdeaSet,
     user_hint: Optional[str] = None,
@@ -23,25 +109,36 @@ def log_idea_set(
     Store all generated ideas in the DB.
     """
     with get_session() as session:
-        for idea in idea_set.ideas:
-            record = IdeaRecord(
-                idea_id=idea.id,
-                title=idea.title,
-                drawing_prompt=idea.drawing_prompt,
-                style_direction=idea.style_direction,
-                why_it_fits_you=idea.why_it_fits_you,
-                recommended_format=idea.recommended_format,
-                difficulty=idea.difficulty,
-                mood_or_focus=idea_set.mood_or_focus,
-                user_hint=user_hint,
-                source=source,
-            )
-            session.add(record)
+        _write_idea_set(session, idea_set, user_hint=user_hint, source=source)
         session.commit()
 
 
 # ---- CAPTION LOGGING ----
 
+def _write_caption_set(
+    session,
+    idea: ArtIdea,
+    caption_set: CaptionSet,
+) -> None:
+    row = {
+        "idea_id": idea.id,
+        "captions_json": json.dumps(caption_set.captions, ensure_ascii=False),
+        "hashtags_json": json.dumps(caption_set.hashtags, ensure_ascii=False),
+        "timelapse_tips_json": (
+            json.dumps(caption_set.timelapse_tips, ensure_ascii=False)
+            if caption_set.timelapse_tips is not None
+            else None
+        ),
+        "created_at": utc_now(),
+    }
+    (caption_record_id,) = _bulk_insert_ids(session, CaptionRecord, [row])
+    option_rows, hashtag_rows = _caption_child_rows(
+        caption_record_id, caption_set.captions, caption_set.hashtags
+    )
+    _bulk_insert(session, CaptionOptionRecord, option_rows)
+    _bulk_insert(session, CaptionHashtagRecord, hashtag_rows)
+
+
 def log_caption_set(
     idea: ArtIdea,
     caption_set: CaptionSet,
@@ -50,49 +147,232 @@ def log_caption_set(
     Store the captions & hashtags for a given idea.
     """
     with get_session() as session:
-        record = CaptionRecord(
-            idea_id=idea.id,
-            captions_json=json.dumps(caption_set.captions, ensure_ascii=False),
-            hashtags_json=json.dumps(caption_set.hashtags, ensure_ascii=False),
-            timelapse_tips_json=(
-                json.dumps(caption_set.timelapse_tips, ensure_ascii=False)
-                if caption_set.timelapse_tips is not None
-                else None
-            ),
-        )
-        session.add(record)
+        _write_caption_set(session, idea, caption_set)
         session.commit()
 
 
 # ---- ENGAGEMENT LOGGING ----
 
+def _post_key(post_id: Optional[str]) -> str:
+    # "" for "no post" so that the (post_id, comment_id) unique index applies
+    return post_id or ""
+
+
+def _reply_rows(reply_batch: ReplyBatch, post_id: Optional[str], now) -> List[dict]:
+    return [
+        {
+            "post_id": _post_key(post_id or reply_batch.post_id),
+            "comment_id": r.comment_id,
+            "original_comment": r.original_comment,
+            "suggestions_json": json.dumps(r.suggestions, ensure_ascii=False),
+            "created_at": now,
+        }
+        for r in reply_batch.replies
+    ]
+
+
+def _upsert_replies(session, reply_batch: ReplyBatch, post_id: Optional[str], now) -> None:
+    """
+    Insert reply suggestions, replacing the stored set for comments that
+    already have one (unique on post_id, comment_id).
+    """
+    rows = _dedupe_rows(_reply_rows(reply_batch, post_id, now))
+    if not rows:
+        return
+    stmt = sqlite_insert(ReplySuggestionRecord)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["post_id", "comment_id"],
+        set_={
+            "original_comment": stmt.excluded.original_comment,
+            "suggestions_json": stmt.excluded.suggestions_json,
+            "created_at": stmt.excluded.created_at,
+        },
+    ).returning(ReplySuggestionRecord.id, sort_by_parameter_order=True)
+    ids = list(session.execute(stmt, rows).scalars())
+
+    # replaced sets: drop their old normalized rows before writing the new ones
+    session.execute(
+        delete(ReplySuggestionOptionRecord).where(ReplySuggestionOptionRecord.reply_suggestion_id.in_(ids))
+    )
+    option_rows = []
+    for reply_id, row in zip(ids, rows):
+        option_rows.extend(_suggestion_child_rows(reply_id, json.loads(row["suggestions_json"])))
+    _bulk_insert(session, ReplySuggestionOptionRecord, option_rows)
+
+
+def _upsert_comments(session, rows: List[dict]) -> None:
+    """
+    Insert comments; a comment seen again only gets its text/author updated.
+    """
+    rows = _dedupe_rows(rows)
+    if not rows:
+        return
+    stmt = sqlite_insert(CommentRecord)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["post_id", "comment_id"],
+        set_={"text": stmt.excluded.text, "author": stmt.excluded.author},
+    )
+    session.execute(stmt, rows)
+
+
+def _write_comments_and_replies(
+    session,
+    comments: List[Comment],
+    reply_batch: ReplyBatch,
+    post_id: Optional[str] = None,
+) -> None:
+    now = utc_now()
+    comment_rows = [
+        {
+            "post_id": _post_key(post_id),
+            "comment_id": c.id,
+            "text": c.text,
+            "author": c.author,
+            "created_at": now,
+        }
+        for c in comments
+    ]
+    _upsert_comments(session, comment_rows)
+    _upsert_replies(session, reply_batch, post_id, now)
+
+
 def log_comments_and_replies(
     comments: List[Comment],
     reply_batch: ReplyBatch,
     post_id: Optional[str] = None,
 ) -> None:
     """
-    Store original comments and reply suggestions.
+    Store original comments and reply suggestions. Idempotent: re-logging
+    the same comments updates them in place instead of adding rows.
     """
     with get_session() as session:
-        # Save comments
-        for c in comments:
-            c_rec = CommentRecord(
-                post_id=post_id,
-                comment_id=c.id,
-                text=c.text,
-                author=c.author,
+        _write_comments_and_replies(session, comments, reply_batch, post_id=post_id)
+        session.commit()
+
+
+def _write_reply_batch(
+    session,
+    reply_batch: ReplyBatch,
+    post_id: Optional[str] = None,
+) -> None:
+    _upsert_replies(session, reply_batch, post_id, utc_now())
+
+
+def log_reply_batch(
+    reply_batch: ReplyBatch,
+    post_id: Optional[str] = None,
+) -> None:
+    """
+    Store reply suggestions only (for comments that are already in the DB,
+    e.g. ingested through the webhook).
+    """
+    with get_session() as session:
+        _write_reply_batch(session, reply_batch, post_id=post_id)
+        session.commit()
+
+
+# ---- INSTAGRAM COMMENT INGESTION ----
+
+def log_insta_comments(comments: List[InstaComment]) -> List[InstaComment]:
+    """
+    Store comments fetched from Instagram, skipping (post_id, comment_id)
+    pairs that are already in the DB. Returns the comments that were new.
+    """
+    if not comments:
+        return []
+
+    now = utc_now()
+    rows = _dedupe_rows([
+        {
+            "post_id": c.post_id,
+            "comment_id": c.id,
+            "text": c.text,
+            "author": c.author,
+            "created_at": c.created_at or now,
+        }
+        for c in comments
+    ])
+    # DO NOTHING + RETURNING: only rows that were actually inserted come back
+    stmt = (
+        sqlite_insert(CommentRecord)
+        .on_conflict_do_nothing(index_elements=["post_id", "comment_id"])
+        .returning(CommentRecord.post_id, CommentRecord.comment_id)
+    )
+    with get_session() as session:
+        inserted = set(session.execute(stmt, rows).tuples())
+        session.commit()
+
+    new_comments: List[InstaComment] = []
+    for c in comments:
+        key = (c.post_id, c.id)
+        if key in inserted:
+            inserted.discard(key)
+            new_comments.append(c)
+    return new_comments
+
+
+# ---- BACKFILL ----
+
+BACKFILL_CHUNK = 1000
+
+
+def backfill_normalized_tables(chunk_size: int = BACKFILL_CHUNK) -> int:
+    """
+    Fill the caption/hashtag/suggestion child tables for rows logged before
+    they existed. Only parents without any child rows are read. init_db runs
+    it once per database (PRAGMA user_version); new rows are written with
+    their children. Returns the number of parents filled.
+    """
+    filled = 0
+
+    with get_session() as session:
+        has_options = select(CaptionOptionRecord.caption_record_id)
+        has_hashtags = select(CaptionHashtagRecord.caption_record_id)
+        last_id = 0
+        while True:
+            stmt = (
+                select(CaptionRecord.id, CaptionRecord.captions_json, CaptionRecord.hashtags_json)
+                .where(CaptionRecord.id > last_id)
+                .where(CaptionRecord.id.not_in(has_options))
+                .where(CaptionRecord.id.not_in(has_hashtags))
+                .order_by(CaptionRecord.id)
+                .limit(chunk_size)
             )
-            session.add(c_rec)
-
-        # Save reply suggestions
-        for r in reply_batch.replies:
-            r_rec = ReplySuggestionRecord(
-                post_id=post_id or reply_batch.post_id,
-                comment_id=r.comment_id,
-                original_comment=r.original_comment,
-                suggestions_json=json.dumps(r.suggestions, ensure_ascii=False),
+            rows = list(session.exec(stmt))
+            if not rows:
+                break
+            option_rows, hashtag_rows = [], []
+            for caption_record_id, captions_json, hashtags_json in rows:
+                options, hashtags = _caption_child_rows(
+                    caption_record_id, json.loads(captions_json or "[]"), json.loads(hashtags_json or "[]")
+                )
+                option_rows.extend(options)
+                hashtag_rows.extend(hashtags)
+            _bulk_insert(session, CaptionOptionRecord, option_rows)
+            _bulk_insert(session, CaptionHashtagRecord, hashtag_rows)
+            session.commit()
+            filled += len({r["caption_record_id"] for r in option_rows + hashtag_rows})
+            last_id = rows[-1][0]
+
+        has_suggestions = select(ReplySuggestionOptionRecord.reply_suggestion_id)
+        last_id = 0
+        while True:
+            stmt = (
+                select(ReplySuggestionRecord.id, ReplySuggestionRecord.suggestions_json)
+                .where(ReplySuggestionRecord.id > last_id)
+                .where(ReplySuggestionRecord.id.not_in(has_suggestions))
+                .order_by(ReplySuggestionRecord.id)
+                .limit(chunk_size)
             )
-            session.add(r_rec)
+            rows = list(session.exec(stmt))
+            if not rows:
+                break
+            option_rows = []
+            for reply_id, suggestions_json in rows:
+                option_rows.extend(_suggestion_child_rows(reply_id, json.loads(suggestions_json or "[]")))
+            _bulk_insert(session, ReplySuggestionOptionRecord, option_rows)
+            session.commit()
+            filled += len({r["reply_suggestion_id"] for r in option_rows})
+            last_id = rows[-1][0]
 
-        session.commit()
+    return filled
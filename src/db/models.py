@@ -1,18 +1,105 @@
 from datetime import datetime, timezone
 from typing import Optional
 
+import os
+from pathlib import Path
+
+from sqlalchemy import Index, event, text
 from sqlmodel import SQLModel, Field, create_engine, Session
 
 # ---- DB CONFIG ----
 
-DATABASE_URL = "sqlite:///./src/db/artflow.db"
-engine = create_engine(DATABASE_URL, echo=False)  # echo=True if you want SQL logs
+DATABASE_URL = os.getenv("ARTFLOW_DATABASE_URL", "sqlite:///./src/db/artflow.db")
+# seconds a writer waits on a locked DB before failing
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "10"))
+# Parquet archive of old log rows (see src/db/archive.py)
+ARCHIVE_DIR = Path(os.getenv("ARTFLOW_ARCHIVE_DIR", "./src/db/archive"))
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,  # echo=True if you want SQL logs
+    connect_args={"timeout": SQLITE_BUSY_TIMEOUT, "check_same_thread": False},
+)
+
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets the History tab read while logging writes; NORMAL sync is
+    # durable across app crashes (only an OS crash can lose the last commits)
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-32000")     # ~32 MB page cache
+    cursor.execute("PRAGMA mmap_size=268435456")   # 256 MB memory-mapped reads
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 
 def get_session() -> Session:
     return Session(engine)
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    version = _schema_version()
+    if version < COMMENT_KEYS_VERSION:
+        _dedupe_comment_tables()
+    _create_missing_indexes()
+
+    # late imports: both modules import this one
+    from src.db.logging import backfill_normalized_tables
+    from src.db.search import ensure_search_index
+    if version < NORMALIZED_TABLES_VERSION:
+        backfill_normalized_tables()
+    if version < SCHEMA_VERSION:
+        _set_schema_version(SCHEMA_VERSION)
+    ensure_search_index()
+
+# PRAGMA user_version marks one-off data migrations that already ran
+NORMALIZED_TABLES_VERSION = 1
+COMMENT_KEYS_VERSION = 2
+SCHEMA_VERSION = COMMENT_KEYS_VERSION
+
+def _schema_version() -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar() or 0
+
+def _set_schema_version(version: int):
+    with engine.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+def _create_missing_indexes():
+    # create_all only adds indexes together with new tables; this also
+    # adds indexes declared later to tables that already exist
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+# unique (post_id, comment_id) indexes and which duplicate survives when
+# they are added to an existing DB (comments: first seen, replies: latest)
+_UNIQUE_COMMENT_KEYS = {
+    "commentrecord": ("ux_commentrecord_post_id_comment_id", "MIN"),
+    "replysuggestionrecord": ("ux_replysuggestionrecord_post_id_comment_id", "MAX"),
+}
+
+def _dedupe_comment_tables():
+    # one-off migration: the unique indexes can't be created over duplicates.
+    # Rows without a post used to be stored with a NULL post_id, which the
+    # unique index treats as distinct; they are deduplicated and moved to ''.
+    with engine.begin() as conn:
+        for table, (_, keep) in _UNIQUE_COMMENT_KEYS.items():
+            conn.execute(
+                text(
+                    f"""
+                    DELETE FROM {table}
+                    WHERE id NOT IN (
+                        SELECT {keep}(id) FROM {table}
+                        GROUP BY coalesce(post_id, ''), comment_id
+                    )
+                    """
+                )
+            )
+            conn.execute(text(f"UPDATE {table} SET post_id = '' WHERE post_id IS NULL"))
 
 def utc_now():
     return datetime.now(timezone.utc)
@@ -20,6 +107,11 @@ def utc_now():
 # ---- TABLE MODELS ----
 
 class IdeaRecord(SQLModel, table=True):
+    __table_args__ = (
+        # keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_idearecord_created_at_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     idea_id: str = Field(index=True)  # LLM idea.id
     title: str
@@ -35,6 +127,10 @@ class IdeaRecord(SQLModel, table=True):
 
 
 class CaptionRecord(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_captionrecord_idea_id_created_at_id", "idea_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     idea_id: str = Field(index=True)
     captions_json: str        # JSON string of list[str]
@@ -44,8 +140,13 @@ class CaptionRecord(SQLModel, table=True):
 
 
 class CommentRecord(SQLModel, table=True):
+    __table_args__ = (
+        Index("ux_commentrecord_post_id_comment_id", "post_id", "comment_id", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    post_id: Optional[str] = Field(default=None, index=True)
+    # "" when not linked to a post: NULLs would never conflict in the unique index
+    post_id: str = Field(default="", index=True)
     comment_id: str = Field(index=True)
     text: str
     author: Optional[str] = None
@@ -53,9 +154,95 @@ class CommentRecord(SQLModel, table=True):
 
 
 class ReplySuggestionRecord(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_replysuggestionrecord_created_at_id", "created_at", "id"),
+        # one current suggestion set per comment, replaced on regeneration
+        Index("ux_replysuggestionrecord_post_id_comment_id", "post_id", "comment_id", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    post_id: Optional[str] = Field(default=None, index=True)
+    # "" when not linked to a post: NULLs would never conflict in the unique index
+    post_id: str = Field(default="", index=True)
     comment_id: str = Field(index=True)
     original_comment: str
     suggestions_json: str     # JSON string of list[str]
     created_at: datetime = Field(default_factory=utc_now)
+
+
+# ---- NORMALIZED CHILD TABLES ----
+# One row per caption / hashtag / reply suggestion, written next to the JSON
+# columns above (which stay the source for the read APIs) so that hashtag and
+# suggestion analytics are indexed SQL aggregates.
+
+class CaptionOptionRecord(SQLModel, table=True):
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    caption_record_id: int = Field(foreign_key="captionrecord.id", ondelete="CASCADE", primary_key=True)
+    position: int = Field(primary_key=True)
+    text: str
+
+
+class CaptionHashtagRecord(SQLModel, table=True):
+    __table_args__ = (
+        # "most suggested hashtags" scans only this index
+        Index("ix_captionhashtagrecord_tag", "tag"),
+        {"sqlite_with_rowid": False},
+    )
+
+    caption_record_id: int = Field(foreign_key="captionrecord.id", ondelete="CASCADE", primary_key=True)
+    position: int = Field(primary_key=True)
+    tag: str                  # normalized: lowercase, without the leading '#'
+
+
+class ReplySuggestionOptionRecord(SQLModel, table=True):
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    reply_suggestion_id: int = Field(foreign_key="replysuggestionrecord.id", ondelete="CASCADE", primary_key=True)
+    position: int = Field(primary_key=True)
+    text: str
+
+
+# ---- INSTAGRAM MIRROR (see src/instagram/sync.py) ----
+
+class PostRecord(SQLModel, table=True):
+    id: str = Field(primary_key=True)   # IG media id
+    type: str = "unknown"
+    caption: str = ""
+    hashtags_json: str = "[]"           # JSON string of list[str]
+    created_at: datetime = Field(index=True)  # UTC
+    likes: int = 0
+    comments_count: int = 0
+    metrics_refreshed_at: Optional[datetime] = None
+    synced_at: datetime = Field(default_factory=utc_now)
+
+
+class SyncStateRecord(SQLModel, table=True):
+    key: str = Field(primary_key=True)  # e.g. "posts", "comments:<post_id>"
+    cursor: Optional[str] = None        # id of the newest item seen
+    last_item_at: Optional[datetime] = None
+    last_synced_at: Optional[datetime] = None
+
+
+# ---- INSIGHTS TIME SERIES (see src/analytics/insights_collector.py) ----
+
+class InsightSampleRecord(SQLModel, table=True):
+    # append-only, integer-only rows keyed by (post_id, sampled_at);
+    # WITHOUT ROWID keeps them clustered by post and time
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    post_id: str = Field(primary_key=True)
+    sampled_at: int = Field(primary_key=True)  # unix seconds (UTC)
+    likes: int = 0
+    comments: int = 0
+    resolution: int = 0       # 0 = raw sample, else bucket size in seconds after downsampling
+
+
+# ---- ARCHIVE (see src/db/archive.py) ----
+
+class ArchivedReplyKeyRecord(SQLModel, table=True):
+    # (post_id, comment_id) of reply suggestions moved to the Parquet
+    # archive, so those comments still count as replied
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    post_id: str = Field(primary_key=True)
+    comment_id: str = Field(primary_key=True)
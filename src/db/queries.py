@@ -1,13 +1,26 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
+from sqlalchemy import func, tuple_
 from sqlmodel import select
 
 from src.db.models import (
+    ARCHIVE_DIR,
     get_session,
     IdeaRecord,
     CaptionRecord,
+    CommentRecord,
     ReplySuggestionRecord,
+    ArchivedReplyKeyRecord,
+    InsightSampleRecord,
+    CaptionHashtagRecord,
+    ReplySuggestionOptionRecord,
 )
+from src.db.logging import normalize_hashtag
+
+def has_archive(table: str) -> bool:
+    # cheap check that keeps pyarrow out of the import path when nothing is archived
+    return (ARCHIVE_DIR / table).is_dir()
 
 def get_recent_ideas(limit: int = 10) -> List[IdeaRecord]:
     with get_session() as session:
@@ -19,13 +32,8 @@ def get_recent_ideas(limit: int = 10) -> List[IdeaRecord]:
         return list(session.exec(stmt))
 
 def get_captions_for_idea(idea_id: str) -> List[CaptionRecord]:
-    with get_session() as session:
-        stmt = (
-            select(CaptionRecord)
-            .where(CaptionRecord.idea_id == idea_id)
-            .order_by(CaptionRecord.created_at.desc())
-        )
-        return list(session.exec(stmt))
+    # includes archived caption sets of old ideas
+    return _between(CaptionRecord, None, None, {"idea_id": idea_id})
 
 def get_recent_reply_suggestions(limit: int = 10) -> List[ReplySuggestionRecord]:
     with get_session() as session:
@@ -35,3 +43,207 @@ def get_recent_reply_suggestions(limit: int = 10) -> List[ReplySuggestionRecord]
             .limit(limit)
         )
         return list(session.exec(stmt))
+
+# ---- KEYSET PAGINATION ----
+# Pages are ordered by (created_at DESC, id DESC) and a cursor is the
+# (created_at, id) of the last row of the previous page, so every page is an
+# index range scan, no matter how deep. Pass the returned cursor back to get
+# the next page; None means there are no more rows.
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return f"{created_at.isoformat()}|{row_id}"
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    ts, row_id = cursor.rsplit("|", 1)
+    return datetime.fromisoformat(ts), int(row_id)
+
+def _page(stmt, model, limit: int, cursor: Optional[str], archive_filters: Optional[dict] = None):
+    before = decode_cursor(cursor) if cursor else None
+    if before:
+        stmt = stmt.where(tuple_(model.created_at, model.id) < before)
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+    with get_session() as session:
+        rows = list(session.exec(stmt))
+
+    if len(rows) <= limit and has_archive(model.__tablename__):
+        # live rows ran out: continue with archived months (see src/db/archive.py)
+        from src.db.archive import read_archived_before
+
+        if rows:
+            before = (rows[-1].created_at, rows[-1].id)
+        archived = read_archived_before(
+            model.__tablename__, limit + 1 - len(rows), before, filters=archive_filters
+        )
+        rows += [model(**r) for r in archived]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+def get_ideas_page(limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[IdeaRecord], Optional[str]]:
+    return _page(select(IdeaRecord), IdeaRecord, limit, cursor)
+
+def get_captions_for_idea_page(
+    idea_id: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[List[CaptionRecord], Optional[str]]:
+    stmt = select(CaptionRecord).where(CaptionRecord.idea_id == idea_id)
+    return _page(stmt, CaptionRecord, limit, cursor, archive_filters={"idea_id": idea_id})
+
+def get_reply_suggestions_page(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[List[ReplySuggestionRecord], Optional[str]]:
+    return _page(select(ReplySuggestionRecord), ReplySuggestionRecord, limit, cursor)
+
+# ---- DATE RANGES ----
+# Rows created in [start, end), newest first. Archived months are read only
+# when the range reaches back into them.
+
+def _between(model, start: Optional[datetime], end: Optional[datetime], filters: Optional[dict] = None):
+    stmt = select(model)
+    if start is not None:
+        stmt = stmt.where(model.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(model.created_at < end)
+    for column, value in (filters or {}).items():
+        stmt = stmt.where(getattr(model, column) == value)
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+    with get_session() as session:
+        rows = list(session.exec(stmt))
+
+    if has_archive(model.__tablename__):
+        from src.db.archive import iter_archived, row_key
+
+        live_keys = {row_key(r.id, r.created_at) for r in rows}
+        rows += [
+            model(**r)
+            for r in iter_archived(model.__tablename__, start, end, filters=filters)
+            if row_key(r["id"], r["created_at"]) not in live_keys
+        ]
+    return rows
+
+def get_ideas_between(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[IdeaRecord]:
+    return _between(IdeaRecord, start, end)
+
+def get_captions_between(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    idea_id: Optional[str] = None,
+) -> List[CaptionRecord]:
+    return _between(CaptionRecord, start, end, {"idea_id": idea_id} if idea_id else None)
+
+def get_reply_suggestions_between(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[ReplySuggestionRecord]:
+    return _between(ReplySuggestionRecord, start, end)
+
+# ---- COMMENT DEDUP ----
+# Both lookups go through the unique (post_id, comment_id) indexes.
+
+def _existing_comment_ids(model, post_id: Optional[str], comment_ids: List[str]) -> set:
+    post_id = post_id or ""  # how rows without a post are stored
+    existing = set()
+    ids = list(dict.fromkeys(comment_ids))
+    with get_session() as session:
+        # chunked to stay under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            stmt = select(model.comment_id).where(
+                model.post_id == post_id, model.comment_id.in_(ids[i:i + 500])
+            )
+            existing.update(session.exec(stmt))
+    return existing
+
+def get_new_comment_ids(post_id: Optional[str], comment_ids: List[str]) -> List[str]:
+    """
+    The ids in `comment_ids` that are not stored for `post_id` yet (input order).
+    """
+    existing = _existing_comment_ids(CommentRecord, post_id, comment_ids)
+    return [cid for cid in dict.fromkeys(comment_ids) if cid not in existing]
+
+def get_unreplied_comment_ids(post_id: Optional[str], comment_ids: List[str]) -> List[str]:
+    """
+    The ids in `comment_ids` that have no reply suggestions stored yet.
+    """
+    existing = _existing_comment_ids(ReplySuggestionRecord, post_id, comment_ids)
+    # suggestions moved to the Parquet archive still count
+    existing |= _existing_comment_ids(ArchivedReplyKeyRecord, post_id, comment_ids)
+    return [cid for cid in dict.fromkeys(comment_ids) if cid not in existing]
+
+# ---- HASHTAG / SUGGESTION ANALYTICS ----
+# Aggregates over the normalized child tables; no JSON is parsed.
+
+def get_top_suggested_hashtags(
+    limit: int = 20,
+    since: Optional[datetime] = None,
+) -> List[Tuple[str, int]]:
+    """
+    Hashtags suggested most often, as (tag, count), optionally only for
+    caption sets logged since `since`.
+    """
+    count = func.count().label("n")
+    stmt = select(CaptionHashtagRecord.tag, count).group_by(CaptionHashtagRecord.tag)
+    if since is not None:
+        stmt = stmt.join(
+            CaptionRecord, CaptionRecord.id == CaptionHashtagRecord.caption_record_id
+        ).where(CaptionRecord.created_at >= since)
+    stmt = stmt.order_by(count.desc(), CaptionHashtagRecord.tag).limit(limit)
+    with get_session() as session:
+        return [(tag, n) for tag, n in session.exec(stmt)]
+
+def get_ideas_for_hashtag(tag: str) -> List[str]:
+    """
+    idea_ids whose caption sets suggested `tag` ('#' and case are ignored).
+    """
+    stmt = (
+        select(CaptionRecord.idea_id)
+        .join(CaptionHashtagRecord, CaptionHashtagRecord.caption_record_id == CaptionRecord.id)
+        .where(CaptionHashtagRecord.tag == normalize_hashtag(tag))
+        .distinct()
+    )
+    with get_session() as session:
+        return list(session.exec(stmt))
+
+def get_top_reply_suggestions(limit: int = 20) -> List[Tuple[str, int]]:
+    """
+    Reply suggestions the model repeats most often, as (text, count).
+    """
+    count = func.count().label("n")
+    stmt = (
+        select(ReplySuggestionOptionRecord.text, count)
+        .group_by(ReplySuggestionOptionRecord.text)
+        .order_by(count.desc())
+        .limit(limit)
+    )
+    with get_session() as session:
+        return [(text, n) for text, n in session.exec(stmt)]
+
+def get_engagement_curve(post_id: str) -> List[InsightSampleRecord]:
+    """
+    Stored likes/comments samples for a post, oldest first.
+    """
+    with get_session() as session:
+        stmt = (
+            select(InsightSampleRecord)
+            .where(InsightSampleRecord.post_id == post_id)
+            .order_by(InsightSampleRecord.sampled_at.asc())
+        )
+        return list(session.exec(stmt))
+
+def get_engagement_curves(post_ids: List[str]) -> Dict[str, List[InsightSampleRecord]]:
+    with get_session() as session:
+        stmt = (
+            select(InsightSampleRecord)
+            .where(InsightSampleRecord.post_id.in_(post_ids))
+            .order_by(InsightSampleRecord.post_id, InsightSampleRecord.sampled_at.asc())
+        )
+        curves: Dict[str, List[InsightSampleRecord]] = {pid: [] for pid in post_ids}
+        for rec in session.exec(stmt):
+            curves.setdefault(rec.post_id, []).append(rec)
+        return curves
@@ -0,0 +1,209 @@
+# src/db/search.py
+#
+# Full-text search over the history tables with SQLite FTS5.
+#
+# history_fts holds one row per idea, caption set and reply suggestion.
+# Triggers on the source tables keep it in sync on every write, so
+# the logging code does not need to know about it. The FTS rowid encodes
+# the source row (id * 4 + kind) so deletes are a rowid lookup.
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import text
+
+from src.db.models import engine, get_session
+
+FTS_TABLE = "history_fts"
+
+KIND_CODES = {"idea": 1, "caption": 2, "reply": 3}
+KINDS = {code: kind for kind, code in KIND_CODES.items()}
+
+# SQL producing the (title, body) text of each source row; used by both the
+# triggers (with NEW.) and the backfill (with the table alias r.)
+_DOCUMENTS = {
+    "idea": {
+        "table": "idearecord",
+        "title": "{r}.title",
+        "body": (
+            "{r}.drawing_prompt || ' ' || {r}.style_direction || ' ' || {r}.why_it_fits_you"
+            " || ' ' || coalesce({r}.mood_or_focus, '') || ' ' || coalesce({r}.user_hint, '')"
+        ),
+        "idea_id": "{r}.idea_id",
+    },
+    "caption": {
+        "table": "captionrecord",
+        "title": "''",
+        "body": (
+            "coalesce((SELECT group_concat(value, ' ') FROM json_each({r}.captions_json)), '')"
+            " || ' ' || "
+            "coalesce((SELECT group_concat(value, ' ') FROM json_each({r}.hashtags_json)), '')"
+        ),
+        "idea_id": "{r}.idea_id",
+    },
+    "reply": {
+        "table": "replysuggestionrecord",
+        "title": "{r}.original_comment",
+        "body": "(SELECT group_concat(value, ' ') FROM json_each({r}.suggestions_json))",
+        "idea_id": "NULL",
+    },
+}
+
+
+class SearchHit(BaseModel):
+    kind: str                 # "idea", "caption" or "reply"
+    record_id: int            # id in the source table
+    idea_id: Optional[str] = None
+    title: str
+    snippet: str
+    created_at: Optional[datetime] = None
+    score: float              # bm25, lower is better
+
+
+def _select_document(kind: str, r: str) -> str:
+    doc = _DOCUMENTS[kind]
+    return (
+        f"{r}.id * 4 + {KIND_CODES[kind]}, "
+        f"{doc['title'].format(r=r)}, {doc['body'].format(r=r)}, "
+        f"{doc['idea_id'].format(r=r)}, {r}.created_at"
+    )
+
+
+def _ddl() -> List[str]:
+    statements = [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            title, body, idea_id UNINDEXED, created_at UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """
+    ]
+    for kind, doc in _DOCUMENTS.items():
+        table = doc["table"]
+        statements.append(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {FTS_TABLE}(rowid, title, body, idea_id, created_at)
+                VALUES ({_select_document(kind, "NEW")});
+            END
+            """
+        )
+        statements.append(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id * 4 + {KIND_CODES[kind]};
+                INSERT INTO {FTS_TABLE}(rowid, title, body, idea_id, created_at)
+                VALUES ({_select_document(kind, "NEW")});
+            END
+            """
+        )
+        statements.append(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id * 4 + {KIND_CODES[kind]};
+            END
+            """
+        )
+    return statements
+
+
+def ensure_search_index() -> None:
+    """
+    Create the FTS table and its triggers; on first creation, index the rows
+    that are already in the DB.
+    """
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        for statement in _ddl():
+            conn.execute(text(statement))
+        if not exists:
+            for kind, doc in _DOCUMENTS.items():
+                conn.execute(
+                    text(
+                        f"INSERT INTO {FTS_TABLE}(rowid, title, body, idea_id, created_at) "
+                        f"SELECT {_select_document(kind, 'r')} FROM {doc['table']} AS r"
+                    )
+                )
+
+
+def rebuild_search_index() -> None:
+    """
+    Drop and re-create the index from the source tables.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    ensure_search_index()
+
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def to_fts_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last
+    one as a prefix ("rainy anim" finds "rainy anime").
+    """
+    words = _TOKEN.findall(query)
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_history(
+    query: str,
+    limit: int = 20,
+    kinds: Optional[Sequence[str]] = None,
+    raw: bool = False,
+) -> List[SearchHit]:
+    """
+    Ranked (bm25) search over ideas, caption sets and reply suggestions.
+    `raw=True` passes `query` to FTS5 unchanged (AND/OR/NEAR, "phrases", col:term).
+    Rows moved to the Parquet archive (src/db/archive.py) are not searched.
+    """
+    match = query if raw else to_fts_query(query)
+    if not match:
+        return []
+
+    params = {"match": match, "limit": limit}
+    kind_filter = ""
+    if kinds:
+        codes = [KIND_CODES[k] for k in kinds]
+        kind_filter = f"AND rowid % 4 IN ({', '.join(str(c) for c in codes)})"
+
+    sql = text(
+        f"""
+        SELECT rowid, title, idea_id, created_at,
+               snippet({FTS_TABLE}, -1, '**', '**', '…', 12) AS snippet,
+               bm25({FTS_TABLE}, 5.0, 1.0) AS score
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH :match {kind_filter}
+        ORDER BY score
+        LIMIT :limit
+        """
+    )
+    with get_session() as session:
+        rows = session.execute(sql, params).all()
+
+    hits = []
+    for rowid, title, idea_id, created_at, snippet, score in rows:
+        hits.append(
+            SearchHit(
+                kind=KINDS[rowid % 4],
+                record_id=rowid // 4,
+                idea_id=idea_id,
+                title=title or "",
+                snippet=snippet or "",
+                created_at=(
+                    datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc) if created_at else None
+                ),
+                score=score,
+            )
+        )
+    return hits
@@ -0,0 +1,223 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from src.db.logging import (
+    _write_caption_set,
+    _write_comments_and_replies,
+    _write_idea_set,
+    _write_reply_batch,
+)
+from src.db.models import get_session
+
+# ---- CONFIG ----
+
+# "async":   enqueue and return immediately (default)
+# "durable": enqueue, then wait until the group commit containing the record is done
+# "sync":    write in the caller's thread, no background thread
+LOG_DURABILITY = os.getenv("ARTFLOW_LOG_DURABILITY", "async").lower()
+LOG_MAX_BATCH = int(os.getenv("ARTFLOW_LOG_MAX_BATCH", "200"))
+LOG_MAX_DELAY = float(os.getenv("ARTFLOW_LOG_MAX_DELAY", "0.5"))   # seconds
+LOG_MAX_QUEUE = int(os.getenv("ARTFLOW_LOG_MAX_QUEUE", "10000"))
+# how long a producer may block on a full queue before writing inline
+LOG_PUT_TIMEOUT = float(os.getenv("ARTFLOW_LOG_PUT_TIMEOUT", "2.0"))
+
+DURABILITY_MODES = {"async", "durable", "sync"}
+
+_STOP = object()
+
+
+class _Item:
+    __slots__ = ("fn", "args", "kwargs", "done", "error")
+
+    def __init__(self, fn: Callable, args: Tuple, kwargs: dict, wait: bool):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.done = threading.Event() if wait else None
+        self.error: Optional[BaseException] = None
+
+
+class WriteBehindLogger:
+    """
+    Moves db.logging writes off the caller's critical path.
+
+    Records are queued and a background thread group-commits them, one
+    transaction per batch, when `max_batch` records are waiting or the
+    oldest has waited `max_delay` seconds. The queue is bounded: when it is
+    full the producer blocks for up to `put_timeout` and then writes inline
+    (backpressure without dropping records). Pending records are flushed at
+    interpreter exit.
+
+    A record that fails to commit is dropped with a message in "async"
+    mode; in "durable" and "sync" mode the error is raised to the caller.
+    """
+
+    def __init__(
+        self,
+        durability: str = LOG_DURABILITY,
+        max_batch: int = LOG_MAX_BATCH,
+        max_delay: float = LOG_MAX_DELAY,
+        max_queue: int = LOG_MAX_QUEUE,
+        put_timeout: float = LOG_PUT_TIMEOUT,
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {sorted(DURABILITY_MODES)}, got '{durability}'")
+        self.durability = durability
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self.stats = {"enqueued": 0, "committed": 0, "batches": 0, "inline": 0, "failed": 0}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        # producers and the writer thread both update stats
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # ---- producer side ----
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+                    self._thread.start()
+
+    def _write_inline(self, fn: Callable, args: Tuple, kwargs: dict) -> None:
+        with get_session() as session:
+            fn(session, *args, **kwargs)
+            session.commit()
+        self._count("inline")
+
+    def submit(self, fn: Callable, *args, **kwargs) -> None:
+        """
+        Queue `fn(session, *args, **kwargs)` for the next group commit.
+        """
+        if self.durability == "sync" or self._closed:
+            self._write_inline(fn, args, kwargs)
+            return
+
+        self._ensure_thread()
+        item = _Item(fn, args, kwargs, wait=self.durability == "durable")
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            # writer can't keep up: pay the write cost here instead of dropping it
+            self._write_inline(fn, args, kwargs)
+            return
+        self._count("enqueued")
+
+        if item.done is not None:
+            item.done.wait()
+            if item.error is not None:
+                raise item.error
+
+    def log_idea_set(self, idea_set, user_hint=None, source: str = "cli") -> None:
+        self.submit(_write_idea_set, idea_set, user_hint=user_hint, source=source)
+
+    def log_caption_set(self, idea, caption_set) -> None:
+        self.submit(_write_caption_set, idea, caption_set)
+
+    def log_comments_and_replies(self, comments, reply_batch, post_id=None) -> None:
+        self.submit(_write_comments_and_replies, comments, reply_batch, post_id=post_id)
+
+    def log_reply_batch(self, reply_batch, post_id=None) -> None:
+        self.submit(_write_reply_batch, reply_batch, post_id=post_id)
+
+    def flush(self) -> None:
+        """
+        Block until everything queued so far is committed.
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """
+        Flush pending records and stop the writer thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    # ---- writer thread ----
+
+    def _commit(self, batch: List[_Item]) -> None:
+        try:
+            with get_session() as session:
+                for item in batch:
+                    item.fn(session, *item.args, **item.kwargs)
+                session.commit()
+            self._count("committed", len(batch))
+            self._count("batches")
+        except Exception as e:
+            # retry one by one so a single bad record doesn't lose the batch
+            if len(batch) == 1:
+                self._count("failed")
+                if batch[0].done is not None:
+                    # durable caller: submit() re-raises it
+                    batch[0].error = e
+                else:
+                    print("write-behind logger: dropping record after error:", e)
+            else:
+                for item in batch:
+                    self._commit([item])
+                return
+        for item in batch:
+            if item.done is not None:
+                item.done.set()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+
+            self._commit(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+
+_writer: Optional[WriteBehindLogger] = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> WriteBehindLogger:
+    """
+    Shared write-behind logger; flushed automatically at interpreter exit.
+    """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = WriteBehindLogger()
+                atexit.register(_writer.close)
+    return _writer
@@ -1,10 +1,17 @@
 # src/graph/caption_module.py
 
 import json
+import os
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from src.rag.llm import get_llm
-from src.utils.schemas import CaptionSet
+from src.utils.schemas import CaptionDraft, CaptionSet
+
+# pick hashtags from the co-occurrence index of past posts instead of asking
+# the LLM (see analytics/hashtag_index.py); falls back to the LLM when the
+# history has no hashtags
+CAPTION_HASHTAGS_FROM_HISTORY = os.getenv("CAPTION_HASHTAGS_FROM_HISTORY", "true").lower() == "true"
+CAPTION_NUM_HASHTAGS = int(os.getenv("CAPTION_NUM_HASHTAGS", "5"))
 
 SYSTEM_PROMPT = """
 You are an assistant that writes Instagram captions and hashtags for a digital artist.
@@ -18,13 +25,38 @@ Rules:
 {format_instructions}
 """
 
+def _history_hashtags(idea):
+    """
+    Hashtags for the idea from past posts, or None if there is no usable history.
+    """
+    if not CAPTION_HASHTAGS_FROM_HISTORY:
+        return None
+    try:
+        from src.analytics.hashtag_index import get_hashtag_index
+
+        index = get_hashtag_index()
+        if not len(index):
+            return None
+        text = " ".join([idea.title, idea.drawing_prompt, idea.style_direction])
+        return index.recommend_for_text(text, k=CAPTION_NUM_HASHTAGS) or None
+    except Exception as e:
+        print("Hashtag index unavailable, asking the LLM instead:", e)
+        return None
+
 def generate_captions_for_idea(idea) -> CaptionSet:
     """
     idea: ArtIdea object
     """
     model = get_llm()
 
-    parser = PydanticOutputParser(pydantic_object=CaptionSet)
+    hashtags = _history_hashtags(idea)
+    output_model = CaptionSet if hashtags is None else CaptionDraft
+    parser = PydanticOutputParser(pydantic_object=output_model)
+
+    if hashtags is None:
+        task = "Create 2–3 caption options + 3 hashtags + simple timelapse video tips."
+    else:
+        task = "Create 2–3 caption options + simple timelapse video tips (hashtags are added separately)."
 
     user_prompt = """
 Idea ID: {id}
@@ -32,7 +64,7 @@ Title: {title}
 Drawing prompt: {drawing_prompt}
 Style direction: {style_direction}
 
-Create 2–3 caption options + 3 hashtags + simple timelapse video tips.
+{task}
 Tone: minimal, emotional, aesthetic.
 
 Output MUST have all the fields described in output schema.
@@ -41,7 +73,7 @@ Use the above Idea ID in output.
 
     template = PromptTemplate(
     template=SYSTEM_PROMPT + user_prompt,
-    input_variables=["id", "title", "drawing_prompt", "style_direction"],
+    input_variables=["id", "title", "drawing_prompt", "style_direction", "task"],
     partial_variables={"format_instructions": parser.get_format_instructions()},
     )
 
@@ -50,6 +82,14 @@ Use the above Idea ID in output.
         "id": idea.id,
         "title": idea.title,
         "drawing_prompt": idea.drawing_prompt,
-        "style_direction": idea.style_direction
+        "style_direction": idea.style_direction,
+        "task": task,
     })
-    return response
+    if hashtags is None:
+        return response
+    return CaptionSet(
+        idea_id=response.idea_id,
+        captions=response.captions,
+        hashtags=hashtags,
+        timelapse_tips=response.timelapse_tips,
+    )
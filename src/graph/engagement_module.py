@@ -24,11 +24,13 @@ Goals:
 def generate_reply_suggestions(
     comments: List[Comment],
     post_id: Optional[str] = None,
+    priority: str = "interactive",
 ) -> ReplyBatch:
     """
     Given a list of Comment objects, generate multiple reply suggestions per comment.
+    Use priority="batch" for background sweeps so they don't starve UI requests.
     """
-    model = get_llm()
+    model = get_llm(priority=priority)
 
     comments_payload = [
         {
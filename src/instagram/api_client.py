@@ -1,9 +1,15 @@
 from pathlib import Path
 from dotenv import load_dotenv
+import json
 import requests
-from typing import Any, Dict, Optional
+from requests.adapters import HTTPAdapter
+import threading
+import time
+from typing import Any, Dict, List, Optional
 import os
 
+from src.utils.rate_limit import backoff_delay
+
 env_path = Path(__file__).resolve().parents[2] / ".env"
 load_dotenv(dotenv_path=env_path)
 
@@ -11,7 +17,24 @@ META_API_VERSION = os.getenv("META_API_VERSION", "v24.0")
 ACCESS_TOKEN = os.getenv("INSTAGRAM_ACCESS_TOKEN")  # to be added later
 USER_ID = os.getenv("INSTAGRAM_USER_ID")            # your Instagram Business ID
 
-BASE_URL = f"https://graph.instagram.com/{META_API_VERSION}"
+# Override to point the client at a local stand-in (see instagram/stub_server.py)
+BASE_URL = os.getenv("IG_BASE_URL", f"https://graph.instagram.com/{META_API_VERSION}")
+
+# (connect, read) timeouts in seconds
+IG_CONNECT_TIMEOUT = float(os.getenv("IG_CONNECT_TIMEOUT", "3.05"))
+IG_READ_TIMEOUT = float(os.getenv("IG_READ_TIMEOUT", "20"))
+IG_MAX_RETRIES = int(os.getenv("IG_MAX_RETRIES", "3"))
+IG_POOL_SIZE = int(os.getenv("IG_POOL_SIZE", "10"))
+# Graph API accepts at most 50 operations per batch request
+IG_BATCH_SIZE = int(os.getenv("IG_BATCH_SIZE", "50"))
+MAX_BATCH_SIZE = 50
+
+# If the API asks us to back off for longer than this, fail instead of blocking
+MAX_RETRY_WAIT = 60.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Graph API throttling error codes (returned with 4xx status)
+RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613, 80001, 80002}
 
 class InstagramAPIError(Exception):
     pass
@@ -25,32 +48,220 @@ def _check_token():
         )
 
 
-def ig_get(path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+def _usage_wait_seconds(headers) -> Optional[float]:
     """
-    Wrapper for GET requests to the Instagram Graph API.
-    Automatically injects access token.
+    How long the API wants us to wait, from Retry-After or the
+    X-Business-Use-Case-Usage / X-App-Usage headers.
     """
-    _check_token()
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    buc = headers.get("X-Business-Use-Case-Usage")
+    if buc:
+        try:
+            usage = json.loads(buc)
+            minutes = max(
+                (int(e.get("estimated_time_to_regain_access", 0) or 0)
+                 for entries in usage.values() for e in entries),
+                default=0,
+            )
+            if minutes:
+                return minutes * 60.0
+        except (ValueError, AttributeError, TypeError):
+            pass
+    return None
+
+
+def _is_rate_limited(status: int, text: str) -> bool:
+    if status == 429:
+        return True
+    try:
+        code = json.loads(text).get("error", {}).get("code")
+    except (ValueError, AttributeError):
+        return False
+    return code in RATE_LIMIT_ERROR_CODES
+
+
+def retry_wait(status: int, headers, text: str, attempt: int) -> Optional[float]:
+    """
+    Seconds to wait before retrying a failed response, or None if it should
+    not be retried (not a 5xx / throttling error). Shared by IGClient and
+    the async client; raises if the API asks for more than MAX_RETRY_WAIT.
+    """
+    if status not in RETRYABLE_STATUS and not _is_rate_limited(status, text):
+        return None
+    wait = _usage_wait_seconds(headers)
+    if wait is None:
+        wait = backoff_delay(attempt)
+    if wait > MAX_RETRY_WAIT:
+        raise InstagramAPIError(f"IG API rate limit hit, retry after {wait:.0f}s: {text}")
+    return wait
+
+
+class IGClient:
+    """
+    Graph API client with a pooled keep-alive session, (connect, read)
+    timeouts and retry with backoff on network errors, 5xx and throttling.
+    The session is only created on first request.
+    """
+
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        base_url: str = BASE_URL,
+        connect_timeout: float = IG_CONNECT_TIMEOUT,
+        read_timeout: float = IG_READ_TIMEOUT,
+        max_retries: int = IG_MAX_RETRIES,
+        pool_size: int = IG_POOL_SIZE,
+    ):
+        self.access_token = access_token or ACCESS_TOKEN
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.last_usage: Dict[str, Any] = {}
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    s = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    s.mount("https://", adapter)
+                    s.mount("http://", adapter)
+                    self._session = s
+        return self._session
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def url_for(self, path: str) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        if not path:
+            return self.base_url
+        return f"{self.base_url}/{path.lstrip('/')}"
 
-    if params is None:
-        params = {}
+    def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                data: Optional[Dict[str, Any]] = None) -> Any:
+        url = self.url_for(path)
+        attempt = 0
+        while True:
+            try:
+                resp = self.session.request(method, url, params=params, data=data, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise InstagramAPIError(f"Error calling IG API: {e}") from e
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
 
-    params["access_token"] = ACCESS_TOKEN
+            for header in ("X-App-Usage", "X-Business-Use-Case-Usage"):
+                if header in resp.headers:
+                    self.last_usage[header] = resp.headers[header]
 
-    url = f"{BASE_URL}/{path}"
+            if resp.status_code == 200:
+                return resp.json()
 
-    resp = requests.get(url, params=params)
+            wait = None
+            if attempt < self.max_retries:
+                wait = retry_wait(resp.status_code, resp.headers, resp.text, attempt)
+            if wait is None:
+                raise InstagramAPIError(f"Error calling IG API: {resp.text}")
+            time.sleep(wait)
+            attempt += 1
 
-    if resp.status_code != 200:
-        raise InstagramAPIError(f"Error calling IG API: {resp.text}")
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        GET with the access token injected. Absolute URLs (e.g. `paging.next`)
+        already carry the token and cursor, so they are used as-is.
+        """
+        params = dict(params or {})
+        if not path.startswith(("http://", "https://")):
+            params["access_token"] = self.access_token
+        return self.request("GET", path, params=params)
 
-    return resp.json()
+    def batch(self, operations: List[Dict[str, Any]], batch_size: int = IG_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        Run many GETs through Graph API batch requests.
+
+        operations: [{"method": "GET", "relative_url": "<id>?fields=..."}, ...]
+        Returns one dict per operation, in order: {"code": int, "body": parsed JSON or None}.
+        A failed operation does not fail the whole batch.
+        """
+        batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(operations), batch_size):
+            chunk = operations[start:start + batch_size]
+            data = self.request(
+                "POST",
+                "",
+                data={
+                    "access_token": self.access_token,
+                    "include_headers": "false",
+                    "batch": json.dumps(chunk),
+                },
+            )
+            for item in data:
+                if item is None:
+                    # operation timed out on the server side
+                    results.append({"code": None, "body": None})
+                    continue
+                try:
+                    body = json.loads(item.get("body") or "null")
+                except ValueError:
+                    body = None
+                results.append({"code": item.get("code"), "body": body})
+        return results
+
+
+_client: Optional[IGClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> IGClient:
+    """
+    Shared client, created lazily on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _check_token()
+                _client = IGClient()
+    return _client
+
+
+def ig_get(path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Wrapper for GET requests to the Instagram Graph API.
+    Automatically injects access token.
+
+    `path` may also be an absolute URL such as `paging.next` from a previous
+    response; those already carry the token and cursor, so they are used as-is.
+    """
+    _check_token()
+    return get_client().get(path, params=params)
+
+
+def ig_batch(operations: List[Dict[str, Any]], batch_size: int = IG_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    Wrapper for Graph API batch requests, see IGClient.batch.
+    """
+    _check_token()
+    return get_client().batch(operations, batch_size=batch_size)
 
 
 # Example usage:
 
-# response = ig_get(f"/me", params={"fields": "id, user_id, username, followers_count, follows_count, media_count", "access_token": ACCESS_TOKEN})
+# response = ig_get("me", params={"fields": "id, user_id, username, followers_count, follows_count, media_count"})
 # print("Instagram User Info:", response)
-
-response = ig_get(f"{USER_ID}/media", params={"access_token": ACCESS_TOKEN})
-print("Instagram Media Response:", response)
\ No newline at end of file
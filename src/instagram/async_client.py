@@ -0,0 +1,223 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import aiohttp
+
+from src.instagram.api_client import (
+    ACCESS_TOKEN,
+    BASE_URL,
+    IG_CONNECT_TIMEOUT,
+    IG_MAX_RETRIES,
+    IG_READ_TIMEOUT,
+    InstagramAPIError,
+    _check_token,
+    retry_wait,
+)
+from src.instagram.schemas import InstaComment
+from src.instagram.service import COMMENT_FIELDS, MAX_PAGE_SIZE, _parse_live_comment, _with_limit
+from src.utils.rate_limit import TokenBucket, backoff_delay
+
+# ---- CONFIG ----
+
+IG_ASYNC_MAX_CONNECTIONS = int(os.getenv("IG_ASYNC_MAX_CONNECTIONS", "10"))
+# requests per second allowed across all concurrent fetches
+IG_ASYNC_RATE_PER_SEC = float(os.getenv("IG_ASYNC_RATE_PER_SEC", "20"))
+
+
+class AsyncIGClient:
+    """
+    Async Graph API client (aiohttp) with a connection limit and a shared
+    request-rate budget. Use as an async context manager:
+
+        async with AsyncIGClient() as client:
+            async for c in client.iter_comments(post_id):
+                ...
+
+    `base_url` can point at a local stub server for testing.
+    """
+
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        base_url: str = BASE_URL,
+        max_connections: int = IG_ASYNC_MAX_CONNECTIONS,
+        rate_per_sec: float = IG_ASYNC_RATE_PER_SEC,
+        max_retries: int = IG_MAX_RETRIES,
+    ):
+        self.access_token = access_token or ACCESS_TOKEN
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max(1, max_connections)
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rate_per_sec, self.max_connections)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncIGClient":
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        timeout = aiohttp.ClientTimeout(sock_connect=IG_CONNECT_TIMEOUT, sock_read=IG_READ_TIMEOUT)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        if self._session is None:
+            raise InstagramAPIError("AsyncIGClient must be used inside 'async with'.")
+
+        if path.startswith(("http://", "https://")):
+            url, params = path, None
+        else:
+            url = f"{self.base_url}/{path.lstrip('/')}"
+            params = dict(params or {})
+            if self.access_token:
+                params["access_token"] = self.access_token
+
+        attempt = 0
+        while True:
+            wait = self.bucket.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                async with self._session.get(url, params=params) as resp:
+                    if resp.status == 200:
+                        return await resp.json()
+                    text = await resp.text()
+                    headers = resp.headers
+                    status = resp.status
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise InstagramAPIError(f"Error calling IG API: {e}") from e
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            # same throttle detection (error codes, usage headers) as IGClient
+            delay = retry_wait(status, headers, text, attempt) if attempt < self.max_retries else None
+            if delay is None:
+                raise InstagramAPIError(f"Error calling IG API: {text}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def iter_comment_pages(
+        self,
+        post_id: str,
+        limit: Optional[int] = None,
+        page_size: int = 50,
+    ) -> AsyncIterator[List[InstaComment]]:
+        """
+        Yield comments of one post page by page, following `paging.next`.
+        """
+        remaining = limit
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        params = {
+            "fields": COMMENT_FIELDS,
+            "limit": min(page_size, remaining) if remaining is not None else page_size,
+        }
+        next_url: Optional[str] = f"{post_id}/comments"
+
+        while next_url and (remaining is None or remaining > 0):
+            data = await self.get(next_url, params=params)
+            items = data.get("data", [])
+            if remaining is not None:
+                items = items[:remaining]
+                remaining -= len(items)
+            if items:
+                yield [_parse_live_comment(c, post_id) for c in items]
+            next_url = (data.get("paging") or {}).get("next") if items else None
+            if next_url and remaining is not None and remaining > 0:
+                # the next URL repeats the first page's limit; don't fetch more than is left
+                next_url = _with_limit(next_url, min(page_size, remaining))
+
+    async def iter_comments(self, post_id: str, limit: Optional[int] = None) -> AsyncIterator[InstaComment]:
+        async for page in self.iter_comment_pages(post_id, limit=limit):
+            for c in page:
+                yield c
+
+
+_DONE = object()
+
+
+async def stream_comments_for_posts(
+    post_ids: Iterable[str],
+    limit_per_post: Optional[int] = None,
+    max_connections: int = IG_ASYNC_MAX_CONNECTIONS,
+    rate_per_sec: float = IG_ASYNC_RATE_PER_SEC,
+    client: Optional[AsyncIGClient] = None,
+) -> AsyncIterator[InstaComment]:
+    """
+    Fetch comments for many posts concurrently and yield InstaComment objects
+    as soon as each page arrives (order across posts is not guaranteed).
+
+    At most `max_connections` posts are fetched at once, and every request
+    shares the `rate_per_sec` budget. Pass an open `client` to reuse it
+    (e.g. one pointed at a stub server).
+    """
+    post_ids = list(dict.fromkeys(post_ids))
+    if not post_ids:
+        return
+
+    if client is None:
+        _check_token()
+        async with AsyncIGClient(max_connections=max_connections, rate_per_sec=rate_per_sec) as own_client:
+            async for c in stream_comments_for_posts(post_ids, limit_per_post, max_connections, rate_per_sec, own_client):
+                yield c
+        return
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_connections * 4)
+    sem = asyncio.Semaphore(max_connections)
+
+    async def worker(pid: str) -> None:
+        try:
+            async with sem:
+                async for page in client.iter_comment_pages(pid, limit=limit_per_post):
+                    await queue.put(page)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await queue.put(_DONE)
+
+    tasks = [asyncio.create_task(worker(pid)) for pid in post_ids]
+    pending = len(tasks)
+    try:
+        while pending:
+            item = await queue.get()
+            if item is _DONE:
+                pending -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                for c in item:
+                    yield c
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def fetch_comments_for_posts(
+    post_ids: Iterable[str],
+    limit_per_post: Optional[int] = None,
+    max_connections: int = IG_ASYNC_MAX_CONNECTIONS,
+    rate_per_sec: float = IG_ASYNC_RATE_PER_SEC,
+    base_url: str = BASE_URL,
+) -> Dict[str, List[InstaComment]]:
+    """
+    Sync helper around stream_comments_for_posts: returns {post_id: [comments]}.
+    """
+    post_ids = list(post_ids)
+
+    async def _run() -> Dict[str, List[InstaComment]]:
+        out: Dict[str, List[InstaComment]] = {pid: [] for pid in post_ids}
+        async with AsyncIGClient(base_url=base_url, max_connections=max_connections, rate_per_sec=rate_per_sec) as client:
+            async for c in stream_comments_for_posts(
+                post_ids, limit_per_post, max_connections, rate_per_sec, client=client
+            ):
+                out.setdefault(c.post_id, []).append(c)
+        return out
+
+    if base_url == BASE_URL:
+        _check_token()
+    return asyncio.run(_run())
@@ -0,0 +1,67 @@
+# src/instagram/bench_live.py
+#
+# Throughput check of the live client against the local stub server.
+# Run: python -m src.instagram.bench_live --posts 500 --latency-ms 30
+import argparse
+import os
+import time
+
+from src.instagram.stub_server import STUB_USER_ID, StubConfig, start_stub_server
+
+
+def _timed(label: str, fn, server):
+    before = server.api.total_requests
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    calls = server.api.total_requests - before
+    print(f"{label:<45} {elapsed * 1000:9.1f} ms  {calls:5d} HTTP calls")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark live IG client against the stub server")
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--comments", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--sample", type=int, default=50, help="posts used for insights/comments runs")
+    parser.add_argument("--rate", type=float, default=500.0, help="async client requests/sec budget")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(StubConfig(
+        num_posts=args.posts,
+        comments_per_post=args.comments,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+    ))
+
+    # api_client reads these at import time
+    os.environ["IG_BASE_URL"] = base_url
+    os.environ["INSTAGRAM_ACCESS_TOKEN"] = "stub"
+    os.environ["INSTAGRAM_USER_ID"] = STUB_USER_ID
+
+    from src.instagram import service
+    from src.instagram.async_client import fetch_comments_for_posts
+
+    print(f"stub: {base_url} | posts={args.posts} comments/post={args.comments} latency={args.latency_ms}ms")
+    print("-" * 75)
+
+    _timed("get_my_posts_live(limit=10)", lambda: service.get_my_posts_live(limit=10), server)
+    posts = _timed("get_my_posts_live() full history", service.get_my_posts_live, server)
+    ids = [p.id for p in posts[:args.sample]]
+
+    _timed(f"get_post_comments_live x{len(ids)} (sequential)",
+           lambda: [service.get_post_comments_live(pid) for pid in ids], server)
+    _timed(f"fetch_comments_for_posts({len(ids)}) (async)",
+           lambda: fetch_comments_for_posts(ids, base_url=base_url, rate_per_sec=args.rate), server)
+    _timed(f"get_post_insights_live x{len(ids)} (sequential)",
+           lambda: [service.get_post_insights_live(pid) for pid in ids], server)
+    _timed(f"get_posts_insights_live({len(ids)}) (batched)",
+           lambda: service.get_posts_insights_live(ids), server)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
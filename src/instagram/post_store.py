@@ -0,0 +1,76 @@
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.instagram.schemas import InstaPost
+
+
+class PostStore:
+    """
+    In-memory index over a posts JSON file (mock mode).
+
+    The file is parsed once into an id → post dict and a list sorted by
+    created_at (newest first). It is re-read only when its mtime or size
+    changes, so lookups are O(1) and "recent N" is a slice.
+    """
+
+    def __init__(self, path: Path, parse: Callable[[dict], InstaPost]):
+        self.path = Path(path)
+        self.parse = parse
+        self.version = 0
+        self._signature: Optional[Tuple[int, int]] = None
+        self._by_id: Dict[str, InstaPost] = {}
+        self._sorted: List[InstaPost] = []
+        self._lock = threading.Lock()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self) -> bool:
+        """
+        Reload if the file changed since the last load. Returns True if it did.
+        """
+        signature = self._stat()
+        if signature == self._signature and self.version:
+            return False
+
+        with self._lock:
+            signature = self._stat()
+            if signature == self._signature and self.version:
+                return False
+
+            raw_posts: list = []
+            if signature is not None:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    raw_posts = json.load(f)
+
+            posts = [self.parse(p) for p in raw_posts]
+            by_id: Dict[str, InstaPost] = {}
+            for p in posts:
+                # keep the first occurrence, like the old linear scan did
+                by_id.setdefault(p.id, p)
+
+            self._by_id = by_id
+            self._sorted = sorted(posts, key=lambda p: p.created_at, reverse=True)
+            self._signature = signature
+            self.version += 1
+            return True
+
+    def get(self, post_id: str) -> Optional[InstaPost]:
+        self.refresh()
+        return self._by_id.get(str(post_id))
+
+    def recent(self, limit: Optional[int] = None) -> List[InstaPost]:
+        self.refresh()
+        if limit is None:
+            return list(self._sorted)
+        return self._sorted[:limit]
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._sorted)
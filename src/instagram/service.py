@@ -4,11 +4,13 @@ import json
 from datetime import datetime, timezone
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from dotenv import load_dotenv
 
-from src.instagram.api_client import USER_ID, ig_get
+from src.instagram.api_client import IG_BATCH_SIZE, USER_ID, ig_batch, ig_get
+from src.instagram.post_store import PostStore
 from src.instagram.schemas import InstaPost, InstaComment, InstaPostInsights
 from src.db.models import get_session, CommentRecord
 
@@ -20,16 +22,11 @@ POSTS_PATH = DATA_DIR / "posts.json"
 env_path = Path(__file__).resolve().parents[2] / ".env"
 load_dotenv(dotenv_path=env_path)
 USE_REAL_IG_API = os.getenv("USE_REAL_IG_API", "false").lower() == "true"
+# In live mode, serve reads from the local SQLite mirror (see instagram/sync.py)
+USE_IG_MIRROR = os.getenv("USE_IG_MIRROR", "true").lower() == "true"
 
 # ================= MOCK IMPLEMENTATION (LOCAL DATA) =================
 
-def _load_posts_raw() -> list[dict]:
-    if not POSTS_PATH.exists():
-        return []
-    with open(POSTS_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
 def _parse_post(raw: dict) -> InstaPost:
     # posts.json has created_at as string; parse to datetime
     created_at_str = raw.get("created_at") or raw.get("createdAt") or ""
@@ -56,26 +53,13 @@ def _parse_post(raw: dict) -> InstaPost:
 
 def get_my_posts_mock(limit: Optional[int] = None) -> List[InstaPost]:
     """
-    Return recent posts from local posts.json.
+    Return recent posts from local posts.json (newest first).
     """
-    raw_posts = _load_posts_raw()
-    posts = [_parse_post(p) for p in raw_posts]
-
-    # Sort by created_at desc
-    posts_sorted = sorted(posts, key=lambda p: p.created_at, reverse=True)
-
-    if limit is not None:
-        posts_sorted = posts_sorted[:limit]
-
-    return posts_sorted
+    return _post_store.recent(limit)
 
 
 def get_post_by_id_mock(post_id: str) -> Optional[InstaPost]:
-    raw_posts = _load_posts_raw()
-    for p in raw_posts:
-        if str(p.get("id")) == str(post_id):
-            return _parse_post(p)
-    return None
+    return _post_store.get(post_id)
 
 
 def get_post_insights_mock(post_id: str) -> Optional[InstaPostInsights]:
@@ -128,8 +112,139 @@ def get_post_comments_mock(post_id: str, limit: Optional[int] = None) -> List[In
 
 
 
+# parsed once, re-read only when posts.json changes on disk
+_post_store = PostStore(POSTS_PATH, parse=_parse_post)
+
+
 # ================= REAL INSTAGRAM GRAPH API IMPLEMENTATION =================
 
+MEDIA_FIELDS = (
+    "id,caption,media_type,media_url,thumbnail_url,"
+    "timestamp,like_count,comments_count"
+)
+COMMENT_FIELDS = "id,text,username,timestamp"
+
+# Graph API caps a page at 100 items for media/comments edges
+MAX_PAGE_SIZE = 100
+
+
+def _parse_ig_timestamp(ts: Optional[str]) -> Optional[datetime]:
+    if not ts:
+        return None
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+
+def _parse_live_post(item: dict) -> InstaPost:
+    caption = item.get("caption", "") or ""
+    return InstaPost(
+        id=item["id"],
+        type=item.get("media_type", "unknown"),
+        caption=caption,
+        hashtags=[w for w in caption.split() if w.startswith("#")],
+        created_at=_parse_ig_timestamp(item.get("timestamp")) or datetime.utcnow(),
+        likes=int(item.get("like_count", 0) or 0),
+        comments_count=int(item.get("comments_count", 0) or 0),
+    )
+
+
+def _parse_live_comment(item: dict, post_id: str) -> InstaComment:
+    return InstaComment(
+        id=item["id"],
+        post_id=post_id,
+        text=item.get("text", ""),
+        author=item.get("username"),
+        created_at=_parse_ig_timestamp(item.get("timestamp")),
+    )
+
+
+def _with_limit(url: str, limit: int) -> str:
+    """
+    `url` with its `limit` query parameter set to `limit`.
+    """
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "limit"]
+    query.append(("limit", str(limit)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _iter_edge(
+    path: str,
+    params: dict,
+    limit: Optional[int] = None,
+    page_size: int = 25,
+    parse: Optional[Callable[[dict], Any]] = None,
+) -> Iterator[Any]:
+    """
+    Lazily walk a Graph API edge (e.g. /media, /comments) page by page,
+    following `paging.next` cursors. The page size sent to the API never
+    exceeds what is still needed (the `limit` of each next URL is rewritten),
+    and no further page is requested once `limit` items have been yielded.
+    With `parse`, items are yielded parsed; items it fails on are skipped
+    and don't count towards `limit`.
+    """
+    remaining = limit
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    next_url: Optional[str] = path
+    first = True
+    while next_url:
+        if remaining is not None and remaining <= 0:
+            return
+        request_size = min(page_size, remaining) if remaining is not None else page_size
+
+        if first:
+            req_params = dict(params)
+            req_params["limit"] = request_size
+            data = ig_get(next_url, params=req_params)
+            first = False
+        else:
+            data = ig_get(_with_limit(next_url, request_size))
+
+        items = data.get("data", [])
+        for item in items:
+            if remaining is not None and remaining <= 0:
+                return
+            if parse is not None:
+                try:
+                    item = parse(item)
+                except Exception as e:
+                    print(f"Error parsing item from {path}:", e)
+                    continue
+            if remaining is not None:
+                remaining -= 1
+            yield item
+
+        next_url = (data.get("paging") or {}).get("next") if items else None
+
+
+def iter_my_posts_live(limit: Optional[int] = None, page_size: int = 25) -> Iterator[InstaPost]:
+    """
+    Stream posts newest-first from the Graph API, one page at a time.
+    """
+    if not USER_ID:
+        raise RuntimeError("USER_ID is not set. Check INSTAGRAM_USER_ID in your .env.")
+
+    yield from _iter_edge(
+        f"{USER_ID}/media", {"fields": MEDIA_FIELDS},
+        limit=limit, page_size=page_size, parse=_parse_live_post,
+    )
+
+
+def iter_post_comments_live(
+    post_id: str,
+    limit: Optional[int] = None,
+    page_size: int = 50,
+) -> Iterator[InstaComment]:
+    """
+    Stream comments of a post from the Graph API, one page at a time.
+    """
+    for item in _iter_edge(f"{post_id}/comments", {"fields": COMMENT_FIELDS}, limit=limit, page_size=page_size):
+        yield _parse_live_comment(item, post_id)
+
+
 def get_my_posts_live(limit: Optional[int] = None):
     """
     Live version: fetch posts from Instagram Graph API.
@@ -139,146 +254,90 @@ def get_my_posts_live(limit: Optional[int] = None):
     - INSTAGRAM_USER_ID
     configured in instagram/api_client.py and .env
     """
-    
-    if not USER_ID:
-        raise RuntimeError("USER_ID is not set. Check INSTAGRAM_USER_ID in your .env.")
-    fields = (
-        "id,caption,media_type,media_url,thumbnail_url,"
-        "timestamp,like_count,comments_count"
-    )
-    
-    data = ig_get(f"{USER_ID}/media", params={"fields": fields})
-
-    items = data.get("data", [])
-    
-    posts = []
-    for item in items:
-        try:
-            posts.append(
-                InstaPost(
-                    id=item["id"],
-                    type=item.get("media_type", "unknown"),
-                    caption=item.get("caption", ""),
-                    hashtags=[h for h in item.get("caption", "").split() if h.startswith("#")],
-                    created_at=datetime.fromisoformat(item.get("timestamp")),
-                    likes=item.get("like_count", 0),
-                    comments_count=item.get("comments_count", 0),
-                )
-            )
-        except Exception as e:
-            print("Error parsing post:", e)
-
-    posts_sorted = sorted(posts, key=lambda p: p.created_at, reverse=True)
-
-    if limit:
-        posts_sorted = posts_sorted[:limit]
-
-    return posts_sorted
+    posts = list(iter_my_posts_live(limit=limit))
+    return sorted(posts, key=lambda p: p.created_at, reverse=True)
 
 def get_post_by_id_live(post_id: str) -> Optional[InstaPost]:
     """
     Live version: fetch a single media object.
     """
-    fields = (
-        "id,caption,media_type,media_url,thumbnail_url,"
-        "timestamp,like_count,comments_count"
-    )
-    data = ig_get(post_id, params={"fields": fields})
+    data = ig_get(post_id, params={"fields": MEDIA_FIELDS})
 
     if "id" not in data:
         return None
 
-    caption = data.get("caption", "") or ""
-    hashtags = [w for w in caption.split() if w.startswith("#")]
-
-    ts = data.get("timestamp")
-    try:
-        created_at = datetime.fromisoformat(ts.replace("Z", "+00:00")) if ts else datetime.utcnow()
-    except Exception:
-        created_at = datetime.utcnow()
-
-    return InstaPost(
-        id=data["id"],
-        type=data.get("media_type", "unknown"),
-        caption=caption,
-        hashtags=hashtags,
-        created_at=created_at,
-        likes=int(data.get("like_count", 0) or 0),
-        comments_count=int(data.get("comments_count", 0) or 0),
-    )
+    return _parse_live_post(data)
 
 def get_post_comments_live(post_id: str, limit: Optional[int] = None):
     """
     Live version: fetch comments from Instagram Graph API.
     """
-    fields = "id,text,username,timestamp"
+    return list(iter_post_comments_live(post_id, limit=limit))
 
-    data = ig_get(f"{post_id}/comments", params={"fields": fields})
+def _parse_insights(metrics_list: list) -> dict:
+    insights = {}
+    for item in metrics_list:
+        name = item.get("name")
+        values = item.get("values", [])
+        if values:
+            insights[name] = values[0].get("value", 0)
+    return insights
 
-    items = data.get("data", [])
 
-    comments: List[InstaComment] = []
+def get_posts_insights_live(
+    post_ids: List[str],
+    batch_size: int = IG_BATCH_SIZE,
+) -> Dict[str, InstaPostInsights]:
+    """
+    Live version: insights for many posts using Graph API batch requests.
 
-    for c in items:
-        ts = c.get("timestamp")
-        try:
-            created_at = datetime.fromisoformat(ts.replace("Z", "+00:00")) if ts else None
-        except Exception:
-            created_at = None
+    Each post needs two operations (media fields + /insights), and up to
+    `batch_size` operations share one HTTP call, so 50 posts cost 2 calls
+    with the default batch size instead of 100-150 sequential ones.
+    Posts that can't be read are left out of the result.
+    """
+    metric = "impressions,reach,likes,comments"
 
-        comments.append(
-            InstaComment(
-                id=c["id"],
-                post_id=post_id,
-                text=c.get("text", ""),
-                author=c.get("username"),
-                created_at=created_at,
-            )
-        )
+    unique_ids = list(dict.fromkeys(str(pid) for pid in post_ids))
+    operations = []
+    for pid in unique_ids:
+        operations.append({"method": "GET", "relative_url": f"{pid}?{urlencode({'fields': MEDIA_FIELDS})}"})
+        operations.append({"method": "GET", "relative_url": f"{pid}/insights?{urlencode({'metric': metric})}"})
 
-    if limit is not None:
-        comments = comments[:limit]
+    results = ig_batch(operations, batch_size=batch_size)
+
+    out: Dict[str, InstaPostInsights] = {}
+    for i, pid in enumerate(unique_ids):
+        media, insights_res = results[2 * i], results[2 * i + 1]
+
+        post = None
+        if media["code"] == 200 and media["body"] and "id" in media["body"]:
+            post = _parse_live_post(media["body"])
+
+        insights = {}
+        if insights_res["code"] == 200 and insights_res["body"]:
+            insights = _parse_insights(insights_res["body"].get("data", []))
+
+        if post is None and not insights:
+            continue
+
+        # Fallback for likes/comments if not in insights
+        out[pid] = InstaPostInsights(
+            post_id=pid,
+            likes=insights.get("likes", post.likes if post else 0),
+            comments=insights.get("comments", post.comments_count if post else 0),
+        )
+    return out
 
-    return comments
 
 def get_post_insights_live(post_id: str) -> Optional[InstaPostInsights]:
     """
     Live version: fetch insights metrics for a post.
     NOTE: Requires that your IG account & app have insights permissions
     and that the media type supports insights.
+    Media fields and insights are fetched in a single batch call.
     """
-   
-    metric = "impressions,reach,likes,comments"
-
-    data = ig_get(f"{post_id}/insights", params={"metric": metric})
-
-    metrics_list = data.get("data", [])
-    if not metrics_list:
-        # Fallback: try basic post data
-        post = get_post_by_id_live(post_id)
-        if post is None:
-            return None
-        return InstaPostInsights(
-            post_id=post.id,
-            likes=post.likes,
-            comments=post.comments_count,
-        )
-
-    insights = {}
-    for item in metrics_list:
-        name = item.get("name")
-        values = item.get("values", [])
-        if values:
-            insights[name] = values[0].get("value", 0)
-
-    # Fallback for likes/comments if not in insights
-    post = get_post_by_id_live(post_id)
-
-    return InstaPostInsights(
-        post_id=post_id,
-        likes=insights.get("likes", post.likes if post else 0),
-        comments=insights.get("comments", post.comments_count if post else 0),
-    )
+    return get_posts_insights_live([post_id]).get(str(post_id))
 
 # ================= PUBLIC API (SWITCHING BETWEEN MOCK & LIVE) =================
 
@@ -286,29 +345,99 @@ def get_my_posts(limit: Optional[int] = None) -> List[InstaPost]:
     """
     Public function for the rest of the app.
 
-    If USE_REAL_IG_API=true → use live Graph API.
+    If USE_REAL_IG_API=true → use live Graph API (through the local mirror
+    unless USE_IG_MIRROR=false).
     Else → use local mock posts.json.
     """
     print("USE_REAL_IG_API =", USE_REAL_IG_API)
     if USE_REAL_IG_API:
+        if USE_IG_MIRROR:
+            from src.instagram import sync
+            sync.ensure_fresh()
+            return sync.get_posts(limit=limit)
         return get_my_posts_live(limit=limit)
     return get_my_posts_mock(limit=limit)
 
 
+def iter_my_posts(limit: Optional[int] = None) -> Iterator[InstaPost]:
+    """
+    Streaming variant of get_my_posts (newest first).
+    In live mode pages are fetched lazily, so callers can stop early or walk
+    the full account history without holding it all in memory.
+    """
+    if USE_REAL_IG_API:
+        if USE_IG_MIRROR:
+            from src.instagram import sync
+            sync.ensure_fresh()
+            return sync.iter_posts(limit=limit)
+        return iter_my_posts_live(limit=limit)
+    return iter(get_my_posts_mock(limit=limit))
+
 
 def get_post_by_id(post_id: str) -> Optional[InstaPost]:
     if USE_REAL_IG_API:
+        if USE_IG_MIRROR:
+            from src.instagram import sync
+            post = sync.get_post(post_id)
+            if post is not None:
+                return post
         return get_post_by_id_live(post_id)
     return get_post_by_id_mock(post_id)
 
 
 def get_post_insights(post_id: str) -> Optional[InstaPostInsights]:
+    return get_posts_insights([post_id]).get(str(post_id))
+
+
+def get_posts_insights(post_ids: List[str]) -> Dict[str, InstaPostInsights]:
+    """
+    Insights for many posts at once (batched in live mode).
+    """
     if USE_REAL_IG_API:
-        return get_post_insights_live(post_id)
-    return get_post_insights_mock(post_id)
+        if USE_IG_MIRROR:
+            from src.instagram import sync
+            sync.ensure_fresh()
+            found = sync.get_insights(post_ids)
+            missing = [pid for pid in post_ids if pid not in found]
+            if missing:
+                found.update(get_posts_insights_live(missing))
+            return found
+        return get_posts_insights_live(post_ids)
+    out: Dict[str, InstaPostInsights] = {}
+    for pid in post_ids:
+        insights = get_post_insights_mock(pid)
+        if insights is not None:
+            out[insights.post_id] = insights
+    return out
+
+
+def get_comments_for_posts(
+    post_ids: List[str],
+    limit_per_post: Optional[int] = None,
+) -> Dict[str, List[InstaComment]]:
+    """
+    Comments for many posts at once. In live mode the posts are fetched
+    concurrently through the async client (see instagram/async_client.py).
+    """
+    if USE_REAL_IG_API:
+        from src.instagram.async_client import fetch_comments_for_posts
+        return fetch_comments_for_posts(post_ids, limit_per_post=limit_per_post)
+    return {pid: get_post_comments_mock(pid, limit=limit_per_post) for pid in post_ids}
 
 
 def get_post_comments(post_id: str, limit: Optional[int] = None) -> List[InstaComment]:
     if USE_REAL_IG_API:
+        if USE_IG_MIRROR:
+            from src.instagram import sync
+            return sync.get_comments(post_id, limit=limit)
         return get_post_comments_live(post_id, limit=limit)
-    return get_post_comments_mock(post_id, limit=limit)
\ No newline at end of file
+    return get_post_comments_mock(post_id, limit=limit)
+
+
+def iter_post_comments(post_id: str, limit: Optional[int] = None) -> Iterator[InstaComment]:
+    if USE_REAL_IG_API:
+        if USE_IG_MIRROR:
+            from src.instagram import sync
+            return iter(sync.get_comments(post_id, limit=limit))
+        return iter_post_comments_live(post_id, limit=limit)
+    return iter(get_post_comments_mock(post_id, limit=limit))
@@ -0,0 +1,349 @@
+# src/instagram/stub_server.py
+#
+# Local stand-in for the parts of the Instagram Graph API the client uses,
+# for reproducible throughput tests of the live code paths.
+#
+# Run:  python -m src.instagram.stub_server --posts 500 --comments 30 --latency-ms 40
+# Then: IG_BASE_URL=http://127.0.0.1:8765/v24.0 INSTAGRAM_ACCESS_TOKEN=stub INSTAGRAM_USER_ID=stub_user ...
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+STUB_USER_ID = "stub_user"
+
+HASHTAGS = [
+    "#animeart", "#digitalart", "#portrait", "#sketching", "#timelapse",
+    "#procreate", "#fanart", "#cozyart", "#lofi", "#characterdesign",
+]
+MEDIA_TYPES = ["VIDEO", "IMAGE", "CAROUSEL_ALBUM"]
+
+
+@dataclass
+class StubConfig:
+    num_posts: int = 200
+    comments_per_post: int = 20
+    latency_ms: float = 0.0          # mean added latency per request
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0          # share of requests answered with a 500
+    rate_limit: int = 0              # max calls per rate_window seconds (0 = unlimited)
+    rate_window: float = 60.0
+    max_page_size: int = 100
+    seed: int = 42
+
+
+@dataclass
+class StubCorpus:
+    posts: List[Dict[str, Any]] = field(default_factory=list)
+    posts_by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    comments: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
+
+def build_corpus(config: StubConfig) -> StubCorpus:
+    """
+    Deterministic fake account: posts newest-first, N comments per post.
+    """
+    rng = random.Random(config.seed)
+    corpus = StubCorpus()
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    for i in range(config.num_posts):
+        pid = f"1790{i:010d}"
+        created = start - timedelta(hours=12 * i)
+        tags = rng.sample(HASHTAGS, k=rng.randint(1, 4))
+        post = {
+            "id": pid,
+            "caption": f"Stub post {i} " + " ".join(tags),
+            "media_type": rng.choice(MEDIA_TYPES),
+            "media_url": f"https://example.com/media/{pid}.jpg",
+            "timestamp": created.strftime("%Y-%m-%dT%H:%M:%S+0000"),
+            "like_count": rng.randint(10, 500),
+            "comments_count": config.comments_per_post,
+            "reach": rng.randint(100, 5000),
+            "impressions": rng.randint(100, 8000),
+        }
+        corpus.posts.append(post)
+        corpus.posts_by_id[pid] = post
+        corpus.comments[pid] = [
+            {
+                "id": f"{pid}_c{j}",
+                "text": f"Comment {j} on post {i}",
+                "username": f"fan_{rng.randint(1, 999)}",
+                "timestamp": (created + timedelta(minutes=5 * j)).strftime("%Y-%m-%dT%H:%M:%S+0000"),
+            }
+            for j in range(config.comments_per_post)
+        ]
+    return corpus
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        return 0
+
+
+class StubGraphAPI:
+    """
+    Request router and state (corpus, rate-limit window, counters),
+    independent of the HTTP layer.
+    """
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.corpus = build_corpus(config)
+        self.rng = random.Random(config.seed + 1)
+        self.calls: deque = deque()
+        self.total_requests = 0
+        self.lock = threading.Lock()
+
+    # ---- rate limit / faults ----
+
+    def _usage_headers(self) -> Tuple[bool, Dict[str, str]]:
+        now = time.monotonic()
+        with self.lock:
+            self.total_requests += 1
+            while self.calls and now - self.calls[0] > self.config.rate_window:
+                self.calls.popleft()
+            self.calls.append(now)
+            used = len(self.calls)
+
+        limit = self.config.rate_limit
+        pct = int(100 * used / limit) if limit else 0
+        limited = bool(limit) and used > limit
+        regain = int(self.config.rate_window // 60) if limited else 0
+        headers = {
+            "X-App-Usage": json.dumps({"call_count": pct, "total_time": 0, "total_cputime": 0}),
+            "X-Business-Use-Case-Usage": json.dumps({
+                STUB_USER_ID: [{
+                    "type": "instagram",
+                    "call_count": pct,
+                    "total_time": 0,
+                    "total_cputime": 0,
+                    "estimated_time_to_regain_access": regain,
+                }]
+            }),
+        }
+        if limited:
+            oldest = self.calls[0] if self.calls else now
+            headers["Retry-After"] = str(max(1, int(self.config.rate_window - (now - oldest))))
+        return limited, headers
+
+    def _sleep_latency(self) -> None:
+        ms = self.config.latency_ms
+        if self.config.latency_jitter_ms:
+            ms += self.rng.uniform(-self.config.latency_jitter_ms, self.config.latency_jitter_ms)
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    # ---- endpoints ----
+
+    def _page(self, items: List[dict], query: Dict[str, str], next_base: str) -> dict:
+        limit = min(int(query.get("limit", 25) or 25), self.config.max_page_size)
+        offset = _decode_cursor(query.get("after"))
+        page = items[offset:offset + limit]
+        out: Dict[str, Any] = {"data": page}
+        if page:
+            out["paging"] = {
+                "cursors": {
+                    "before": _encode_cursor(offset),
+                    "after": _encode_cursor(offset + len(page)),
+                }
+            }
+            if offset + len(page) < len(items):
+                q = {k: v for k, v in query.items() if k != "after"}
+                q["after"] = _encode_cursor(offset + len(page))
+                out["paging"]["next"] = f"{next_base}?{urlencode(q)}"
+        return out
+
+    @staticmethod
+    def _select_fields(obj: dict, fields: Optional[str]) -> dict:
+        if not fields:
+            return {"id": obj["id"]}
+        wanted = [f.strip() for f in fields.split(",") if f.strip()]
+        return {k: obj[k] for k in wanted if k in obj}
+
+    def handle_get(self, path: str, query: Dict[str, str], base: str) -> Tuple[int, Any]:
+        parts = [p for p in path.split("/") if p]
+        # tolerate an API version prefix like /v24.0/...
+        if parts and parts[0].startswith("v") and parts[0][1:2].isdigit():
+            base = f"{base}/{parts[0]}"
+            parts = parts[1:]
+
+        if "access_token" not in query:
+            return 400, {"error": {"message": "An access token is required", "code": 104}}
+
+        if len(parts) == 2 and parts[1] == "media" and parts[0] in (STUB_USER_ID, "me"):
+            items = [self._select_fields(p, query.get("fields")) for p in self.corpus.posts]
+            return 200, self._page(items, query, f"{base}/{parts[0]}/media")
+
+        if len(parts) == 1 and parts[0] in self.corpus.posts_by_id:
+            return 200, self._select_fields(self.corpus.posts_by_id[parts[0]], query.get("fields"))
+
+        if len(parts) == 2 and parts[1] == "comments" and parts[0] in self.corpus.comments:
+            items = [self._select_fields(c, query.get("fields")) for c in self.corpus.comments[parts[0]]]
+            return 200, self._page(items, query, f"{base}/{parts[0]}/comments")
+
+        if len(parts) == 2 and parts[1] == "insights" and parts[0] in self.corpus.posts_by_id:
+            post = self.corpus.posts_by_id[parts[0]]
+            values = {
+                "impressions": post["impressions"],
+                "reach": post["reach"],
+                "likes": post["like_count"],
+                "comments": post["comments_count"],
+            }
+            metrics = [m.strip() for m in query.get("metric", "").split(",") if m.strip()]
+            return 200, {
+                "data": [
+                    {"name": m, "period": "lifetime", "values": [{"value": values[m]}]}
+                    for m in metrics if m in values
+                ]
+            }
+
+        return 404, {"error": {"message": f"Unsupported get request: /{'/'.join(parts)}", "code": 100}}
+
+    def handle_batch(self, form: Dict[str, str], base: str) -> Tuple[int, Any]:
+        try:
+            operations = json.loads(form.get("batch", "[]"))
+        except ValueError:
+            return 400, {"error": {"message": "Invalid batch param", "code": 100}}
+        if len(operations) > 50:
+            return 400, {"error": {"message": "Too many requests in batch", "code": 1}}
+
+        token = form.get("access_token")
+        results = []
+        for op in operations:
+            rel = urlparse("/" + op.get("relative_url", "").lstrip("/"))
+            query = {k: v[0] for k, v in parse_qs(rel.query).items()}
+            if token and "access_token" not in query:
+                query["access_token"] = token
+            code, body = self.handle_get(rel.path, query, base)
+            results.append({"code": code, "headers": [], "body": json.dumps(body)})
+        return 200, results
+
+
+def _make_handler(api: StubGraphAPI):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # buffer headers + body into one write (avoids Nagle/delayed-ACK stalls)
+        wbufsize = 1 << 16
+
+        def log_message(self, format, *args):  # keep benchmark output clean
+            pass
+
+        def _base(self) -> str:
+            return f"http://{self.headers.get('Host', '127.0.0.1')}"
+
+        def _send(self, code: int, body: Any, headers: Dict[str, str]) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _preflight(self) -> Optional[Dict[str, str]]:
+            api._sleep_latency()
+            limited, headers = api._usage_headers()
+            if limited:
+                self._send(429, {"error": {"message": "Application request limit reached", "code": 4}}, headers)
+                return None
+            if api.config.error_rate and api.rng.random() < api.config.error_rate:
+                self._send(500, {"error": {"message": "An unknown error occurred", "code": 1}}, headers)
+                return None
+            return headers
+
+        def do_GET(self):
+            headers = self._preflight()
+            if headers is None:
+                return
+            parsed = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            code, body = api.handle_get(parsed.path, query, self._base())
+            self._send(code, body, headers)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0) or 0)
+            raw = self.rfile.read(length).decode("utf-8") if length else ""
+            headers = self._preflight()
+            if headers is None:
+                return
+            form = {k: v[0] for k, v in parse_qs(raw).items()}
+            code, body = api.handle_batch(form, self._base())
+            self._send(code, body, headers)
+
+    return Handler
+
+
+def start_stub_server(
+    config: Optional[StubConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the stub in a daemon thread. Returns (server, base_url); the base
+    URL includes the API version so it can be used as IG_BASE_URL directly.
+    Call server.shutdown() when done.
+    """
+    api = StubGraphAPI(config or StubConfig())
+    server = ThreadingHTTPServer((host, port), _make_handler(api))
+    server.daemon_threads = True
+    server.api = api
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}/v24.0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Instagram Graph API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--comments", type=int, default=20, help="comments per post")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="calls per window, 0 = unlimited")
+    parser.add_argument("--rate-window", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        num_posts=args.posts,
+        comments_per_post=args.comments,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+        seed=args.seed,
+    )
+    server, base_url = start_stub_server(config, host=args.host, port=args.port)
+    print(f"Stub Graph API on {base_url} (user id: {STUB_USER_ID})")
+    print(f"export IG_BASE_URL={base_url} INSTAGRAM_ACCESS_TOKEN=stub INSTAGRAM_USER_ID={STUB_USER_ID}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
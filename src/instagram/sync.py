@@ -0,0 +1,311 @@
+# src/instagram/sync.py
+#
+# Incremental local mirror of the live Instagram account (PostRecord,
+# CommentRecord, SyncStateRecord), so reads are local queries instead of
+# Graph API calls on every Streamlit rerun.
+# - new posts: walk /media newest-first and stop at the last synced post
+# - metrics: insights re-read only for recent posts, on an interval
+# - comments: fetched only for posts whose comments_count went up
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from src.db.logging import log_insta_comments
+from src.db.models import CommentRecord, PostRecord, SyncStateRecord, get_session
+from src.instagram.schemas import InstaComment, InstaPost, InstaPostInsights
+from src.instagram.service import (
+    get_comments_for_posts,
+    get_posts_insights_live,
+    iter_my_posts_live,
+)
+
+# ---- CONFIG ----
+
+# reads are served from the mirror if it was synced within this many seconds
+IG_MIRROR_MAX_AGE = float(os.getenv("IG_MIRROR_MAX_AGE", "300"))
+# only posts younger than this get their metrics refreshed
+IG_MIRROR_RECENT_DAYS = int(os.getenv("IG_MIRROR_RECENT_DAYS", "14"))
+IG_MIRROR_METRICS_INTERVAL = float(os.getenv("IG_MIRROR_METRICS_INTERVAL", "3600"))
+
+POSTS_KEY = "posts"
+
+_sync_lock = threading.Lock()
+
+
+def _as_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """
+    Timestamps are written as aware UTC; depending on the SQLModel version
+    SQLite hands them back naive, so treat naive values as UTC.
+    """
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _to_post(rec: PostRecord) -> InstaPost:
+    return InstaPost(
+        id=rec.id,
+        type=rec.type,
+        caption=rec.caption,
+        hashtags=json.loads(rec.hashtags_json or "[]"),
+        created_at=_as_utc(rec.created_at),
+        likes=rec.likes,
+        comments_count=rec.comments_count,
+    )
+
+
+def _get_state(session, key: str) -> SyncStateRecord:
+    state = session.get(SyncStateRecord, key)
+    if state is None:
+        state = SyncStateRecord(key=key)
+    return state
+
+
+def _is_fresh(state: Optional[SyncStateRecord], max_age: float) -> bool:
+    if state is None or state.last_synced_at is None:
+        return False
+    return (_now() - _as_utc(state.last_synced_at)).total_seconds() <= max_age
+
+
+# ---- SYNC ----
+
+def sync_posts() -> List[InstaPost]:
+    """
+    Fetch posts newer than the last synced one and upsert them.
+    Returns the new/changed posts.
+    """
+    with get_session() as session:
+        state = _get_state(session, POSTS_KEY)
+        last_id, last_at = state.cursor, _as_utc(state.last_item_at)
+
+    fetched: List[InstaPost] = []
+    for post in iter_my_posts_live():
+        created = _as_utc(post.created_at)
+        if last_at is not None and (post.id == last_id or created < last_at):
+            break
+        fetched.append(post)
+
+    changed_comments: List[str] = []
+    with get_session() as session:
+        now = _now()
+        for post in fetched:
+            rec = session.get(PostRecord, post.id)
+            if rec is None:
+                rec = PostRecord(id=post.id, created_at=_as_utc(post.created_at))
+                if post.comments_count:
+                    changed_comments.append(post.id)
+            elif post.comments_count > rec.comments_count:
+                changed_comments.append(post.id)
+            rec.type = post.type
+            rec.caption = post.caption
+            rec.hashtags_json = json.dumps(post.hashtags, ensure_ascii=False)
+            rec.likes = post.likes
+            rec.comments_count = post.comments_count
+            rec.metrics_refreshed_at = now
+            rec.synced_at = now
+            session.add(rec)
+
+        state = _get_state(session, POSTS_KEY)
+        if fetched:
+            newest = max(fetched, key=lambda p: p.created_at)
+            state.cursor = newest.id
+            state.last_item_at = _as_utc(newest.created_at)
+        state.last_synced_at = now
+        session.add(state)
+        session.commit()
+
+    if changed_comments:
+        sync_comments_for_posts(changed_comments)
+    return fetched
+
+
+def refresh_recent_metrics(
+    recent_days: int = IG_MIRROR_RECENT_DAYS,
+    interval: float = IG_MIRROR_METRICS_INTERVAL,
+) -> int:
+    """
+    Re-read likes/comments for recent posts whose metrics are older than
+    `interval` seconds (one batched insights call per ~25 posts).
+    Returns the number of posts refreshed.
+    """
+    now = _now()
+    with get_session() as session:
+        stmt = select(PostRecord).where(
+            PostRecord.created_at >= now - timedelta(days=recent_days)
+        )
+        due = [
+            rec.id for rec in session.exec(stmt)
+            if rec.metrics_refreshed_at is None
+            or (now - _as_utc(rec.metrics_refreshed_at)).total_seconds() >= interval
+        ]
+    if not due:
+        return 0
+
+    insights = get_posts_insights_live(due)
+
+    changed_comments: List[str] = []
+    with get_session() as session:
+        for pid, ins in insights.items():
+            rec = session.get(PostRecord, pid)
+            if rec is None:
+                continue
+            if ins.comments > rec.comments_count:
+                changed_comments.append(pid)
+            if (ins.likes, ins.comments) != (rec.likes, rec.comments_count):
+                rec.likes = ins.likes
+                rec.comments_count = ins.comments
+                # synced_at marks a content change (see mirror_signature)
+                rec.synced_at = now
+            rec.metrics_refreshed_at = now
+            session.add(rec)
+        session.commit()
+
+    if changed_comments:
+        sync_comments_for_posts(changed_comments)
+    return len(insights)
+
+
+def sync_comments_for_posts(post_ids: List[str]) -> int:
+    """
+    Fetch comments for the given posts and store the ones not seen before.
+    Returns the number of new comments.
+    """
+    by_post = get_comments_for_posts(post_ids)
+    new_comments = log_insta_comments([c for cs in by_post.values() for c in cs])
+
+    with get_session() as session:
+        now = _now()
+        for pid in post_ids:
+            state = _get_state(session, f"comments:{pid}")
+            state.last_synced_at = now
+            session.add(state)
+        session.commit()
+    return len(new_comments)
+
+
+def sync(max_age: float = IG_MIRROR_MAX_AGE, force: bool = False) -> bool:
+    """
+    Bring the mirror up to date if it is older than `max_age` seconds.
+    Returns True if a sync ran.
+    """
+    with _sync_lock:
+        if not force:
+            with get_session() as session:
+                if _is_fresh(session.get(SyncStateRecord, POSTS_KEY), max_age):
+                    return False
+        sync_posts()
+        refresh_recent_metrics()
+        return True
+
+
+def ensure_fresh(max_age: float = IG_MIRROR_MAX_AGE) -> None:
+    """
+    Sync if stale. If the API is unreachable but the mirror already has
+    data, keep serving it rather than failing the read.
+    """
+    try:
+        sync(max_age=max_age)
+    except Exception as e:
+        with get_session() as session:
+            has_data = session.exec(select(PostRecord.id).limit(1)).first() is not None
+        if not has_data:
+            raise
+        print("Instagram mirror sync failed, serving cached data:", e)
+
+
+# ---- READS ----
+
+def mirror_signature() -> str:
+    """
+    Changes whenever mirrored posts are added or their metrics change
+    (used to key caches such as the analytics posts snapshot). A metrics
+    refresh that finds nothing new leaves it unchanged.
+    """
+    with get_session() as session:
+        count, synced = session.exec(
+            select(func.count(PostRecord.id), func.max(PostRecord.synced_at))
+        ).one()
+    return f"mirror:{count}:{synced}"
+
+
+def iter_posts(limit: Optional[int] = None) -> Iterator[InstaPost]:
+    """
+    Mirrored posts newest-first, fetched from SQLite in chunks.
+    """
+    with get_session() as session:
+        stmt = (
+            select(PostRecord)
+            .order_by(PostRecord.created_at.desc())
+            .execution_options(yield_per=500)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        for rec in session.exec(stmt):
+            yield _to_post(rec)
+
+
+def get_posts(limit: Optional[int] = None) -> List[InstaPost]:
+    return list(iter_posts(limit=limit))
+
+
+def get_post(post_id: str) -> Optional[InstaPost]:
+    with get_session() as session:
+        rec = session.get(PostRecord, post_id)
+        return _to_post(rec) if rec is not None else None
+
+
+def get_insights(post_ids: List[str]) -> Dict[str, InstaPostInsights]:
+    with get_session() as session:
+        stmt = select(PostRecord).where(PostRecord.id.in_(post_ids))
+        return {
+            rec.id: InstaPostInsights(post_id=rec.id, likes=rec.likes, comments=rec.comments_count)
+            for rec in session.exec(stmt)
+        }
+
+
+def get_comments(
+    post_id: str,
+    limit: Optional[int] = None,
+    max_age: float = IG_MIRROR_MAX_AGE,
+) -> List[InstaComment]:
+    """
+    Comments for a post from the mirror; the post's comments are re-synced
+    first if they were last fetched more than `max_age` seconds ago.
+    """
+    with get_session() as session:
+        fresh = _is_fresh(session.get(SyncStateRecord, f"comments:{post_id}"), max_age)
+    if not fresh:
+        try:
+            sync_comments_for_posts([post_id])
+        except Exception as e:
+            print("Instagram comment sync failed, serving cached data:", e)
+
+    with get_session() as session:
+        stmt = (
+            select(CommentRecord)
+            .where(CommentRecord.post_id == post_id)
+            .order_by(CommentRecord.created_at.asc())
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return [
+            InstaComment(
+                id=rec.comment_id,
+                post_id=rec.post_id or post_id,
+                text=rec.text,
+                author=rec.author,
+                created_at=rec.created_at,
+            )
+            for rec in session.exec(stmt)
+        ]
@@ -0,0 +1,236 @@
+# src/instagram/webhook.py
+#
+# Small receiver for Instagram "comments" webhook notifications, so new
+# comments land in CommentRecord as they happen instead of being polled.
+#
+# Run: python -m src.instagram.webhook --port 8787 --replies
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+from src.db.logging import log_insta_comments, log_reply_batch
+from src.instagram.schemas import InstaComment
+
+env_path = Path(__file__).resolve().parents[2] / ".env"
+load_dotenv(dotenv_path=env_path)
+
+IG_APP_SECRET = os.getenv("IG_APP_SECRET")                      # signs POST payloads
+IG_WEBHOOK_VERIFY_TOKEN = os.getenv("IG_WEBHOOK_VERIFY_TOKEN")  # used by the subscribe handshake
+
+# reply generation batching
+REPLY_BATCH_SIZE = int(os.getenv("IG_WEBHOOK_REPLY_BATCH_SIZE", "10"))
+REPLY_MAX_WAIT = float(os.getenv("IG_WEBHOOK_REPLY_MAX_WAIT", "30"))
+
+
+def verify_signature(body: bytes, signature_header: Optional[str], app_secret: Optional[str] = IG_APP_SECRET) -> bool:
+    """
+    Check the X-Hub-Signature-256 header ("sha256=<hex hmac of body>").
+    Payloads are rejected when no app secret is configured.
+    """
+    if not app_secret or not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = hmac.new(app_secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len("sha256="):])
+
+
+def parse_comment_notifications(payload: dict) -> List[InstaComment]:
+    """
+    Extract comments from a webhook payload:
+    {"object": "instagram", "entry": [{"time": ..., "changes": [{"field": "comments", "value": {...}}]}]}
+    """
+    comments: List[InstaComment] = []
+    if payload.get("object") != "instagram":
+        return comments
+
+    for entry in payload.get("entry", []):
+        ts = entry.get("time")
+        created_at = datetime.fromtimestamp(ts, tz=timezone.utc) if isinstance(ts, (int, float)) else None
+        for change in entry.get("changes", []):
+            if change.get("field") not in ("comments", "live_comments"):
+                continue
+            value = change.get("value") or {}
+            media_id = (value.get("media") or {}).get("id")
+            if not value.get("id") or not media_id:
+                continue
+            comments.append(
+                InstaComment(
+                    id=str(value["id"]),
+                    post_id=str(media_id),
+                    text=value.get("text", ""),
+                    author=(value.get("from") or {}).get("username"),
+                    created_at=created_at,
+                )
+            )
+    return comments
+
+
+def ingest_payload(payload: dict, reply_queue: Optional["ReplyQueue"] = None) -> List[InstaComment]:
+    """
+    Store the comments of one notification (duplicates are ignored) and
+    hand the new ones to the reply queue if there is one.
+    """
+    new_comments = log_insta_comments(parse_comment_notifications(payload))
+    if reply_queue is not None:
+        for c in new_comments:
+            reply_queue.put(c)
+    return new_comments
+
+
+class ReplyQueue:
+    """
+    Collects new comments per post and generates reply suggestions in
+    batches (one LLM call per post per batch, at "batch" priority).
+    A post's batch is flushed when it reaches `batch_size` comments or its
+    oldest comment has waited `max_wait` seconds.
+    """
+
+    def __init__(self, batch_size: int = REPLY_BATCH_SIZE, max_wait: float = REPLY_MAX_WAIT):
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Optional[InstaComment]]" = queue.Queue()
+        self._pending: Dict[str, List[InstaComment]] = {}
+        self._first_seen: Dict[str, float] = {}
+        self._thread = threading.Thread(target=self._run, name="webhook-replies", daemon=True)
+        self._thread.start()
+
+    def put(self, comment: InstaComment) -> None:
+        self._queue.put(comment)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _flush(self, post_id: str) -> None:
+        from src.graph.engagement_module import generate_reply_suggestions
+        from src.utils.schemas import Comment
+
+        batch = self._pending.pop(post_id, [])
+        self._first_seen.pop(post_id, None)
+        if not batch:
+            return
+        comments = [Comment(id=c.id, text=c.text, author=c.author) for c in batch]
+        try:
+            reply_batch = generate_reply_suggestions(comments, post_id=post_id, priority="batch")
+            log_reply_batch(reply_batch, post_id=post_id)
+        except Exception as e:
+            print(f"Reply generation failed for post {post_id}:", e)
+
+    def _run(self) -> None:
+        while True:
+            timeout = None
+            if self._first_seen:
+                oldest = min(self._first_seen.values())
+                timeout = max(0.0, oldest + self.max_wait - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ...
+
+            if item is None:
+                for post_id in list(self._pending):
+                    self._flush(post_id)
+                return
+
+            if isinstance(item, InstaComment):
+                self._pending.setdefault(item.post_id, []).append(item)
+                self._first_seen.setdefault(item.post_id, time.monotonic())
+                if len(self._pending[item.post_id]) >= self.batch_size:
+                    self._flush(item.post_id)
+
+            now = time.monotonic()
+            for post_id, first in list(self._first_seen.items()):
+                if now - first >= self.max_wait:
+                    self._flush(post_id)
+
+
+def _make_handler(reply_queue: Optional[ReplyQueue], app_secret: Optional[str], verify_token: Optional[str]):
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send(self, code: int, body: str = "") -> None:
+            payload = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            # subscription handshake
+            query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            if (
+                query.get("hub.mode") == "subscribe"
+                and verify_token
+                and hmac.compare_digest(query.get("hub.verify_token", ""), verify_token)
+            ):
+                self._send(200, query.get("hub.challenge", ""))
+            else:
+                self._send(403, "verification failed")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0) or 0)
+            body = self.rfile.read(length) if length else b""
+            if not verify_signature(body, self.headers.get("X-Hub-Signature-256"), app_secret):
+                self._send(403, "invalid signature")
+                return
+            try:
+                payload = json.loads(body.decode("utf-8"))
+            except ValueError:
+                self._send(400, "invalid json")
+                return
+            try:
+                new_comments = ingest_payload(payload, reply_queue)
+            except Exception as e:
+                # non-2xx makes Meta retry the delivery later
+                print("Webhook ingestion failed:", e)
+                self._send(500, "ingestion failed")
+                return
+            self._send(200, f"ok ({len(new_comments)} new)")
+
+    return Handler
+
+
+def run_webhook_server(
+    host: str = "127.0.0.1",
+    port: int = 8787,
+    generate_replies: bool = False,
+    app_secret: Optional[str] = IG_APP_SECRET,
+    verify_token: Optional[str] = IG_WEBHOOK_VERIFY_TOKEN,
+) -> None:
+    if not app_secret:
+        print("Warning: IG_APP_SECRET is not set, every POST will be rejected.")
+    reply_queue = ReplyQueue() if generate_replies else None
+    server = ThreadingHTTPServer((host, port), _make_handler(reply_queue, app_secret, verify_token))
+    print(f"Instagram webhook receiver on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if reply_queue is not None:
+            reply_queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instagram comments webhook receiver")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--replies", action="store_true", help="generate reply suggestions for new comments")
+    args = parser.parse_args()
+    run_webhook_server(args.host, args.port, generate_replies=args.replies)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,9 @@ from src.graph.engagement_module import generate_reply_suggestions
 from src.graph.ideation_module import generate_art_ideas
 from src.rag.pipeline import build_rag_chain
 from src.utils.schemas import ArtIdea, Comment
-from src.db.logging import log_idea_set, log_caption_set, log_comments_and_replies
-from src.db.queries import (get_recent_ideas, get_captions_for_idea, get_recent_reply_suggestions)
+from src.db.write_behind import get_log_writer
+from src.db.queries import (get_ideas_page, get_captions_for_idea_page, get_reply_suggestions_page, get_unreplied_comment_ids)
+from src.db.search import search_history
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
@@ -38,7 +39,7 @@ def ideas_and_captions_cli():
         return
 
     # LOG ideas to DB
-    log_idea_set(idea_set, user_hint=user_hint or None, source="cli")
+    get_log_writer().log_idea_set(idea_set, user_hint=user_hint or None, source="cli")
 
     print("\n✨ Generated Ideas ✨")
     if idea_set.mood_or_focus:
@@ -61,7 +62,7 @@ def ideas_and_captions_cli():
             caption_set = generate_captions_for_idea(matching_ideas[0])
 
             # LOG captions to DB
-            log_caption_set(matching_ideas[0], caption_set)
+            get_log_writer().log_caption_set(matching_ideas[0], caption_set)
             print(caption_set)
         else:
             print("No matching idea ID found.")
@@ -75,6 +76,15 @@ def generate_comment_replies_cli():
 
     post_id="post_987"
 
+    # only comments without stored suggestions go to the LLM
+    pending = set(get_unreplied_comment_ids(post_id, [c.id for c in comments]))
+    if len(pending) < len(comments):
+        print(f"Skipping {len(comments) - len(pending)} comment(s) that already have suggestions.")
+    comments = [c for c in comments if c.id in pending]
+    if not comments:
+        print("Nothing new to reply to.")
+        return
+
     reply_batch = generate_reply_suggestions(
         comments=comments,
         post_id=post_id,
@@ -87,7 +97,7 @@ def generate_comment_replies_cli():
             print(f"  Option {idx}: {suggestion}")
 
     # LOG comments + replies to DB
-    log_comments_and_replies(comments, reply_batch, post_id=post_id)
+    get_log_writer().log_comments_and_replies(comments, reply_batch, post_id=post_id)
 
 # view history of ideas, captions, replies
 def run_history_viewer():
@@ -96,64 +106,93 @@ def run_history_viewer():
     print("1) Recent ideas")
     print("2) Captions for a specific idea")
     print("3) Recent reply suggestions")
+    print("4) Search history")
     print("q) Back")
 
     choice = input("Choose an option: ").strip().lower()
 
     if choice == "1":
-        ideas = get_recent_ideas(limit=10)
+        ideas, cursor = get_ideas_page(limit=10)
         if not ideas:
             print("No ideas logged yet.")
             return
         print("\nLast ideas:")
-        for rec in ideas:
+        while True:
+            for rec in ideas:
+                print("-" * 50)
+                print(f"DB ID: {rec.id} | Idea ID: {rec.idea_id}")
+                print(f"Title: {rec.title}")
+                print(f"Mood/focus: {rec.mood_or_focus}")
+                print(f"Hint: {rec.user_hint}")
+                print(f"Created at (UTC): {rec.created_at}")
             print("-" * 50)
-            print(f"DB ID: {rec.id} | Idea ID: {rec.idea_id}")
-            print(f"Title: {rec.title}")
-            print(f"Mood/focus: {rec.mood_or_focus}")
-            print(f"Hint: {rec.user_hint}")
-            print(f"Created at (UTC): {rec.created_at}")
-        print("-" * 50)
+            if cursor is None or input("n) Older ideas, enter) Back: ").strip().lower() != "n":
+                break
+            ideas, cursor = get_ideas_page(limit=10, cursor=cursor)
 
     elif choice == "2":
         idea_id = input("Enter idea_id (from ‘Recent ideas’):\n> ").strip()
-        caps = get_captions_for_idea(idea_id)
+        caps, cursor = get_captions_for_idea_page(idea_id, limit=10)
         if not caps:
             print("No captions found for that idea.")
             return
         print(f"\nCaptions for idea_id={idea_id}:")
-        for rec in caps:
+        while True:
+            for rec in caps:
+                print("-" * 50)
+                print(f"Record ID: {rec.id} | Created at: {rec.created_at}")
+                captions = json.loads(rec.captions_json)
+                hashtags = json.loads(rec.hashtags_json)
+                tips = json.loads(rec.timelapse_tips_json) if rec.timelapse_tips_json else []
+                print("\nCaptions:")
+                for c in captions:
+                    print(f"- {c}")
+                print("\nHashtags:")
+                print(" ".join(hashtags))
+                if tips:
+                    print("\nTimelapse tips:")
+                    for t in tips:
+                        print(f"- {t}")
             print("-" * 50)
-            print(f"Record ID: {rec.id} | Created at: {rec.created_at}")
-            captions = json.loads(rec.captions_json)
-            hashtags = json.loads(rec.hashtags_json)
-            tips = json.loads(rec.timelapse_tips_json) if rec.timelapse_tips_json else []
-            print("\nCaptions:")
-            for c in captions:
-                print(f"- {c}")
-            print("\nHashtags:")
-            print(" ".join(hashtags))
-            if tips:
-                print("\nTimelapse tips:")
-                for t in tips:
-                    print(f"- {t}")
-        print("-" * 50)
+            if cursor is None or input("n) Older captions, enter) Back: ").strip().lower() != "n":
+                break
+            caps, cursor = get_captions_for_idea_page(idea_id, limit=10, cursor=cursor)
 
     elif choice == "3":
-        replies = get_recent_reply_suggestions(limit=10)
+        replies, cursor = get_reply_suggestions_page(limit=10)
         if not replies:
             print("No reply suggestions logged yet.")
             return
         print("\nRecent reply suggestions:")
-        for rec in replies:
+        while True:
+            for rec in replies:
+                print("-" * 50)
+                print(f"Post ID: {rec.post_id} | Comment ID: {rec.comment_id}")
+                print(f"Original: {rec.original_comment}")
+                suggestions = json.loads(rec.suggestions_json)
+                print("Suggestions:")
+                for s in suggestions:
+                    print(f"- {s}")
+                print(f"Created at: {rec.created_at}")
+            print("-" * 50)
+            if cursor is None or input("n) Older suggestions, enter) Back: ").strip().lower() != "n":
+                break
+            replies, cursor = get_reply_suggestions_page(limit=10, cursor=cursor)
+
+    elif choice == "4":
+        query = input("Search for (e.g. rainy anime):\n> ").strip()
+        hits = search_history(query, limit=20)
+        if not hits:
+            print("Nothing found.")
+            return
+        print(f"\nTop matches for '{query}':")
+        for hit in hits:
             print("-" * 50)
-            print(f"Post ID: {rec.post_id} | Comment ID: {rec.comment_id}")
-            print(f"Original: {rec.original_comment}")
-            suggestions = json.loads(rec.suggestions_json)
-            print("Suggestions:")
-            for s in suggestions:
-                print(f"- {s}")
-            print(f"Created at: {rec.created_at}")
+            print(f"[{hit.kind}] #{hit.record_id}" + (f" | Idea ID: {hit.idea_id}" if hit.idea_id else ""))
+            if hit.title:
+                print(f"Title: {hit.title}")
+            print(hit.snippet.replace("**", ""))
+            print(f"Created at (UTC): {hit.created_at}")
         print("-" * 50)
 
     else:
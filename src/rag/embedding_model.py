@@ -1,6 +1,8 @@
 from langchain_huggingface import HuggingFaceEmbeddings
 
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
 def get_embedding_model():
     return HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
+        model_name=EMBEDDING_MODEL_NAME
         ) 
\ No newline at end of file
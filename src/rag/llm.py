@@ -1,10 +1,13 @@
 
 from dotenv import load_dotenv
+from langchain_core.runnables import Runnable, RunnableLambda
 from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
 
+from src.rag.scheduler import get_scheduler
+
 load_dotenv()
 
-def get_llm() -> ChatHuggingFace:
+def _build_chat_model() -> ChatHuggingFace:
     llm = HuggingFaceEndpoint(
         repo_id="meta-llama/Llama-3.2-1B-Instruct", # small model
         # repo_id="meta-llama/Llama-3.2-8B-Instruct", # large model
@@ -15,4 +18,19 @@ def get_llm() -> ChatHuggingFace:
         repetition_penalty=1.03,
     )
 
-    return ChatHuggingFace(llm=llm)
\ No newline at end of file
+    return ChatHuggingFace(llm=llm)
+
+def get_llm(priority: str = "interactive") -> Runnable:
+    """
+    Chat model whose calls go through the shared LLM scheduler
+    (rate limit, concurrency pool, priority, retry on 429/5xx).
+
+    priority: "interactive" for user-facing requests, "batch" for background jobs.
+    """
+    model = _build_chat_model()
+    scheduler = get_scheduler()
+
+    def _invoke(prompt_value, config=None):
+        return scheduler.run(lambda: model.invoke(prompt_value, config=config), priority=priority)
+
+    return RunnableLambda(_invoke, name="ScheduledChatHuggingFace")
@@ -0,0 +1,190 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from src.utils.rate_limit import TokenBucket, backoff_delay
+
+load_dotenv()
+
+# ---- CONFIG ----
+
+LLM_RATE_PER_SEC = float(os.getenv("LLM_RATE_PER_SEC", "1.0"))
+LLM_BURST = float(os.getenv("LLM_BURST", "3"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+
+# Lower rank = served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMSchedulerError(Exception):
+    pass
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """
+    Best-effort HTTP status lookup on errors raised by the HF client
+    (requests/httpx style errors carry a `.response`).
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        code = getattr(exc, "status_code", None)
+        if code is None:
+            response = getattr(exc, "response", None)
+            code = getattr(response, "status_code", None)
+        if isinstance(code, int):
+            return code
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return _status_code(exc) in RETRYABLE_STATUS
+
+
+class LLMScheduler:
+    """
+    Central gate for every call to the inference endpoint.
+
+    - token bucket caps the request rate,
+    - at most `max_concurrency` calls run at once,
+    - waiting callers are served by priority (interactive before batch),
+      and batch calls can never take the slots reserved for interactive ones,
+    - 429/5xx errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        rate_per_sec: float = LLM_RATE_PER_SEC,
+        burst: float = LLM_BURST,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        reserved_interactive: int = 1,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ):
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.reserved_interactive = min(reserved_interactive, self.max_concurrency - 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._cond = threading.Condition()
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._metrics: Dict[str, Dict[str, float]] = {
+            p: {
+                "queued": 0,
+                "max_queued": 0,
+                "calls": 0,
+                "wait_total": 0.0,
+                "wait_max": 0.0,
+                "retries": 0,
+                "failures": 0,
+            }
+            for p in PRIORITIES
+        }
+
+    # ---- slot handling ----
+
+    def _limit_for(self, priority: str) -> int:
+        if priority == "batch":
+            return self.max_concurrency - self.reserved_interactive
+        return self.max_concurrency
+
+    def _acquire_slot(self, priority: str) -> float:
+        start = time.monotonic()
+        ticket = (PRIORITIES[priority], next(self._seq))
+        m = self._metrics[priority]
+
+        with self._cond:
+            heapq.heappush(self._heap, ticket)
+            m["queued"] += 1
+            m["max_queued"] = max(m["max_queued"], m["queued"])
+            while self._heap[0] != ticket or self._active >= self._limit_for(priority):
+                self._cond.wait()
+            heapq.heappop(self._heap)
+            m["queued"] -= 1
+            self._active += 1
+            # the next ticket in line may be allowed to run now
+            self._cond.notify_all()
+
+        self.bucket.acquire()
+        waited = time.monotonic() - start
+
+        with self._cond:
+            m["calls"] += 1
+            m["wait_total"] += waited
+            m["wait_max"] = max(m["wait_max"], waited)
+        return waited
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    # ---- public API ----
+
+    def run(self, fn: Callable[[], Any], priority: str = "interactive") -> Any:
+        """
+        Run `fn` once a slot and a rate token are available.
+        Blocks the calling thread; returns fn's result or raises its last error.
+        """
+        if priority not in PRIORITIES:
+            raise LLMSchedulerError(f"Unknown priority '{priority}'. Use one of {list(PRIORITIES)}.")
+
+        attempt = 0
+        while True:
+            self._acquire_slot(priority)
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    with self._cond:
+                        self._metrics[priority]["failures"] += 1
+                    raise
+            finally:
+                self._release_slot()
+
+            # back off outside the slot so other callers keep flowing
+            with self._cond:
+                self._metrics[priority]["retries"] += 1
+            time.sleep(backoff_delay(attempt, self.base_delay, self.max_delay))
+            attempt += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot of queue depth and wait-time stats per priority class.
+        """
+        with self._cond:
+            out: Dict[str, Any] = {"active": self._active}
+            for p, m in self._metrics.items():
+                calls = m["calls"]
+                out[p] = {
+                    **m,
+                    "wait_avg": (m["wait_total"] / calls) if calls else 0.0,
+                }
+            return out
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler()
+    return _scheduler
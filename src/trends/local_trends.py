@@ -15,8 +15,7 @@ def load_trends_raw() -> dict:
         return json.load(f)
 
 
-def load_trend_bundle() -> TrendBundle:
-    data = load_trends_raw()
+def bundle_from_raw(data: dict) -> TrendBundle:
     songs = [TrendSong(**s) for s in data.get("songs", [])]
     vtrends = [VisualTrend(**t) for t in data.get("visual_trends", [])]
     return TrendBundle(
@@ -26,12 +25,18 @@ def load_trend_bundle() -> TrendBundle:
     )
 
 
+def load_trend_bundle() -> TrendBundle:
+    return bundle_from_raw(load_trends_raw())
+
+
 def filter_trend_bundle(
     bundle: TrendBundle,
     mood_or_tag: Optional[str] = None,
 ) -> TrendBundle:
     """
     Filter songs and visual trends by mood or tag (case-insensitive).
+    Linear scan; get_trends() answers the same question from the indexed
+    TrendRepository.
     """
     if not mood_or_tag:
         return bundle
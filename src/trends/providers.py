@@ -0,0 +1,153 @@
+# src/trends/providers.py
+#
+# Trend sources. A provider turns some upstream (local JSON, an HTTP API,
+# ...) into a TrendBundle; the TrendRefresher (src/trends/refresher.py)
+# calls providers in the background, so fetch() may be slow or fail.
+#
+# New sources: subclass TrendProvider and register_provider("name", factory),
+# then list the name in TRENDS_PROVIDERS.
+import json
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .local_trends import TRENDS_PATH, bundle_from_raw
+from .schemas import TrendBundle, TrendSong, VisualTrend
+
+
+class TrendProviderError(Exception):
+    pass
+
+
+class TrendProvider(ABC):
+    name: str = "provider"
+
+    @abstractmethod
+    def fetch(self) -> TrendBundle:
+        """
+        Current trends from this source. May block; raise on failure.
+        """
+
+    def version(self) -> Optional[str]:
+        """
+        Cheap token that changes when fetch() would return something new,
+        or None if unknown (then every refresh fetches).
+        """
+        return None
+
+
+class LocalFileProvider(TrendProvider):
+    """
+    Trends from a local JSON file in the trends.json format.
+    """
+
+    name = "local"
+
+    def __init__(self, path: Path = TRENDS_PATH):
+        self.path = Path(path)
+
+    def version(self) -> Optional[str]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def fetch(self) -> TrendBundle:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise TrendProviderError(f"trends.json not found at {self.path}")
+        except ValueError as e:
+            raise TrendProviderError(f"invalid trends file {self.path}: {e}")
+        return bundle_from_raw(data)
+
+
+class FakeRemoteProvider(TrendProvider):
+    """
+    Stand-in for a remote trends API, for tests and local experiments:
+    every fetch sleeps `latency` seconds and fails with probability
+    `failure_rate`. Returns `bundle` if given, otherwise `size` generated
+    songs and visual trends that change on every fetch.
+    """
+
+    name = "fake_remote"
+
+    MOODS = ["cozy", "emotional", "energetic", "dreamy", "dark", "playful"]
+    TAGS = ["anime", "lofi", "winter", "snow", "warm", "reel", "challenge", "sketch", "ink", "neon"]
+
+    def __init__(
+        self,
+        bundle: Optional[TrendBundle] = None,
+        latency: float = 0.5,
+        failure_rate: float = 0.0,
+        size: int = 20,
+        seed: Optional[int] = None,
+    ):
+        self.bundle = bundle
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.size = size
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _generate(self, n: int) -> TrendBundle:
+        rng = self._rng
+        songs = [
+            TrendSong(
+                name=f"Remote Song {n}-{i}",
+                artist=f"Artist {rng.randint(1, 50)}",
+                mood=rng.choice(self.MOODS),
+                platform="instagram",
+                tags=rng.sample(self.TAGS, 3),
+                popularity=float(rng.randint(0, 100_000)),
+            )
+            for i in range(self.size)
+        ]
+        visual_trends = [
+            VisualTrend(
+                name=f"Remote Challenge {n}-{i}",
+                description=f"Generated visual trend #{i}",
+                tags=rng.sample(self.TAGS, 2),
+                difficulty=rng.choice(["easy", "medium", "hard"]),
+                popularity=float(rng.randint(0, 100_000)),
+            )
+            for i in range(self.size)
+        ]
+        return TrendBundle(fetched_at=datetime.now(timezone.utc), songs=songs, visual_trends=visual_trends)
+
+    def fetch(self) -> TrendBundle:
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+            fail = self._rng.random() < self.failure_rate
+        time.sleep(self.latency)
+        if fail:
+            raise TrendProviderError(f"{self.name}: simulated upstream failure (call {n})")
+        if self.bundle is not None:
+            return self.bundle.model_copy(update={"fetched_at": datetime.now(timezone.utc)})
+        return self._generate(n)
+
+
+# ---- REGISTRY ----
+
+_factories: Dict[str, Callable[[], TrendProvider]] = {
+    LocalFileProvider.name: LocalFileProvider,
+    FakeRemoteProvider.name: FakeRemoteProvider,
+}
+
+
+def register_provider(name: str, factory: Callable[[], TrendProvider]) -> None:
+    _factories[name] = factory
+
+
+def create_provider(name: str) -> TrendProvider:
+    if name not in _factories:
+        raise TrendProviderError(f"Unknown trend provider '{name}'. Known: {sorted(_factories)}")
+    return _factories[name]()
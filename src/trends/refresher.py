@@ -0,0 +1,347 @@
+# src/trends/refresher.py
+#
+# Keeps the shared TrendRepository filled from the configured providers
+# without ever making a caller wait on them:
+#
+# - a daemon thread fetches from every provider every TRENDS_REFRESH_SECONDS,
+#   merges the results and swaps them into the repository;
+# - callers always get the current bundle right away. If it is older than
+#   TRENDS_MAX_AGE a refresh is requested in the background
+#   (stale-while-revalidate), and so is one when a provider's cheap
+#   version() (e.g. the mtime of trends.json) moved since the last fetch;
+# - the last good merged bundle is persisted to TRENDS_SNAPSHOT_PATH and
+#   served on the next start until the first refresh completes;
+# - a failing provider keeps contributing its last good bundle, and
+#   retries back off exponentially;
+# - items are stamped with first_seen and last_seen, both kept across
+#   refreshes and (via the snapshot) restarts. last_seen is the last fetch
+#   in which the item was still trending: newly reported, or more popular
+#   than in the fetch before. It drives the recency decay in
+#   src/trends/scoring.py;
+# - for semantic matching the thread also loads the embedding model when it
+#   starts and embeds each new bundle before swapping it in, so a request
+#   never waits on the model or on re-embedding.
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from src.utils.rate_limit import backoff_delay
+
+from .providers import TrendProvider, create_provider
+from .repository import TrendRepository
+from .schemas import TrendBundle, TrendSong, VisualTrend
+
+load_dotenv()
+
+# ---- CONFIG ----
+
+TRENDS_PROVIDERS = [p.strip() for p in os.getenv("TRENDS_PROVIDERS", "local").split(",") if p.strip()]
+TRENDS_REFRESH_SECONDS = float(os.getenv("TRENDS_REFRESH_SECONDS", "300"))
+TRENDS_MAX_AGE = float(os.getenv("TRENDS_MAX_AGE", str(TRENDS_REFRESH_SECONDS)))
+# only when there is neither data nor a snapshot: how long the very first
+# caller may wait for the initial refresh
+TRENDS_COLD_START_WAIT = float(os.getenv("TRENDS_COLD_START_WAIT", "1.0"))
+# embed bundles in the background for TRENDS_MATCH=semantic (src/trends/service.py)
+TRENDS_EMBED = os.getenv("TRENDS_MATCH", "semantic") == "semantic"
+TRENDS_SNAPSHOT_PATH = Path(
+    os.getenv("TRENDS_SNAPSHOT_PATH", str(Path(__file__).parent.parent / "data" / "trends_snapshot.json"))
+)
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def song_key(song: TrendSong) -> Hashable:
+    return ("song", song.name.lower(), song.artist.lower())
+
+
+def visual_trend_key(trend: VisualTrend) -> Hashable:
+    return ("visual", trend.name.lower())
+
+
+def merge_bundles(bundles: List[TrendBundle]) -> TrendBundle:
+    """
+    One bundle from several providers, in provider order; songs are
+    deduplicated by (name, artist), visual trends by name. fetched_at is
+    that of the oldest part.
+    """
+    songs, visual_trends = {}, {}
+    for bundle in bundles:
+        for s in bundle.songs:
+            songs.setdefault(song_key(s), s)
+        for t in bundle.visual_trends:
+            visual_trends.setdefault(visual_trend_key(t), t)
+    fetched = [_as_utc(b.fetched_at) for b in bundles]
+    return TrendBundle(
+        fetched_at=min(fetched) if fetched else datetime.now(timezone.utc),
+        songs=list(songs.values()),
+        visual_trends=list(visual_trends.values()),
+    )
+
+
+class TrendRefresher:
+
+    def __init__(
+        self,
+        providers: List[TrendProvider],
+        repository: Optional[TrendRepository] = None,
+        interval: float = TRENDS_REFRESH_SECONDS,
+        max_age: float = TRENDS_MAX_AGE,
+        snapshot_path: Optional[Path] = TRENDS_SNAPSHOT_PATH,
+        cold_start_wait: float = TRENDS_COLD_START_WAIT,
+        embed: bool = TRENDS_EMBED,
+    ):
+        self.providers = providers
+        self.repository = repository or TrendRepository(path=None)
+        self.embed = embed
+        self.repository.embed_in_background = embed
+        self.interval = interval
+        self.max_age = max_age
+        self.snapshot_path = Path(snapshot_path) if snapshot_path is not None else None
+        self.cold_start_wait = cold_start_wait
+
+        self.refreshed_at: Optional[float] = None    # monotonic time of the last successful refresh
+        self._has_data = False
+        self._last_good: Dict[int, TrendBundle] = {}
+        self._versions: Dict[int, Optional[str]] = {}     # of the last good fetch
+        self._attempted: Dict[int, Optional[str]] = {}    # of the last fetch, good or not
+        self._first_seen: Dict[Hashable, datetime] = {}
+        # popularity in the last fetch and when the item was last still trending
+        self._last_seen: Dict[Hashable, Tuple[Optional[float], datetime]] = {}
+        self._failures = 0
+        self._wake = threading.Event()
+        self._refreshed = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._in_flight = False     # a background refresh is running or about to
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"refreshes": 0, "skipped": 0, "provider_errors": 0, "served_stale": 0}
+        self.last_errors: Dict[str, str] = {}
+
+        self._load_snapshot()
+
+    # ---- snapshot ----
+
+    def _load_snapshot(self) -> None:
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return
+        try:
+            bundle = TrendBundle.model_validate_json(self.snapshot_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print("Ignoring unreadable trends snapshot:", e)
+            return
+        self._remember_seen(bundle)
+        self.repository.load(bundle)
+        self._has_data = True
+
+    def _remember_seen(self, bundle: TrendBundle) -> None:
+        for key, item in self._keyed(bundle):
+            if item.first_seen is not None:
+                self._first_seen.setdefault(key, _as_utc(item.first_seen))
+            if item.last_seen is not None:
+                self._last_seen.setdefault(key, (item.popularity, _as_utc(item.last_seen)))
+
+    def _save_snapshot(self, bundle: TrendBundle) -> None:
+        if self.snapshot_path is None:
+            return
+        tmp = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        try:
+            tmp.write_text(bundle.model_dump_json(), encoding="utf-8")
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            print("Could not write trends snapshot:", e)
+
+    # ---- seen timestamps ----
+
+    @staticmethod
+    def _keyed(bundle: TrendBundle):
+        for s in bundle.songs:
+            yield song_key(s), s
+        for t in bundle.visual_trends:
+            yield visual_trend_key(t), t
+
+    def _stamp(self, bundle: TrendBundle, now: datetime) -> TrendBundle:
+        """
+        Copy of a freshly fetched bundle with first_seen / last_seen set.
+        A first_seen from the provider wins if it is earlier than ours.
+        last_seen moves to `now` for new items and items whose popularity
+        grew since the previous fetch (or that have no popularity signal, where
+        being reported is the only one); otherwise it stays where it was.
+        """
+        def stamped(key, item):
+            first = self._first_seen.get(key)
+            if item.first_seen is not None and (first is None or _as_utc(item.first_seen) < first):
+                first = _as_utc(item.first_seen)
+            first = self._first_seen[key] = first or now
+
+            previous = self._last_seen.get(key)
+            last = now
+            if previous is not None and item.popularity is not None and previous[0] is not None:
+                if item.popularity <= previous[0]:
+                    last = previous[1]
+            self._last_seen[key] = (item.popularity, last)
+            return item.model_copy(update={"first_seen": first, "last_seen": last})
+
+        return bundle.model_copy(update={
+            "songs": [stamped(song_key(s), s) for s in bundle.songs],
+            "visual_trends": [stamped(visual_trend_key(t), t) for t in bundle.visual_trends],
+        })
+
+    # ---- refreshing ----
+
+    def refresh_now(self) -> bool:
+        """
+        Fetch from every provider (in the calling thread) and swap in the
+        merged result. Providers whose version() is unchanged are not
+        fetched again. Returns True if every provider succeeded.
+        """
+        changed = False
+        ok = True
+        for i, provider in enumerate(self.providers):
+            version = provider.version()
+            if version is not None and i in self._last_good and self._versions.get(i) == version:
+                self.stats["skipped"] += 1
+                continue
+            self._attempted[i] = version
+            try:
+                bundle = provider.fetch()
+            except Exception as e:
+                ok = False
+                self.stats["provider_errors"] += 1
+                self.last_errors[provider.name] = str(e)
+                print(f"Trend provider '{provider.name}' failed, keeping its last good data:", e)
+                continue
+            self._last_good[i] = self._stamp(bundle, datetime.now(timezone.utc))
+            self._versions[i] = version
+            self.last_errors.pop(provider.name, None)
+            changed = True
+
+        if changed:
+            merged = merge_bundles([self._last_good[i] for i in sorted(self._last_good)])
+            # forget items that are no longer reported by any provider
+            keys = [key for key, _ in self._keyed(merged)]
+            self._first_seen = {key: self._first_seen[key] for key in keys}
+            self._last_seen = {key: self._last_seen[key] for key in keys}
+            # with no data yet, swap in right away and embed afterwards (_run)
+            self.repository.load(merged, embed=self.embed and self._has_data)
+            self._save_snapshot(merged)
+        if self._last_good:
+            self._has_data = True
+        if ok:
+            self.refreshed_at = time.monotonic()
+            self._failures = 0
+        else:
+            self._failures += 1
+
+        self.stats["refreshes"] += 1
+        with self._refreshed:
+            self._refreshed.notify_all()
+        return ok
+
+    def _next_delay(self) -> float:
+        if self._failures:
+            return min(self.interval, backoff_delay(self._failures, base=1.0, cap=self.interval))
+        return self.interval
+
+    def _run(self) -> None:
+        if self.embed and self._has_data:
+            # model and snapshot vectors ready before the first hint needs them
+            self.repository.warm_up()
+        while not self._closed:
+            self._in_flight = True
+            try:
+                self.refresh_now()
+                if self.embed:
+                    # no-op once the model is loaded and the bundle has vectors
+                    self.repository.warm_up()
+            except Exception as e:
+                # never let the refresher thread die
+                self._failures += 1
+                print("Trend refresh failed:", e)
+            finally:
+                self._in_flight = False
+            self._wake.wait(self._next_delay())
+            self._wake.clear()
+
+    def start(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._in_flight = True   # the thread refreshes as soon as it starts
+                    self._thread = threading.Thread(target=self._run, name="trend-refresher", daemon=True)
+                    self._thread.start()
+
+    def request_refresh(self) -> None:
+        """
+        Ask the background thread to refresh now (unless it already is);
+        returns immediately.
+        """
+        self.start()
+        if not self._in_flight:
+            self._in_flight = True
+            self._wake.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    # ---- reads ----
+
+    def is_stale(self) -> bool:
+        return self.refreshed_at is None or time.monotonic() - self.refreshed_at > self.max_age
+
+    def sources_changed(self) -> bool:
+        """
+        True if a provider's version() differs from the one last fetched.
+        Providers without a version (None) are only picked up by max_age; a
+        version whose fetch failed is left to the retry backoff.
+        """
+        for i, provider in enumerate(self.providers):
+            version = provider.version()
+            if version is not None and i in self._attempted and self._attempted[i] != version:
+                return True
+        return False
+
+    def get_repository(self) -> TrendRepository:
+        """
+        The repository with the current trends. Never blocks on providers,
+        except for at most `cold_start_wait` seconds when there is no data
+        at all yet (first run, no snapshot).
+        """
+        self.start()
+        if not self._has_data and self.cold_start_wait > 0:
+            deadline = time.monotonic() + self.cold_start_wait
+            with self._refreshed:
+                while not self._has_data and self.stats["refreshes"] == 0:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._refreshed.wait(remaining)
+        elif self.is_stale() or self.sources_changed():
+            self.stats["served_stale"] += 1
+            self.request_refresh()
+        return self.repository
+
+
+_refresher: Optional[TrendRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_trend_refresher() -> TrendRefresher:
+    """
+    Shared refresher for the providers listed in TRENDS_PROVIDERS.
+    """
+    global _refresher
+    if _refresher is None:
+        with _refresher_lock:
+            if _refresher is None:
+                _refresher = TrendRefresher([create_provider(name) for name in TRENDS_PROVIDERS])
+    return _refresher
@@ -0,0 +1,472 @@
+# src/trends/repository.py
+#
+# A trend bundle with a lowercased inverted index: term (song mood or tag,
+# visual trend tag) → positions of the items that carry it. A filter looks
+# up the matching terms in the sorted vocabulary instead of scanning every
+# item, and results are cached per query until the next reload. The bundle
+# comes from load() (the TrendRefresher does this) or, with a `path`, from
+# a trends.json file that is re-read only when it changes.
+#
+# When a result is capped, the best items by trend score (popularity with
+# recency decay, src/trends/scoring.py) are kept.
+#
+# semantic_filter() ranks items by embedding similarity to the hint
+# (src/trends/semantic.py), so "cozy winter" also finds trends tagged
+# "snow" or "warm", and returns at most a fixed number of items.
+#
+# Everything derived from one bundle (index, scores, embeddings, cached
+# results) lives in one _TrendIndex that a reload replaces as a whole, so
+# readers never see two versions mixed.
+import json
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .local_trends import TRENDS_PATH, bundle_from_raw
+from .schemas import TrendBundle
+from .scoring import order_by_key, rank_keys, top_k_positions
+from .semantic import TREND_EMBEDDINGS_PATH, TrendEmbeddings, embed_hint, literal_boost, top_k
+
+MATCH_MODES = ("substring", "prefix", "exact")
+RESULT_CACHE_SIZE = 256
+# cosine similarity below which an item is not considered related
+MIN_SIMILARITY = float(os.getenv("TRENDS_MIN_SIMILARITY", "0.25"))
+# added to the similarity of items whose mood/tag literally matches the hint
+LITERAL_MATCH_BOOST = 0.15
+# weight of the trend score (relative to the best item) in semantic ranking
+TREND_SCORE_WEIGHT = 0.1
+# above 1/DENSE_MATCH_RATIO of the items matching, capped results are taken
+# from the precomputed order instead of a heap over the matches
+DENSE_MATCH_RATIO = 8
+
+Postings = Dict[str, np.ndarray]
+
+
+def _build_postings(term_lists: List[List[str]]) -> Postings:
+    """
+    term → sorted int32 positions, from the (lowercased) terms of each item.
+    """
+    postings: Dict[str, List[int]] = {}
+    for position, terms in enumerate(term_lists):
+        for term in dict.fromkeys(terms):
+            postings.setdefault(term, []).append(position)
+    return {term: np.array(items, dtype=np.int32) for term, items in postings.items()}
+
+
+def _matched(postings: Postings, terms: List[str], n: int) -> np.ndarray:
+    """
+    Sorted positions of the items that carry any of `terms`.
+    """
+    lists = [postings[t] for t in terms if t in postings]
+    if not lists:
+        return np.array([], dtype=np.int32)
+    if len(lists) == 1:
+        return lists[0]
+    mask = np.zeros(n, dtype=bool)
+    for positions in lists:
+        mask[positions] = True
+    return np.flatnonzero(mask)
+
+
+def _best(
+    items: np.ndarray,
+    keys: List[float],
+    order: np.ndarray,
+    positions: np.ndarray,
+    k: Optional[int],
+) -> list:
+    """
+    All matched items in catalog order, or (with a cap) the k best by trend
+    score, best first.
+    """
+    if k is None:
+        return items[positions].tolist()
+    if len(positions) <= k:
+        return items[top_k_positions(keys, positions.tolist(), len(positions))].tolist()
+    if len(positions) * DENSE_MATCH_RATIO < len(items):
+        return items[top_k_positions(keys, positions.tolist(), k)].tolist()
+    # most items match: the first k of the precomputed order that match
+    mask = np.zeros(len(items), dtype=bool)
+    mask[positions] = True
+    return items[order[mask[order]][:k]].tolist()
+
+
+def _relative_scores(keys: np.ndarray) -> np.ndarray:
+    # trend score / best trend score; like the ranking, independent of "now"
+    if not len(keys):
+        return np.array([], dtype=np.float32)
+    return np.exp(keys - keys.max()).astype(np.float32)
+
+
+def _object_array(values: list) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class _TrendIndex:
+    """
+    Index, trend scores, embeddings and cached results of one bundle.
+    """
+
+    def __init__(self, bundle: Optional[TrendBundle], version: int, embeddings: Optional[TrendEmbeddings] = None):
+        self.bundle = bundle
+        self.version = version
+        self.embeddings = embeddings
+        self.results: "OrderedDict[tuple, TrendBundle]" = OrderedDict()
+
+        songs = bundle.songs if bundle is not None else []
+        visual_trends = bundle.visual_trends if bundle is not None else []
+        fetched_at = bundle.fetched_at if bundle is not None else datetime.now(timezone.utc)
+
+        self.song_postings = _build_postings([
+            ([s.mood.lower()] if s.mood else []) + [tag.lower() for tag in s.tags if tag]
+            for s in songs
+        ])
+        self.visual_postings = _build_postings([
+            [tag.lower() for tag in t.tags if tag] for t in visual_trends
+        ])
+        self.songs = _object_array(songs)
+        self.visual_trends = _object_array(visual_trends)
+        song_keys = rank_keys(songs, fetched_at)
+        visual_keys = rank_keys(visual_trends, fetched_at)
+        self.song_keys: List[float] = song_keys.tolist()
+        self.visual_keys: List[float] = visual_keys.tolist()
+        self.song_order = order_by_key(song_keys)
+        self.visual_order = order_by_key(visual_keys)
+        self.song_prior = _relative_scores(song_keys)
+        self.visual_prior = _relative_scores(visual_keys)
+        self.vocab: List[str] = sorted(self.song_postings.keys() | self.visual_postings.keys())
+
+
+class TrendRepository:
+    """
+    In-memory, indexed view of a trend bundle.
+
+    Matching follows filter_trend_bundle(): songs match on mood or tags,
+    visual trends on tags, case-insensitively; by default the query may be
+    any substring of a term. If nothing matches, the full bundle is returned.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = TRENDS_PATH,
+        cache_size: int = RESULT_CACHE_SIZE,
+        embedder=None,
+        embeddings_path: Optional[Path] = TREND_EMBEDDINGS_PATH,
+    ):
+        self.path = Path(path) if path is not None else None
+        self.cache_size = cache_size
+        self.embeddings_path = embeddings_path
+        self._embedder = embedder   # LangChain Embeddings; the RAG model if None
+        self._embedder_lock = threading.Lock()
+        # set once embedding fails; semantic_filter then stays on literal matching
+        self.embedder_error: Optional[str] = None
+        # set by TrendRefresher: vectors are computed in its thread (load(embed=True),
+        # warm_up()), never on the caller's
+        self.embed_in_background = False
+        self._signature: Optional[Tuple[int, int]] = None
+        self._current = _TrendIndex(None, 0)
+        self._lock = threading.Lock()
+        # the result caches are shared by every caller; OrderedDict is not thread-safe
+        self._cache_lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._current.version
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self) -> bool:
+        """
+        Reload and re-index if the file changed since the last load.
+        Returns True if it did. No-op without a `path`.
+        """
+        if self.path is None:
+            return False
+        signature = self._stat()
+        if signature == self._signature and self._current.bundle is not None:
+            return False
+
+        with self._lock:
+            signature = self._stat()
+            if signature == self._signature and self._current.bundle is not None:
+                return False
+            if signature is None:
+                raise FileNotFoundError(f"trends.json not found at {self.path}")
+
+            with open(self.path, "r", encoding="utf-8") as f:
+                bundle = bundle_from_raw(json.load(f))
+            self._current = _TrendIndex(bundle, self._current.version + 1)
+            self._signature = signature
+        return True
+
+    def load(self, bundle: TrendBundle, embed: bool = False) -> None:
+        """
+        Replace the bundle and re-index it. With `embed=True` the bundle is
+        embedded first (in the calling thread) and swapped in together with
+        its vectors; until then readers keep the previous version.
+        """
+        embeddings = self._build_embeddings(bundle) if embed else None
+        with self._lock:
+            self._current = _TrendIndex(bundle, self._current.version + 1, embeddings)
+
+    def _index(self) -> _TrendIndex:
+        # read once per call: a concurrent reload swaps in a new object
+        self.refresh()
+        return self._current
+
+    def bundle(self) -> TrendBundle:
+        bundle = self._index().bundle
+        if bundle is None:
+            return TrendBundle(fetched_at=datetime.now(timezone.utc))
+        return bundle
+
+    def matching_terms(self, key: str, match: str = "substring") -> List[str]:
+        """
+        Indexed terms (lowercased) that `key` matches under `match`.
+        """
+        return self._terms(self._index(), key, match)
+
+    @staticmethod
+    def _terms(index: _TrendIndex, key: str, match: str) -> List[str]:
+        key = key.lower()
+        vocab = index.vocab
+        if match == "exact":
+            i = bisect_left(vocab, key)
+            return [key] if i < len(vocab) and vocab[i] == key else []
+        if match == "prefix":
+            terms = []
+            for i in range(bisect_left(vocab, key), len(vocab)):
+                if not vocab[i].startswith(key):
+                    break
+                terms.append(vocab[i])
+            return terms
+        if match == "substring":
+            # the vocabulary is much smaller than the item list
+            return [t for t in vocab if key in t]
+        raise ValueError(f"match must be one of {MATCH_MODES}, got {match!r}")
+
+    def filter(
+        self,
+        mood_or_tag: Optional[str] = None,
+        match: str = "substring",
+        max_songs: Optional[int] = None,
+        max_visual_trends: Optional[int] = None,
+    ) -> TrendBundle:
+        """
+        Songs and visual trends whose mood/tags match `mood_or_tag`, in
+        catalog order; with a cap, the best-scored matches (best first).
+        """
+        return self._filter(self._index(), mood_or_tag, match, max_songs, max_visual_trends)
+
+    def _filter(
+        self,
+        index: _TrendIndex,
+        mood_or_tag: Optional[str],
+        match: str,
+        max_songs: Optional[int],
+        max_visual_trends: Optional[int],
+    ) -> TrendBundle:
+        if not mood_or_tag:
+            if max_songs is None and max_visual_trends is None:
+                return self._whole(index)
+            return self._top_scored(index, max_songs, max_visual_trends)
+
+        cache_key = (mood_or_tag.lower(), match, max_songs, max_visual_trends)
+        cached = self._cached(index, cache_key)
+        if cached is not None:
+            return cached
+
+        terms = self._terms(index, mood_or_tag, match)
+        song_ids = _matched(index.song_postings, terms, len(index.songs))
+        visual_ids = _matched(index.visual_postings, terms, len(index.visual_trends))
+
+        if not len(song_ids) and not len(visual_ids):
+            if max_songs is None and max_visual_trends is None:
+                result = self._whole(index)
+            else:
+                result = self._top_scored(index, max_songs, max_visual_trends)
+        else:
+            # items are already validated, no need to do it again
+            result = TrendBundle.model_construct(
+                fetched_at=index.bundle.fetched_at,
+                songs=_best(index.songs, index.song_keys, index.song_order, song_ids, max_songs),
+                visual_trends=_best(
+                    index.visual_trends, index.visual_keys, index.visual_order, visual_ids, max_visual_trends
+                ),
+            )
+
+        self._remember(index, cache_key, result)
+        return result
+
+    def top_scored(self, max_songs: Optional[int], max_visual_trends: Optional[int]) -> TrendBundle:
+        """
+        The best songs / visual trends by trend score, best first
+        (a slice of the precomputed order; None means no cap).
+        """
+        return self._top_scored(self._index(), max_songs, max_visual_trends)
+
+    @staticmethod
+    def _whole(index: _TrendIndex) -> TrendBundle:
+        if index.bundle is None:
+            return TrendBundle(fetched_at=datetime.now(timezone.utc))
+        return index.bundle
+
+    def _top_scored(
+        self,
+        index: _TrendIndex,
+        max_songs: Optional[int],
+        max_visual_trends: Optional[int],
+    ) -> TrendBundle:
+        return TrendBundle.model_construct(
+            fetched_at=self._whole(index).fetched_at,
+            songs=index.songs[index.song_order[:max_songs]].tolist(),
+            visual_trends=index.visual_trends[index.visual_order[:max_visual_trends]].tolist(),
+        )
+
+    def _cached(self, index: _TrendIndex, key: tuple) -> Optional[TrendBundle]:
+        with self._cache_lock:
+            cached = index.results.get(key)
+            if cached is not None:
+                index.results.move_to_end(key)
+            return cached
+
+    def _remember(self, index: _TrendIndex, key: tuple, result: TrendBundle) -> None:
+        with self._cache_lock:
+            index.results[key] = result
+            if len(index.results) > self.cache_size:
+                index.results.popitem(last=False)
+
+    # ---- semantic matching ----
+
+    def _get_embedder(self):
+        if self._embedder is None:
+            with self._embedder_lock:
+                if self._embedder is None:
+                    from src.rag.embedding_model import get_embedding_model
+
+                    self._embedder = get_embedding_model()
+        return self._embedder
+
+    def _model_name(self) -> str:
+        if self._embedder is None:
+            from src.rag.embedding_model import EMBEDDING_MODEL_NAME
+
+            return EMBEDDING_MODEL_NAME
+        return getattr(self._embedder, "model_name", type(self._embedder).__name__)
+
+    def _embedding_failed(self, e: Exception) -> None:
+        # missing package, model download or runtime failure: don't retry
+        # (or print) on every call
+        self.embedder_error = str(e) or type(e).__name__
+        print("Embedding model unavailable, using literal trend matching:", e)
+
+    def _build_embeddings(self, bundle: TrendBundle) -> Optional[TrendEmbeddings]:
+        if self.embedder_error is not None:
+            return None
+        try:
+            return TrendEmbeddings.build(bundle, self._get_embedder(), self._model_name(), self.embeddings_path)
+        except Exception as e:
+            self._embedding_failed(e)
+            return None
+
+    def warm_up(self) -> None:
+        """
+        Load the embedding model and embed the current bundle if it has no
+        vectors yet. Meant for a background thread (see TrendRefresher).
+        """
+        if self.embedder_error is None:
+            try:
+                self._get_embedder()
+            except Exception as e:
+                self._embedding_failed(e)
+                return
+        index = self._current
+        if index.bundle is not None and index.embeddings is None:
+            index.embeddings = self._build_embeddings(index.bundle)
+
+    def embeddings(self) -> Optional[TrendEmbeddings]:
+        """
+        Embeddings of the current bundle, computed once per reload; None if
+        the model is unavailable or, with embed_in_background, not ready yet.
+        """
+        return self._embeddings_for(self._index())
+
+    def _embeddings_for(self, index: _TrendIndex) -> Optional[TrendEmbeddings]:
+        if index.embeddings is None and index.bundle is not None and not self.embed_in_background:
+            index.embeddings = self._build_embeddings(index.bundle)
+        return index.embeddings
+
+    def semantic_filter(
+        self,
+        hint: Optional[str],
+        max_songs: int,
+        max_visual_trends: int,
+        min_score: float = MIN_SIMILARITY,
+    ) -> TrendBundle:
+        """
+        At most `max_songs` songs and `max_visual_trends` visual trends, most
+        similar to `hint` first. Literal mood/tag matches and high trend
+        scores get a small boost.
+        Without a hint, or if nothing is related, the best items by trend
+        score are returned instead. Falls back to the (capped) substring
+        filter while the bundle has no vectors yet, and for good once the
+        embedding model fails (see embedder_error).
+        """
+        index = self._index()
+        bundle = index.bundle
+        if not hint or bundle is None or not (bundle.songs or bundle.visual_trends):
+            return self._top_scored(index, max_songs, max_visual_trends)
+
+        cache_key = (hint.lower(), "semantic", max_songs, max_visual_trends, min_score)
+        cached = self._cached(index, cache_key)
+        if cached is not None:
+            return cached
+
+        embeddings = self._embeddings_for(index) if self.embedder_error is None else None
+        query = None
+        if embeddings is not None:
+            try:
+                query = embed_hint(self._get_embedder(), hint)
+            except Exception as e:
+                self._embedding_failed(e)
+        if query is None:
+            return self._filter(index, hint, "substring", max_songs, max_visual_trends)
+
+        terms = self._terms(index, hint, "substring")
+        song_boost = literal_boost(
+            TREND_SCORE_WEIGHT * index.song_prior,
+            [index.song_postings[t] for t in terms if t in index.song_postings],
+            LITERAL_MATCH_BOOST,
+        )
+        visual_boost = literal_boost(
+            TREND_SCORE_WEIGHT * index.visual_prior,
+            [index.visual_postings[t] for t in terms if t in index.visual_postings],
+            LITERAL_MATCH_BOOST,
+        )
+        song_ids = top_k(embeddings.songs, query, max_songs, min_score, song_boost)
+        visual_ids = top_k(embeddings.visual_trends, query, max_visual_trends, min_score, visual_boost)
+
+        if not len(song_ids) and not len(visual_ids):
+            result = self._top_scored(index, max_songs, max_visual_trends)
+        else:
+            result = TrendBundle.model_construct(
+                fetched_at=bundle.fetched_at,
+                songs=index.songs[song_ids].tolist(),
+                visual_trends=index.visual_trends[visual_ids].tolist(),
+            )
+
+        self._remember(index, cache_key, result)
+        return result
@@ -10,6 +10,9 @@ class TrendSong(BaseModel):
     platform: Optional[str] = Field(default=None, description="Platform where this song is trending e.g. instagram, spotify, etc")
     link: Optional[str] = Field(default=None, description="Link for the song")
     tags: List[str] = Field(default=[], description="Tags for the song like, anime, reel, slow, etc")
+    first_seen: Optional[datetime] = Field(default=None, description="When this item was first seen trending")
+    last_seen: Optional[datetime] = Field(default=None, description="When this item was last seen still trending (reported and gaining popularity)")
+    popularity: Optional[float] = Field(default=None, description="Popularity signal from the provider (e.g. uses, plays); higher is more popular")
 
 
 class VisualTrend(BaseModel):
@@ -17,6 +20,9 @@ class VisualTrend(BaseModel):
     description: str = Field(description="Description of the visual trend")
     tags: List[str] = Field(default=[], description="Tags for Visual trend like, drawthisinyourstyle, challenge, etc")
     difficulty: Optional[str] = Field(default=None, description="Difficulty of trend from easy, medium, hard.")
+    first_seen: Optional[datetime] = Field(default=None, description="When this item was first seen trending")
+    last_seen: Optional[datetime] = Field(default=None, description="When this item was last seen still trending (reported and gaining popularity)")
+    popularity: Optional[float] = Field(default=None, description="Popularity signal from the provider (e.g. uses, plays); higher is more popular")
 
 
 class TrendBundle(BaseModel):
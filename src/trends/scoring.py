@@ -0,0 +1,86 @@
+# src/trends/scoring.py
+#
+# Trend item scores: a popularity weight decayed exponentially with the
+# time since the item was last seen still trending,
+#
+#   score(now) = (1 + log1p(popularity)) * 0.5 ** ((now - last_seen) / half_life)
+#
+# last_seen only moves while an item keeps gaining popularity (see
+# TrendRefresher._stamp), so a long-running trend that is still growing
+# keeps its full weight and one that has stalled fades, however old either
+# is. All items decay at the same rate, so the ranking does not change over
+# time: log(score) = log(weight) + rate * last_seen - rate * now, and the
+# first two terms are a fixed sort key. TrendRepository computes that key
+# once per reload; picking the top k of any subset is then a heap over the
+# subset (O(m log k)), and the top k of everything is a slice.
+import heapq
+import math
+import os
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+TRENDS_HALF_LIFE_DAYS = float(os.getenv("TRENDS_HALF_LIFE_DAYS", "14"))
+
+
+def decay_rate(half_life_days: float = TRENDS_HALF_LIFE_DAYS) -> float:
+    """
+    Per-second exponential decay rate for a half-life in days.
+    """
+    return math.log(2) / (half_life_days * 86400)
+
+
+def _timestamp(dt: Optional[datetime], default: datetime) -> float:
+    dt = dt or default
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def popularity_weight(popularity: Optional[float]) -> float:
+    # log-scaled so one viral sound doesn't drown every other signal;
+    # items without a popularity signal weigh 1
+    return 1.0 + math.log1p(max(popularity or 0.0, 0.0))
+
+
+def rank_keys(items: Iterable, default_last_seen: datetime, rate: Optional[float] = None) -> np.ndarray:
+    """
+    Time-invariant sort key per item (higher ranks first): log(score) + rate * now.
+    Items without last_seen count as last seen at `default_last_seen`.
+    """
+    rate = decay_rate() if rate is None else rate
+    return np.array(
+        [
+            math.log(popularity_weight(item.popularity)) + rate * _timestamp(item.last_seen, default_last_seen)
+            for item in items
+        ],
+        dtype=np.float64,
+    )
+
+
+def score_at(key: float, now: Optional[datetime] = None, rate: Optional[float] = None) -> float:
+    """
+    Score at `now` of an item with rank key `key`.
+    """
+    rate = decay_rate() if rate is None else rate
+    now_ts = (now or datetime.now(timezone.utc)).timestamp()
+    return math.exp(key - rate * now_ts)
+
+
+def order_by_key(keys: np.ndarray) -> np.ndarray:
+    """
+    Positions sorted best first (ties keep catalog order).
+    """
+    return np.argsort(-keys, kind="stable")
+
+
+def top_k_positions(keys: Sequence[float], positions: Iterable[int], k: int) -> List[int]:
+    """
+    The k best of `positions` by key, best first, via a bounded heap
+    (ties keep catalog order). `keys` is best a list: indexing it is
+    much cheaper than indexing an array.
+    """
+    if k <= 0:
+        return []
+    return heapq.nlargest(k, positions, key=keys.__getitem__)
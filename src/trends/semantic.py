@@ -0,0 +1,143 @@
+# src/trends/semantic.py
+#
+# Embedding side of trend matching. Every song / visual trend is embedded
+# once per trends.json version (same sentence-transformers model as the RAG
+# store) into a normalized float32 matrix; a hint is then one matrix-vector
+# product plus an argpartition per item kind.
+#
+# Vectors are cached in TREND_EMBEDDINGS_PATH keyed by model + item texts,
+# so a restart with an unchanged trends.json does not re-embed anything.
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from .schemas import TrendBundle, TrendSong, VisualTrend
+
+TREND_EMBEDDINGS_PATH = Path(
+    os.getenv("TREND_EMBEDDINGS_PATH", str(Path(__file__).parent.parent / "data" / "trend_embeddings.npz"))
+)
+
+
+def song_text(song: TrendSong) -> str:
+    parts = [f"{song.name} by {song.artist}"]
+    if song.mood:
+        parts.append(f"mood: {song.mood}")
+    if song.tags:
+        parts.append("tags: " + ", ".join(song.tags))
+    return ". ".join(parts)
+
+
+def visual_trend_text(trend: VisualTrend) -> str:
+    parts = [f"{trend.name}: {trend.description}"]
+    if trend.tags:
+        parts.append("tags: " + ", ".join(trend.tags))
+    return ". ".join(parts)
+
+
+def _normalized(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def _signature(model_name: str, texts: Iterable[str]) -> str:
+    digest = hashlib.sha1(model_name.encode("utf-8"))
+    for text in texts:
+        digest.update(b"\0" + text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def top_k(
+    matrix: np.ndarray,
+    query: np.ndarray,
+    k: int,
+    min_score: float = 0.0,
+    boost: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Positions of the (at most) k rows most similar to `query`, best first,
+    skipping rows scoring below `min_score`. `boost` is added to the scores
+    before ranking (e.g. for items that literally match the hint).
+    """
+    if k <= 0 or len(matrix) == 0:
+        return np.array([], dtype=np.int64)
+    scores = matrix @ query
+    if boost is not None:
+        scores = scores + boost
+    candidates = np.flatnonzero(scores >= min_score)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class TrendEmbeddings:
+    """
+    Normalized embedding matrices for the songs and visual trends of one bundle.
+    """
+
+    def __init__(self, songs: np.ndarray, visual_trends: np.ndarray, signature: str):
+        self.songs = songs
+        self.visual_trends = visual_trends
+        self.signature = signature
+
+    @classmethod
+    def build(
+        cls,
+        bundle: TrendBundle,
+        embedder,
+        model_name: str,
+        cache_path: Optional[Path] = TREND_EMBEDDINGS_PATH,
+    ) -> "TrendEmbeddings":
+        """
+        Embed every item of `bundle` with `embedder` (a LangChain Embeddings),
+        reusing `cache_path` when it was built from the same texts and model.
+        """
+        song_texts = [song_text(s) for s in bundle.songs]
+        visual_texts = [visual_trend_text(t) for t in bundle.visual_trends]
+        signature = _signature(model_name, song_texts + ["\0"] + visual_texts)
+
+        if cache_path is not None and Path(cache_path).exists():
+            try:
+                with np.load(cache_path) as data:
+                    if str(data["signature"]) == signature:
+                        return cls(data["songs"], data["visual_trends"], signature)
+            except (OSError, KeyError, ValueError) as e:
+                print("Ignoring unreadable trend embeddings cache:", e)
+
+        texts = song_texts + visual_texts
+        vectors = _normalized(embedder.embed_documents(texts)) if texts else np.zeros((0, 0), dtype=np.float32)
+        embeddings = cls(vectors[:len(song_texts)], vectors[len(song_texts):], signature)
+
+        if cache_path is not None:
+            try:
+                embeddings.save(cache_path)
+            except OSError as e:
+                print("Could not write trend embeddings cache:", e)
+        return embeddings
+
+    def save(self, path: Path = TREND_EMBEDDINGS_PATH) -> None:
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, signature=np.array(self.signature), songs=self.songs, visual_trends=self.visual_trends)
+        os.replace(tmp, path)
+
+
+def embed_hint(embedder, text: str) -> np.ndarray:
+    return _normalized(embedder.embed_query(text))[0]
+
+
+def literal_boost(base: np.ndarray, positions: List[np.ndarray], amount: float) -> np.ndarray:
+    """
+    `base` scores plus `amount` for the items at `positions` (literal
+    mood/tag matches).
+    """
+    boost = base.astype(np.float32, copy=True)
+    for p in positions:
+        # an item matching several terms is boosted once
+        boost[p] = base[p] + amount
+    return boost
@@ -1,13 +1,31 @@
+import os
 from typing import Optional
 
 from .schemas import TrendBundle
-from .local_trends import load_trend_bundle, filter_trend_bundle
+from .refresher import get_trend_refresher
 
+# "semantic" (embedding similarity, capped) or a literal mode: "substring", "prefix", "exact"
+TRENDS_MATCH = os.getenv("TRENDS_MATCH", "semantic")
+# items per category returned by get_trends(), keep the ideation prompt bounded
+TRENDS_MAX_SONGS = int(os.getenv("TRENDS_MAX_SONGS", "5"))
+TRENDS_MAX_VISUAL_TRENDS = int(os.getenv("TRENDS_MAX_VISUAL_TRENDS", "5"))
 
-def get_trends(mood_or_tag: Optional[str] = None) -> TrendBundle:
+
+def get_trends(
+    mood_or_tag: Optional[str] = None,
+    match: str = TRENDS_MATCH,
+    max_songs: int = TRENDS_MAX_SONGS,
+    max_visual_trends: int = TRENDS_MAX_VISUAL_TRENDS,
+) -> TrendBundle:
     """
-    Public function to get trends (Phase 2a: from local JSON).
-    Later, you can swap implementation to call Spotify/Instagram APIs here.
+    Public function to get trends from the providers in TRENDS_PROVIDERS
+    (see trends/providers.py). Returns right away with the latest fetched
+    trends; refreshing happens in the background (trends/refresher.py).
+    With match="semantic" the items most related to `mood_or_tag` are
+    returned, in literal modes the best-scored matching items (see
+    trends/scoring.py); at most `max_songs` / `max_visual_trends` of each.
     """
-    bundle = load_trend_bundle()
-    return filter_trend_bundle(bundle, mood_or_tag=mood_or_tag)
+    repository = get_trend_refresher().get_repository()
+    if match == "semantic":
+        return repository.semantic_filter(mood_or_tag, max_songs=max_songs, max_visual_trends=max_visual_trends)
+    return repository.filter(mood_or_tag, match=match, max_songs=max_songs, max_visual_trends=max_visual_trends)
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import sys
 from pathlib import Path
@@ -13,17 +14,26 @@ from src.instagram.service import get_my_posts, get_post_comments
 import streamlit as st
 from dotenv import load_dotenv
 from src.db.models import init_db
-from src.db.logging import log_idea_set, log_caption_set, log_comments_and_replies
+from src.db.write_behind import get_log_writer
 from src.db.queries import (
-    get_recent_ideas,
-    get_captions_for_idea,
-    get_recent_reply_suggestions,
+    get_ideas_page,
+    get_captions_for_idea_page,
+    get_reply_suggestions_page,
+    get_top_suggested_hashtags,
+    get_unreplied_comment_ids,
 )
+from src.db.search import search_history
 from src.graph.ideation_module import generate_art_ideas
 from src.graph.caption_module import generate_captions_for_idea
 from src.graph.engagement_module import generate_reply_suggestions
 from src.utils.schemas import Comment
-from src.analytics.engine import get_analytics_summary_for_prompt
+from src.analytics.engine import get_analytics_summary_for_prompt, get_post_columns
+from src.analytics.columnar import (
+    engagement_by_hour,
+    engagement_by_type,
+    engagement_by_weekday,
+    rolling_engagement,
+)
 
 
 # ---------- INIT ----------
@@ -36,6 +46,34 @@ st.title("🎨 ArtFlow Studio – Phase 1")
 st.caption("Personal AI assistant for your art ideas, captions & engagement")
 
 
+# ---------- HELPERS ----------
+
+def page_cursors(key: str) -> list:
+    """
+    Stack of keyset cursors for a paged history view: the last entry is the
+    cursor of the page being shown (None = newest page).
+    """
+    if key not in st.session_state:
+        st.session_state[key] = [None]
+    return st.session_state[key]
+
+
+def pager_controls(key: str, next_cursor) -> None:
+    cursors = page_cursors(key)
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    if col_prev.button("⬅️ Newer", disabled=len(cursors) == 1, key=f"{key}_prev"):
+        cursors.pop()
+        st.rerun()
+    col_page.caption(f"Page {len(cursors)}")
+    if col_next.button("Older ➡️", disabled=next_cursor is None, key=f"{key}_next"):
+        cursors.append(next_cursor)
+        st.rerun()
+
+
+def reset_cursors(key: str) -> None:
+    st.session_state[key] = [None]
+
+
 # ---------- TABS / SECTIONS ----------
 
 tab1, tab2, tab3 = st.tabs(
@@ -67,7 +105,7 @@ with tab1:
             st.error("No ideas generated. Try changing the mood or hint.")
         else:
             # Log ideas to DB
-            log_idea_set(idea_set, user_hint=user_hint or None, source="streamlit")
+            get_log_writer().log_idea_set(idea_set, user_hint=user_hint or None, source="streamlit")
 
             st.success(f"Generated {len(idea_set.ideas)} ideas.")
             if idea_set.mood_or_focus:
@@ -103,7 +141,7 @@ with tab1:
                     caption_set = generate_captions_for_idea(chosen_idea)
 
                 # Log captions to DB
-                log_caption_set(chosen_idea, caption_set)
+                get_log_writer().log_caption_set(chosen_idea, caption_set)
 
                 st.subheader("📝 Caption options")
                 for cap in caption_set.captions:
@@ -171,6 +209,12 @@ with tab2:
              "With real API later, this will call the Graph API."
     )
 
+    only_new = st.checkbox(
+        "Skip comments that already have reply suggestions",
+        value=True,
+        help="Comments are stored once per (post, comment id); re-runs only send new ones to the LLM.",
+    )
+
     if st.button("Generate reply suggestions"):
 
         from src.utils.schemas import Comment
@@ -205,20 +249,32 @@ with tab2:
                 st.error("Please either fetch comments or paste at least one comment.")
                 st.stop()
         
+            # content-derived ids, so pasting the same comment again is a no-op
             comments = [
-                Comment(id=f"c{idx+1}", text=text)
-                for idx, text in enumerate(lines)
+                Comment(id=f"m_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]}", text=text)
+                for text in lines
             ]
 
+        log_post_id = post_id or selected_post_id
+        if only_new:
+            pending = set(get_unreplied_comment_ids(log_post_id, [c.id for c in comments]))
+            skipped = len(comments) - len(pending)
+            comments = [c for c in comments if c.id in pending]
+            if skipped:
+                st.info(f"Skipping {skipped} comment(s) that already have suggestions (see History).")
+            if not comments:
+                st.success("Nothing new to reply to.")
+                st.stop()
+
         # run reply suggestion generation
         with st.spinner("Generating reply suggestions..."):
             batch = generate_reply_suggestions(
                 comments=comments,
-                post_id=post_id or selected_post_id,
+                post_id=log_post_id,
             )
 
             # Log comments + replies
-            log_comments_and_replies(comments, batch, post_id=post_id or selected_post_id)
+            get_log_writer().log_comments_and_replies(comments, batch, post_id=log_post_id)
 
             st.success("Reply suggestions generated.")
 
@@ -263,16 +319,41 @@ with tab3:
 
     view_choice = st.radio(
         "What do you want to see?",
-        options=["Recent ideas", "Captions for idea", "Recent reply suggestions"],
+        options=["Recent ideas", "Captions for idea", "Recent reply suggestions", "Search history"],
     )
     with st.expander("📈 Overall analytics summary (from posts.json)", expanded=False):
         summary_text = get_analytics_summary_for_prompt()
         st.text(summary_text)
+    with st.expander("#️⃣ Most suggested hashtags", expanded=False):
+        top_tags = get_top_suggested_hashtags(limit=20)
+        if not top_tags:
+            st.info("No hashtags suggested yet.")
+        else:
+            st.table([{"hashtag": f"#{tag}", "times suggested": n} for tag, n in top_tags])
+    with st.expander("📊 Engagement breakdown", expanded=False):
+        cols = get_post_columns()
+        if not len(cols):
+            st.info("No posts available for analytics.")
+        else:
+            window = st.slider("Rolling window (days)", 7, 90, 30, key="rolling_window")
+            rolling = rolling_engagement(cols, window_days=window)
+            st.line_chart({"avg engagement": rolling["avg_engagement"]})
+            breakdown = st.radio("Break down by", ["Format", "Hour (UTC)", "Weekday"], horizontal=True)
+            if breakdown == "Format":
+                rows = engagement_by_type(cols)
+            elif breakdown == "Hour (UTC)":
+                rows = engagement_by_hour(cols)
+            else:
+                rows = engagement_by_weekday(cols)
+            st.table(rows)
 
 
     if view_choice == "Recent ideas":
-        limit = st.slider("How many?", 5, 50, 10)
-        ideas = get_recent_ideas(limit=limit)
+        limit = st.selectbox(
+            "Ideas per page", [10, 25, 50, 100], key="ideas_page_size",
+            on_change=reset_cursors, args=("ideas_cursors",),
+        )
+        ideas, next_cursor = get_ideas_page(limit=limit, cursor=page_cursors("ideas_cursors")[-1])
         if not ideas:
             st.info("No ideas logged yet.")
         else:
@@ -291,44 +372,53 @@ with tab3:
                     st.write(rec.style_direction)
                     st.markdown("**Why it fits you:**")
                     st.write(rec.why_it_fits_you)
+            st.markdown("---")
+            pager_controls("ideas_cursors", next_cursor)
 
     elif view_choice == "Captions for idea":
         idea_id_input = st.text_input(
             "Enter idea_id (copy from 'Recent ideas' view):",
             placeholder="e.g. idea_1",
+            key="captions_idea_id",
+            on_change=reset_cursors, args=("captions_cursors",),
         )
-        if st.button("Load captions"):
-            if not idea_id_input.strip():
-                st.error("Please enter an idea_id.")
+        idea_id = idea_id_input.strip()
+        if idea_id:
+            caps, next_cursor = get_captions_for_idea_page(
+                idea_id, limit=10, cursor=page_cursors("captions_cursors")[-1]
+            )
+            if not caps:
+                st.info("No captions stored for this idea yet.")
             else:
-                caps = get_captions_for_idea(idea_id_input.strip())
-                if not caps:
-                    st.info("No captions stored for this idea yet.")
-                else:
-                    for rec in caps:
-                        st.markdown("---")
-                        st.markdown(f"**Record ID:** `{rec.id}`")
-                        st.markdown(f"**Created at:** {rec.created_at}")
-                        captions = json.loads(rec.captions_json)
-                        hashtags = json.loads(rec.hashtags_json)
-                        tips = (
-                            json.loads(rec.timelapse_tips_json)
-                            if rec.timelapse_tips_json
-                            else []
-                        )
-                        st.subheader("Captions")
-                        for c in captions:
-                            st.write(f"- {c}")
-                        st.subheader("Hashtags")
-                        st.code(" ".join(hashtags))
-                        if tips:
-                            st.subheader("Timelapse tips")
-                            for t in tips:
-                                st.write(f"- {t}")
+                for rec in caps:
+                    st.markdown("---")
+                    st.markdown(f"**Record ID:** `{rec.id}`")
+                    st.markdown(f"**Created at:** {rec.created_at}")
+                    captions = json.loads(rec.captions_json)
+                    hashtags = json.loads(rec.hashtags_json)
+                    tips = (
+                        json.loads(rec.timelapse_tips_json)
+                        if rec.timelapse_tips_json
+                        else []
+                    )
+                    st.subheader("Captions")
+                    for c in captions:
+                        st.write(f"- {c}")
+                    st.subheader("Hashtags")
+                    st.code(" ".join(hashtags))
+                    if tips:
+                        st.subheader("Timelapse tips")
+                        for t in tips:
+                            st.write(f"- {t}")
+                st.markdown("---")
+                pager_controls("captions_cursors", next_cursor)
 
     elif view_choice == "Recent reply suggestions":
-        limit = st.slider("How many?", 5, 50, 10, key="limit_replies")
-        replies = get_recent_reply_suggestions(limit=limit)
+        limit = st.selectbox(
+            "Suggestions per page", [10, 25, 50, 100], key="limit_replies",
+            on_change=reset_cursors, args=("replies_cursors",),
+        )
+        replies, next_cursor = get_reply_suggestions_page(limit=limit, cursor=page_cursors("replies_cursors")[-1])
         if not replies:
             st.info("No reply suggestions logged yet.")
         else:
@@ -341,3 +431,26 @@ with tab3:
                 for s in suggestions:
                     st.write(f"- {s}")
                 st.markdown(f"**Created at:** {rec.created_at}")
+            st.markdown("---")
+            pager_controls("replies_cursors", next_cursor)
+
+    elif view_choice == "Search history":
+        query = st.text_input(
+            "Search ideas, captions and replies:",
+            placeholder="e.g. rainy anime",
+        )
+        kinds = st.multiselect(
+            "In", ["idea", "caption", "reply"], default=["idea", "caption", "reply"]
+        )
+        if query.strip() and kinds:
+            hits = search_history(query, limit=50, kinds=kinds)
+            if not hits:
+                st.info("Nothing found.")
+            for hit in hits:
+                st.markdown("---")
+                label = {"idea": "💡 Idea", "caption": "✍️ Captions", "reply": "💬 Reply"}[hit.kind]
+                st.markdown(f"**{label}** `#{hit.record_id}`" + (f" | **Idea ID:** `{hit.idea_id}`" if hit.idea_id else ""))
+                if hit.title:
+                    st.markdown(f"**{hit.title}**")
+                st.markdown(hit.snippet)
+                st.caption(f"Created at (UTC): {hit.created_at}")
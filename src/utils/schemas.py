@@ -26,6 +26,12 @@ class CaptionSet(BaseModel):
     hashtags: List[str] = Field(description="List of hastags to be included")
     timelapse_tips: Optional[List[str]] = None
 
+class CaptionDraft(BaseModel):
+    # CaptionSet without hashtags, for when they come from post history
+    idea_id: str = Field(description="Id of the idea")
+    captions: List[str] = Field(description="List of captions for reel/post")
+    timelapse_tips: Optional[List[str]] = None
+
 class Comment(BaseModel):
     id: str = Field(description="Id of the comment")
     text: str = Field(description="The comment text")
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# the engine is created at import time: point it at a throwaway database first
+_TMP = tempfile.mkdtemp(prefix="artflow-tests-")
+os.environ.setdefault("ARTFLOW_DATABASE_URL", f"sqlite:///{_TMP}/artflow.db")
+os.environ.setdefault("ARTFLOW_ARCHIVE_DIR", os.path.join(_TMP, "archive"))
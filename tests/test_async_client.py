@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from src.instagram.async_client import AsyncIGClient, stream_comments_for_posts
+from src.instagram.stub_server import StubConfig, start_stub_server
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server(StubConfig(num_posts=6, comments_per_post=23))
+    api = server.api
+    state = {"in_flight": 0, "peak": 0, "limits": []}
+    lock = threading.Lock()
+    handle_get = api.handle_get
+
+    def tracked(path, query, base):
+        # record concurrency and the page sizes asked for
+        with lock:
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            state["limits"].append(query.get("limit"))
+        try:
+            time.sleep(0.02)
+            return handle_get(path, query, base)
+        finally:
+            with lock:
+                state["in_flight"] -= 1
+
+    api.handle_get = tracked
+    yield api, base_url, state
+    server.shutdown()
+
+
+async def _collect(base_url, post_ids, max_connections, limit_per_post=None):
+    async with AsyncIGClient(
+        access_token="stub", base_url=base_url, max_connections=max_connections, rate_per_sec=1000
+    ) as client:
+        out = {}
+        async for c in stream_comments_for_posts(
+            post_ids, limit_per_post, max_connections=max_connections, client=client
+        ):
+            out.setdefault(c.post_id, []).append(c.id)
+        return out
+
+
+def test_comments_for_many_posts_within_connection_limit(stub):
+    api, base_url, state = stub
+    post_ids = [p["id"] for p in api.corpus.posts]
+
+    comments = asyncio.run(_collect(base_url, post_ids, max_connections=2))
+
+    assert sorted(comments) == sorted(post_ids)
+    for pid in post_ids:
+        assert len(comments[pid]) == 23
+        assert len(set(comments[pid])) == 23
+    assert 1 < state["peak"] <= 2
+
+
+def test_limit_caps_followed_pages(stub):
+    api, base_url, state = stub
+    pid = api.corpus.posts[0]["id"]
+
+    async def run():
+        async with AsyncIGClient(access_token="stub", base_url=base_url, rate_per_sec=1000) as client:
+            return [c async for page in client.iter_comment_pages(pid, limit=7, page_size=5) for c in page]
+
+    comments = asyncio.run(run())
+
+    assert len(comments) == 7
+    assert state["limits"] == ["5", "2"]
@@ -0,0 +1,55 @@
+import shutil
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import text
+
+pytest.importorskip("pyarrow")
+
+from src.db.archive import archive_table, table_dir
+from src.db.logging import log_idea_set
+from src.db.models import ARCHIVE_DIR, IdeaRecord, engine, init_db, utc_now
+from src.db.queries import get_ideas_between
+from src.utils.schemas import ArtIdea, ArtIdeaSet
+
+
+@pytest.fixture(autouse=True)
+def db():
+    init_db()
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM idearecord"))
+    shutil.rmtree(ARCHIVE_DIR, ignore_errors=True)
+
+
+def _log_ideas(*idea_ids):
+    ideas = [
+        ArtIdea(
+            id=idea_id,
+            title=f"title {idea_id}",
+            drawing_prompt="a fox",
+            style_direction="soft",
+            why_it_fits_you="foxes do well",
+            recommended_format="reel",
+            difficulty="easy",
+        )
+        for idea_id in idea_ids
+    ]
+    log_idea_set(ArtIdeaSet(ideas=ideas))
+
+
+def _archive_everything():
+    return archive_table(IdeaRecord, utc_now() + timedelta(seconds=1))
+
+
+def test_reused_ids_are_not_dropped_or_overwritten():
+    _log_ideas("a", "b")
+    assert _archive_everything() == 2
+    # the table is empty again, so SQLite hands out the same ids
+    _log_ideas("c", "d")
+    assert _archive_everything() == 2
+    _log_ideas("e", "f")
+
+    files = list(table_dir(IdeaRecord.__tablename__).glob("month=*/*.parquet"))
+    assert len(files) == 2
+    assert sorted(r.idea_id for r in get_ideas_between()) == ["a", "b", "c", "d", "e", "f"]
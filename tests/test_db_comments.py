@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import text
+
+from src.db.logging import log_comments_and_replies
+from src.db.models import engine, init_db
+from src.db.queries import get_unreplied_comment_ids
+from src.utils.schemas import Comment, ReplyBatch, ReplySuggestion
+
+
+@pytest.fixture(autouse=True)
+def db():
+    init_db()
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM replysuggestionrecord"))
+        conn.execute(text("DELETE FROM commentrecord"))
+
+
+def _rows(table):
+    with engine.begin() as conn:
+        return conn.execute(text(f"SELECT post_id, comment_id FROM {table}")).all()
+
+
+def test_relogging_without_post_does_not_duplicate():
+    comments = [Comment(id="c1", text="love it", author="a")]
+    batch = ReplyBatch(replies=[ReplySuggestion(comment_id="c1", original_comment="love it", suggestions=["thanks!"])])
+
+    log_comments_and_replies(comments, batch, post_id=None)
+    log_comments_and_replies(comments, batch, post_id=None)
+
+    assert _rows("commentrecord") == [("", "c1")]
+    assert _rows("replysuggestionrecord") == [("", "c1")]
+    assert get_unreplied_comment_ids(None, ["c1", "c2"]) == ["c2"]
+
@@ -0,0 +1,145 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from src.trends.providers import FakeRemoteProvider, LocalFileProvider
+from src.trends.refresher import TrendRefresher
+from src.trends.schemas import TrendBundle, TrendSong, VisualTrend
+
+
+def _bundle(*names):
+    return TrendBundle(
+        fetched_at=datetime.now(timezone.utc),
+        songs=[TrendSong(name=n, artist="artist", mood="cozy", tags=["lofi"]) for n in names],
+        visual_trends=[VisualTrend(name=f"{n} challenge", description="draw it", tags=["ink"]) for n in names],
+    )
+
+
+def _song_names(refresher):
+    return sorted(s.name for s in refresher.repository.bundle().songs)
+
+
+def _first_seen(refresher):
+    return {s.name: s.first_seen for s in refresher.repository.bundle().songs}
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+
+def _refresher(providers, tmp_path, **kwargs):
+    kwargs.setdefault("cold_start_wait", 0)
+    return TrendRefresher(providers, snapshot_path=tmp_path / "snapshot.json", embed=False, **kwargs)
+
+
+@pytest.fixture
+def close_all():
+    refreshers = []
+    yield refreshers.append
+    for r in refreshers:
+        r.close()
+
+
+def test_stale_data_is_served_without_waiting_on_a_slow_provider(tmp_path, close_all):
+    provider = FakeRemoteProvider(bundle=_bundle("old"), latency=0)
+    refresher = _refresher([provider], tmp_path, max_age=0)
+    close_all(refresher)
+    refresher.refresh_now()
+
+    provider.bundle = _bundle("new")
+    provider.latency = 0.5
+    started = time.monotonic()
+    repo = refresher.get_repository()
+
+    assert time.monotonic() - started < 0.2
+    assert _song_names(refresher) == ["old"]
+    _wait(lambda: _song_names(refresher) == ["new"])
+    assert [s.name for s in repo.bundle().songs] == ["new"]
+
+
+def test_failing_provider_keeps_its_last_good_data(tmp_path):
+    steady = FakeRemoteProvider(bundle=_bundle("a"), latency=0)
+    flaky = FakeRemoteProvider(bundle=_bundle("b"), latency=0)
+    refresher = _refresher([steady, flaky], tmp_path)
+    assert refresher.refresh_now()
+
+    steady.bundle = _bundle("c")
+    flaky.failure_rate = 1.0
+
+    assert not refresher.refresh_now()
+    assert _song_names(refresher) == ["b", "c"]
+    assert flaky.name in refresher.last_errors
+
+
+def test_restart_serves_the_snapshot(tmp_path, close_all):
+    first = _refresher([FakeRemoteProvider(bundle=_bundle("a"), latency=0)], tmp_path)
+    first.refresh_now()
+
+    # the new process's provider is slow and down: the snapshot is served right away
+    restarted = _refresher([FakeRemoteProvider(latency=0.5, failure_rate=1.0)], tmp_path, cold_start_wait=5)
+    close_all(restarted)
+    started = time.monotonic()
+    restarted.get_repository()
+
+    assert time.monotonic() - started < 0.2
+    assert _song_names(restarted) == ["a"]
+
+
+def test_first_seen_is_kept_across_refreshes_and_restarts(tmp_path):
+    provider = FakeRemoteProvider(bundle=_bundle("a"), latency=0)
+    refresher = _refresher([provider], tmp_path)
+    refresher.refresh_now()
+    seen = _first_seen(refresher)
+
+    provider.bundle = _bundle("a", "b")
+    refresher.refresh_now()
+    assert _first_seen(refresher)["a"] == seen["a"]
+    assert _first_seen(refresher)["b"] > seen["a"]
+
+    restarted = _refresher([provider], tmp_path)
+    restarted.refresh_now()
+    assert _first_seen(restarted)["a"] == seen["a"]
+
+
+def test_edited_local_file_is_picked_up_before_max_age(tmp_path, close_all):
+    path = tmp_path / "trends.json"
+    path.write_text(json.dumps({"songs": [{"name": "old", "artist": "x"}]}), encoding="utf-8")
+    refresher = _refresher([LocalFileProvider(path)], tmp_path, max_age=3600)
+    close_all(refresher)
+    refresher.get_repository()
+    # let the thread's first refresh finish; the next one is an hour away
+    _wait(lambda: refresher.stats["refreshes"] and not refresher._in_flight)
+
+    path.write_text(json.dumps({"songs": [{"name": "edited", "artist": "x"}]}), encoding="utf-8")
+    # make sure the mtime moves even on coarse-grained filesystems
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    refresher.get_repository()
+
+    _wait(lambda: _song_names(refresher) == ["edited"])
+    assert _song_names(refresher) == ["edited"]
+
+
+def test_last_seen_only_moves_while_an_item_gains_popularity(tmp_path):
+    def bundle(popularity):
+        return TrendBundle(
+            fetched_at=datetime.now(timezone.utc),
+            songs=[TrendSong(name="a", artist="x", popularity=popularity)],
+        )
+
+    provider = FakeRemoteProvider(bundle=bundle(10), latency=0)
+    refresher = _refresher([provider], tmp_path)
+    refresher.refresh_now()
+    first = refresher.repository.bundle().songs[0].last_seen
+
+    refresher.refresh_now()
+    assert refresher.repository.bundle().songs[0].last_seen == first
+
+    provider.bundle = bundle(20)
+    refresher.refresh_now()
+    assert refresher.repository.bundle().songs[0].last_seen > first
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from src.trends.repository import TrendRepository
+from src.trends.schemas import TrendBundle, TrendSong
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _song(name, popularity, first_seen_days_ago, last_seen_days_ago):
+    return TrendSong(
+        name=name,
+        artist="x",
+        mood="cozy",
+        popularity=popularity,
+        first_seen=NOW - timedelta(days=first_seen_days_ago),
+        last_seen=NOW - timedelta(days=last_seen_days_ago),
+    )
+
+
+def _repository(*songs):
+    repository = TrendRepository(path=None)
+    repository.load(TrendBundle(fetched_at=NOW, songs=list(songs)))
+    return repository
+
+
+def test_long_running_trend_that_still_grows_beats_a_new_small_one():
+    repository = _repository(
+        _song("new and small", 10, 0, 0),
+        _song("old and still growing", 100_000, 60, 0),
+        _song("old and stalled", 100_000, 60, 60),
+    )
+
+    names = [s.name for s in repository.top_scored(3, None).songs]
+    assert names == ["old and still growing", "new and small", "old and stalled"]
+
+
+def test_capped_filter_is_sorted_by_score_even_when_everything_fits():
+    repository = _repository(
+        _song("low", 1, 0, 0),
+        _song("high", 1_000, 0, 0),
+        _song("mid", 100, 0, 0),
+    )
+
+    capped = repository.filter("cozy", max_songs=5)
+    uncapped = repository.filter("cozy")
+
+    assert [s.name for s in capped.songs] == ["high", "mid", "low"]
+    assert [s.name for s in uncapped.songs] == ["low", "high", "mid"]